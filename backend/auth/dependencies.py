@@ -2,9 +2,10 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
-from backend.models.dynamodb import User
+from backend.models.dynamodb import User, UserRole
 from backend.auth.cognito import verify_token
 from backend.database import get_table
+from backend.utils.concurrency import run_blocking
 
 security = HTTPBearer(auto_error=False)
 
@@ -38,7 +39,7 @@ async def get_current_user_optional(
         
         # Get user from database
         users_table = get_table('users')
-        response = users_table.get_item(Key={'id': user_id})
+        response = await run_blocking('dynamodb', users_table.get_item, Key={'id': user_id})
         
         if 'Item' not in response:
             return None
@@ -69,3 +70,16 @@ async def get_current_user(
     
     return user
 
+
+
+async def get_admin_user(
+    current_user: User = Depends(get_current_user)
+) -> User:
+    """Get current user, raise exception unless they have the admin role"""
+    if current_user.role != UserRole.admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin role required"
+        )
+    
+    return current_user
@@ -26,6 +26,12 @@ class Settings(BaseSettings):
     # Database (DynamoDB)
     dynamodb_table_prefix: str = os.getenv("DYNAMODB_TABLE_PREFIX", "ai-platform")
     dynamodb_endpoint_url: Optional[str] = os.getenv("DYNAMODB_ENDPOINT_URL")  # For local testing
+    dynamodb_max_pool_connections: int = int(os.getenv("DYNAMODB_MAX_POOL_CONNECTIONS", "64"))  # botocore default is 10
+    dynamodb_connect_timeout: float = float(os.getenv("DYNAMODB_CONNECT_TIMEOUT", "2"))
+    dynamodb_read_timeout: float = float(os.getenv("DYNAMODB_READ_TIMEOUT", "5"))
+    dynamodb_max_attempts: int = int(os.getenv("DYNAMODB_MAX_ATTEMPTS", "5"))  # Including the first attempt
+    dynamodb_retry_mode: str = os.getenv("DYNAMODB_RETRY_MODE", "adaptive")  # legacy, standard or adaptive
+    dynamodb_tcp_keepalive: bool = os.getenv("DYNAMODB_TCP_KEEPALIVE", "true").lower() == "true"
     
     # S3
     s3_documents_bucket: str = os.getenv("S3_DOCUMENTS_BUCKET", "ai-platform-documents")
@@ -41,6 +47,42 @@ class Settings(BaseSettings):
     pinecone_environment: Optional[str] = os.getenv("PINECONE_ENVIRONMENT")
     pinecone_index_name: str = os.getenv("PINECONE_INDEX_NAME", "ai-platform-documents")
     
+    # Local vector index (used when Pinecone is disabled)
+    use_local_vector_index: bool = os.getenv("USE_LOCAL_VECTOR_INDEX", "true").lower() == "true"
+    vector_index_dir: str = os.getenv("VECTOR_INDEX_DIR", "data/vector_index")
+    vector_index_mode: str = os.getenv("VECTOR_INDEX_MODE", "flat")  # flat or ivf
+    vector_index_ann_tenants: List[str] = [
+        t for t in os.getenv("VECTOR_INDEX_ANN_TENANTS", "").split(",") if t
+    ]
+    vector_index_ivf_nlist: int = int(os.getenv("VECTOR_INDEX_IVF_NLIST", "0"))  # 0 = sqrt(corpus size)
+    vector_index_ivf_nprobe: int = int(os.getenv("VECTOR_INDEX_IVF_NPROBE", "16"))
+    vector_index_ivf_min_train: int = int(os.getenv("VECTOR_INDEX_IVF_MIN_TRAIN", "4096"))
+    
+    # Keyword (BM25) index
+    keyword_index_dir: str = os.getenv("KEYWORD_INDEX_DIR", "data/keyword_index")
+    keyword_index_s3_prefix: Optional[str] = os.getenv("KEYWORD_INDEX_S3_PREFIX")  # Persist to S3 instead of disk
+    bm25_k1: float = float(os.getenv("BM25_K1", "1.2"))
+    bm25_b: float = float(os.getenv("BM25_B", "0.75"))
+    
+    # Document chunking
+    chunk_strategy: str = os.getenv("CHUNK_STRATEGY", "auto")  # auto, tokens or markdown
+    chunk_size: int = int(os.getenv("CHUNK_SIZE", "200"))  # Words per chunk
+    chunk_overlap: int = int(os.getenv("CHUNK_OVERLAP", "40"))
+    
+    # RAG retrieval
+    rag_retrieval_mode: str = os.getenv("RAG_RETRIEVAL_MODE", "auto")  # auto, vector, keyword or hybrid
+    rag_fusion_method: str = os.getenv("RAG_FUSION_METHOD", "rrf")  # rrf or weighted
+    rag_rrf_k: int = int(os.getenv("RAG_RRF_K", "60"))
+    rag_hybrid_vector_weight: float = float(os.getenv("RAG_HYBRID_VECTOR_WEIGHT", "0.5"))
+    rag_hybrid_candidates: int = int(os.getenv("RAG_HYBRID_CANDIDATES", "10"))  # Per leg, before fusion
+    
+    # Async request path (blocking SDK calls run on a bounded executor)
+    blocking_executor_workers: int = int(os.getenv("BLOCKING_EXECUTOR_WORKERS", "64"))
+    rag_retrieval_concurrency: int = int(os.getenv("RAG_RETRIEVAL_CONCURRENCY", "16"))
+    rag_llm_concurrency: int = int(os.getenv("RAG_LLM_CONCURRENCY", "32"))
+    rag_indexing_concurrency: int = int(os.getenv("RAG_INDEXING_CONCURRENCY", "2"))
+    dynamodb_concurrency: int = int(os.getenv("DYNAMODB_CONCURRENCY", "48"))  # Own thread pool; keep below DYNAMODB_MAX_POOL_CONNECTIONS
+    
     # AWS Bedrock
     bedrock_model_id: str = os.getenv("BEDROCK_MODEL_ID", "anthropic.claude-v2")
     bedrock_region: str = os.getenv("BEDROCK_REGION", "us-east-1")
@@ -50,6 +92,94 @@ class Settings(BaseSettings):
     openai_api_key: Optional[str] = os.getenv("OPENAI_API_KEY")
     openai_model: str = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
     openai_embedding_model: str = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+    openai_embedding_batch_size: int = int(os.getenv("OPENAI_EMBEDDING_BATCH_SIZE", "256"))  # Inputs per request
+    embedding_max_concurrency: int = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))  # Parallel provider requests
+    local_embedding_dimension: int = int(os.getenv("LOCAL_EMBEDDING_DIMENSION", "768"))  # Hashing embedder (no provider / fallback)
+    
+    # Embedding cache
+    embedding_cache_enabled: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    embedding_cache_size: int = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))  # In-memory LRU entries
+    embedding_cache_path: Optional[str] = os.getenv("EMBEDDING_CACHE_PATH", "data/embedding_cache.sqlite3")  # Empty = memory only
+    
+    # Semantic answer cache
+    semantic_cache_enabled: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+    semantic_cache_threshold: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))  # Cosine similarity
+    semantic_cache_max_entries: int = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "500"))  # Per tenant
+    semantic_cache_ttl_seconds: int = int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+    
+    # LLM completion cache
+    completion_cache_enabled: bool = os.getenv("COMPLETION_CACHE_ENABLED", "true").lower() == "true"
+    completion_cache_path: Optional[str] = os.getenv("COMPLETION_CACHE_PATH", "data/completion_cache.sqlite3")  # Empty = memory only
+    completion_cache_ttl_seconds: int = int(os.getenv("COMPLETION_CACHE_TTL_SECONDS", "3600"))
+    completion_cache_max_entries: int = int(os.getenv("COMPLETION_CACHE_MAX_ENTRIES", "50000"))  # On disk
+    completion_cache_memory_entries: int = int(os.getenv("COMPLETION_CACHE_MEMORY_ENTRIES", "1000"))
+    request_coalescing_enabled: bool = os.getenv("REQUEST_COALESCING_ENABLED", "true").lower() == "true"  # Share identical in-flight queries/completions
+    
+    # Provider admission control (requests / tokens per minute, per model)
+    rate_limit_enabled: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    openai_requests_per_minute: int = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "500"))
+    openai_tokens_per_minute: int = int(os.getenv("OPENAI_TOKENS_PER_MINUTE", "200000"))
+    openai_embedding_requests_per_minute: int = int(os.getenv("OPENAI_EMBEDDING_REQUESTS_PER_MINUTE", "3000"))
+    openai_embedding_tokens_per_minute: int = int(os.getenv("OPENAI_EMBEDDING_TOKENS_PER_MINUTE", "1000000"))
+    bedrock_requests_per_minute: int = int(os.getenv("BEDROCK_REQUESTS_PER_MINUTE", "100"))
+    bedrock_tokens_per_minute: int = int(os.getenv("BEDROCK_TOKENS_PER_MINUTE", "100000"))
+    bedrock_embedding_requests_per_minute: int = int(os.getenv("BEDROCK_EMBEDDING_REQUESTS_PER_MINUTE", "2000"))
+    bedrock_embedding_tokens_per_minute: int = int(os.getenv("BEDROCK_EMBEDDING_TOKENS_PER_MINUTE", "300000"))
+    rate_limit_max_wait_seconds: float = float(os.getenv("RATE_LIMIT_MAX_WAIT_SECONDS", "30"))  # Interactive calls
+    rate_limit_bulk_max_wait_seconds: float = float(os.getenv("RATE_LIMIT_BULK_MAX_WAIT_SECONDS", "300"))  # Ingestion
+    
+    # Completion provider routing
+    provider_routing_enabled: bool = os.getenv("PROVIDER_ROUTING_ENABLED", "true").lower() == "true"  # Fastest healthy provider first
+    provider_hedging_enabled: bool = os.getenv("PROVIDER_HEDGING_ENABLED", "false").lower() == "true"  # Second request when the first is slow
+    provider_latency_window: int = int(os.getenv("PROVIDER_LATENCY_WINDOW", "200"))  # Calls per provider
+    provider_latency_min_samples: int = int(os.getenv("PROVIDER_LATENCY_MIN_SAMPLES", "20"))
+    provider_max_error_rate: float = float(os.getenv("PROVIDER_MAX_ERROR_RATE", "0.5"))
+    provider_hedge_percentile: float = float(os.getenv("PROVIDER_HEDGE_PERCENTILE", "95"))
+    provider_hedge_min_delay_ms: float = float(os.getenv("PROVIDER_HEDGE_MIN_DELAY_MS", "250"))
+    provider_hedge_default_delay_ms: float = float(os.getenv("PROVIDER_HEDGE_DEFAULT_DELAY_MS", "2000"))  # Before min_samples
+    
+    # Circuit breakers (OpenAI, Bedrock, Pinecone)
+    circuit_breaker_enabled: bool = os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() == "true"
+    circuit_failure_rate_threshold: float = float(os.getenv("CIRCUIT_FAILURE_RATE_THRESHOLD", "0.5"))
+    circuit_slow_call_rate_threshold: float = float(os.getenv("CIRCUIT_SLOW_CALL_RATE_THRESHOLD", "0.8"))
+    circuit_minimum_calls: int = int(os.getenv("CIRCUIT_MINIMUM_CALLS", "10"))  # Before rates are evaluated
+    circuit_window_seconds: float = float(os.getenv("CIRCUIT_WINDOW_SECONDS", "60"))
+    circuit_open_seconds: float = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))  # Before a half-open probe
+    circuit_llm_slow_call_ms: float = float(os.getenv("CIRCUIT_LLM_SLOW_CALL_MS", "30000"))
+    circuit_embedding_slow_call_ms: float = float(os.getenv("CIRCUIT_EMBEDDING_SLOW_CALL_MS", "5000"))
+    circuit_vector_slow_call_ms: float = float(os.getenv("CIRCUIT_VECTOR_SLOW_CALL_MS", "2000"))
+    
+    # Tenant workload cache (in-process, plus redis when REDIS_URL is set)
+    redis_url: Optional[str] = os.getenv("REDIS_URL")
+    workload_cache_enabled: bool = os.getenv("WORKLOAD_CACHE_ENABLED", "true").lower() == "true"
+    workload_cache_ttl_seconds: int = int(os.getenv("WORKLOAD_CACHE_TTL_SECONDS", "60"))  # Shared tier
+    workload_cache_local_ttl_seconds: int = int(os.getenv("WORKLOAD_CACHE_LOCAL_TTL_SECONDS", "5"))  # Local tier: bounds staleness across workers
+    workload_cache_max_tenants: int = int(os.getenv("WORKLOAD_CACHE_MAX_TENANTS", "1000"))
+    
+    # Dashboard metrics
+    metric_summary_samples: int = int(os.getenv("METRIC_SUMMARY_SAMPLES", "10"))  # Latest samples kept per workload
+    dashboard_fanout_concurrency: int = int(os.getenv("DASHBOARD_FANOUT_CONCURRENCY", "16"))  # DynamoDB calls in flight per request
+    
+    # Recent metrics ring buffers (per process; ids dominate memory, roughly capacity * 150 bytes per workload)
+    metric_buffer_enabled: bool = os.getenv("METRIC_BUFFER_ENABLED", "true").lower() == "true"
+    metric_buffer_capacity: int = int(os.getenv("METRIC_BUFFER_CAPACITY", "1440"))  # Samples per workload
+    metric_buffer_window_hours: int = int(os.getenv("METRIC_BUFFER_WINDOW_HOURS", "24"))  # Oldest window served from buffers
+    metric_buffer_refresh_seconds: float = float(os.getenv("METRIC_BUFFER_REFRESH_SECONDS", "10"))  # Re-sync interval for other processes' writes
+    metric_buffer_max_workloads: int = int(os.getenv("METRIC_BUFFER_MAX_WORKLOADS", "500"))
+    
+    # Bulk metric ingestion
+    metric_bulk_max_items: int = int(os.getenv("METRIC_BULK_MAX_ITEMS", "5000"))  # Samples per request
+    metric_ingest_concurrency: int = int(os.getenv("METRIC_INGEST_CONCURRENCY", "8"))  # 25-item batches in flight per request
+    
+    # Metric rollups (minute / hour / day buckets)
+    rollups_enabled: bool = os.getenv("ROLLUPS_ENABLED", "true").lower() == "true"
+    rollup_minute_retention_hours: int = int(os.getenv("ROLLUP_MINUTE_RETENTION_HOURS", "48"))
+    rollup_hour_retention_days: int = int(os.getenv("ROLLUP_HOUR_RETENTION_DAYS", "90"))  # Day buckets never expire
+    rollup_flush_seconds: float = float(os.getenv("ROLLUP_FLUSH_SECONDS", "5"))  # Ingested samples reach rollups within this
+    
+    # Background DynamoDB writes (query history)
+    batch_writer_flush_ms: int = int(os.getenv("BATCH_WRITER_FLUSH_MS", "500"))  # Max wait before a partial batch is written
+    batch_writer_max_queue: int = int(os.getenv("BATCH_WRITER_MAX_QUEUE", "10000"))  # Beyond this, writes fall back to put_item
     
     # OpenSearch (Alternative to Pinecone)
     opensearch_endpoint: Optional[str] = os.getenv("OPENSEARCH_ENDPOINT")
@@ -1,19 +1,30 @@
 """Database module with DynamoDB client and table definitions"""
 import os
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from typing import Optional, Dict, Any
 from backend.config.settings import get_settings
 
 settings = get_settings()
 
+# Connection pool, timeouts and retries shared by the client and resource
+dynamodb_config = Config(
+    max_pool_connections=settings.dynamodb_max_pool_connections,
+    connect_timeout=settings.dynamodb_connect_timeout,
+    read_timeout=settings.dynamodb_read_timeout,
+    retries={'total_max_attempts': settings.dynamodb_max_attempts, 'mode': settings.dynamodb_retry_mode},
+    tcp_keepalive=settings.dynamodb_tcp_keepalive
+)
+
 # Initialize DynamoDB client
 dynamodb_client = boto3.client(
     'dynamodb',
     region_name=settings.aws_region,
     endpoint_url=settings.dynamodb_endpoint_url,
     aws_access_key_id=settings.aws_access_key_id,
-    aws_secret_access_key=settings.aws_secret_access_key
+    aws_secret_access_key=settings.aws_secret_access_key,
+    config=dynamodb_config
 )
 
 dynamodb_resource = boto3.resource(
@@ -21,7 +32,8 @@ dynamodb_resource = boto3.resource(
     region_name=settings.aws_region,
     endpoint_url=settings.dynamodb_endpoint_url,
     aws_access_key_id=settings.aws_access_key_id,
-    aws_secret_access_key=settings.aws_secret_access_key
+    aws_secret_access_key=settings.aws_secret_access_key,
+    config=dynamodb_config
 )
 
 # Table names
@@ -30,8 +42,11 @@ TABLES = {
     'users': f"{settings.dynamodb_table_prefix}-users",
     'workloads': f"{settings.dynamodb_table_prefix}-workloads",
     'metrics': f"{settings.dynamodb_table_prefix}-metrics",
+    'metric_summaries': f"{settings.dynamodb_table_prefix}-metric-summaries",
+    'metric_rollups': f"{settings.dynamodb_table_prefix}-metric-rollups",
     'optimizations': f"{settings.dynamodb_table_prefix}-optimizations",
     'documents': f"{settings.dynamodb_table_prefix}-documents",
+    'document_summaries': f"{settings.dynamodb_table_prefix}-document-summaries",
     'rag_queries': f"{settings.dynamodb_table_prefix}-rag-queries",
 }
 
@@ -175,6 +190,45 @@ def create_tables():
                 }
             ]
         },
+        'metric_summaries': {
+            'KeySchema': [
+                {'AttributeName': 'workload_id', 'KeyType': 'HASH'}
+            ],
+            'AttributeDefinitions': [
+                {'AttributeName': 'workload_id', 'AttributeType': 'S'}
+            ],
+            'BillingMode': 'PAY_PER_REQUEST'
+        },
+        'metric_rollups': {
+            'KeySchema': [
+                {'AttributeName': 'series', 'KeyType': 'HASH'},
+                {'AttributeName': 'bucket', 'KeyType': 'RANGE'}
+            ],
+            'AttributeDefinitions': [
+                {'AttributeName': 'series', 'AttributeType': 'S'},
+                {'AttributeName': 'bucket', 'AttributeType': 'N'}
+            ],
+            'BillingMode': 'PAY_PER_REQUEST'
+        },
+        'document_summaries': {
+            'KeySchema': [
+                {'AttributeName': 'id', 'KeyType': 'HASH'}
+            ],
+            'AttributeDefinitions': [
+                {'AttributeName': 'id', 'AttributeType': 'S'},
+                {'AttributeName': 'tenant_id', 'AttributeType': 'S'}
+            ],
+            'BillingMode': 'PAY_PER_REQUEST',
+            'GlobalSecondaryIndexes': [
+                {
+                    'IndexName': 'tenant-id-index',
+                    'KeySchema': [
+                        {'AttributeName': 'tenant_id', 'KeyType': 'HASH'}
+                    ],
+                    'Projection': {'ProjectionType': 'ALL'}
+                }
+            ]
+        },
         'rag_queries': {
             'KeySchema': [
                 {'AttributeName': 'id', 'KeyType': 'HASH'}
@@ -213,6 +267,13 @@ def create_tables():
                         **table_def
                     )
                     print(f"Created table {full_table_name}")
+                    if table_name == 'metric_rollups':
+                        # Minute and hour buckets expire via expires_at
+                        dynamodb_client.get_waiter('table_exists').wait(TableName=full_table_name)
+                        dynamodb_client.update_time_to_live(
+                            TableName=full_table_name,
+                            TimeToLiveSpecification={'Enabled': True, 'AttributeName': 'expires_at'}
+                        )
                 except Exception as create_error:
                     print(f"Error creating table {full_table_name}: {create_error}")
             else:
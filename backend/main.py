@@ -4,6 +4,8 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 import os
 from backend.database import create_tables, init_sample_data
+from backend.services.batch_writer import stop_batch_writers
+from backend.services.rollup_service import rollup_buffer
 from backend.routes import workloads, monitoring, optimization, rag, auth
 from backend.config.settings import get_settings
 from backend.utils.logging import setup_logging
@@ -30,6 +32,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Include routers
@@ -93,6 +96,13 @@ async def startup_event():
     except Exception as e:
         logger.error(f"Error during startup: {e}", exc_info=True)
 
+@app.on_event("shutdown")
+def shutdown_event():
+    """Flush queued background writes before the process exits"""
+    logger.info("Draining background DynamoDB writers...")
+    stop_batch_writers()
+    rollup_buffer.stop()
+
 # Serve static files for frontend
 if os.path.exists("static"):
     app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -112,6 +112,20 @@ class MetricCreate(MetricBase):
     pass
 
 
+class MetricIngestStatus(BaseModel):
+    index: int
+    status: str  # created | invalid | failed
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+
+class MetricBulkResult(BaseModel):
+    created: int
+    invalid: int
+    failed: int
+    results: List[MetricIngestStatus]
+
+
 class Metric(MetricBase):
     id: str
     timestamp: str
@@ -175,6 +189,8 @@ class RAGQueryResponse(BaseModel):
     sources: List[Dict[str, Any]]
     confidence_score: float = Field(ge=0, le=1)
     created_at: str
+    timings: Optional[Dict[str, float]] = None
+    cached: bool = False
 
 
 class RAGQuery(RAGQueryBase):
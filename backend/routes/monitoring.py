@@ -1,14 +1,26 @@
 """Monitoring and metrics routes"""
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from typing import Any, Dict, List, Optional
 import uuid
 import time
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
+import numpy as np
+from backend.config.settings import get_settings
 from backend.database import get_table
 from backend.models.dynamodb import (
-    Metric, MetricCreate, DashboardStats, PerformanceTrend
+    Metric, MetricCreate, MetricBulkResult, DashboardStats, PerformanceTrend
 )
-from backend.auth.dependencies import get_current_user_optional
+from backend.auth.dependencies import get_current_user_optional, get_admin_user
+from backend.services.async_dynamodb_service import AsyncDynamoDBService
+from backend.services.workload_cache import workload_cache
+from backend.services.metric_summary_service import MetricSummaryService
+from backend.services.metric_ingest_service import MetricIngestService, parse_payload
+from backend.services.metric_buffer import metric_buffers, columns
+from backend.services.rollup_service import RollupService, RESOLUTIONS, rollup_buffer
+from backend.services.dynamodb_service import to_dynamodb
+from backend.utils.concurrency import run_blocking
+
+settings = get_settings()
 
 router = APIRouter(prefix="/api", tags=["monitoring"])
 
@@ -20,24 +32,9 @@ async def get_dashboard_stats(
     """Get dashboard statistics"""
     try:
         tenant_id = current_user.tenant_id if current_user else "default-tenant"
-        workloads_table = get_table('workloads')
-        metrics_table = get_table('metrics')
-        
-        # Get all workloads for tenant
-        try:
-            workloads_response = workloads_table.query(
-                IndexName='tenant-id-index',
-                KeyConditionExpression='tenant_id = :tenant_id',
-                ExpressionAttributeValues={':tenant_id': tenant_id}
-            )
-        except Exception:
-            # Fallback to scan if GSI doesn't exist yet
-            workloads_response = workloads_table.scan(
-                FilterExpression='tenant_id = :tenant_id',
-                ExpressionAttributeValues={':tenant_id': tenant_id}
-            )
         
-        workloads = workloads_response.get('Items', [])
+        # Get all workloads for tenant (cached)
+        workloads = await workload_cache.get(tenant_id)
         total_workloads = len(workloads)
         running_workloads = sum(1 for w in workloads if w.get('status') == 'running')
         
@@ -47,34 +44,17 @@ async def get_dashboard_stats(
             for w in workloads
         )
         
-        # Get recent metrics
-        all_metrics = []
-        for workload in workloads:
-            workload_id = workload['id']
-            try:
-                metrics_response = metrics_table.query(
-                    IndexName='workload-id-timestamp-index',
-                    KeyConditionExpression='workload_id = :workload_id',
-                    ExpressionAttributeValues={':workload_id': workload_id},
-                    Limit=10,
-                    ScanIndexForward=False  # Most recent first
-                )
-            except Exception:
-                # Fallback to scan if GSI doesn't exist yet
-                metrics_response = metrics_table.scan(
-                    FilterExpression='workload_id = :workload_id',
-                    ExpressionAttributeValues={':workload_id': workload_id},
-                    Limit=10
-                )
-            all_metrics.extend(metrics_response.get('Items', []))
+        # Latest samples per workload: in-memory buffers where fresh, else bulk summary reads
+        workload_ids = [w['id'] for w in workloads]
+        buffered = metric_buffers.fresh_latest(workload_ids, settings.metric_summary_samples)
+        summaries = await MetricSummaryService.latest([i for i in workload_ids if i not in buffered])
+        recent = list(buffered.values()) + [columns(samples) for samples in summaries.values()]
+        cpu = np.concatenate([c['cpu_usage'] for c in recent]) if recent else np.empty(0)
+        memory = np.concatenate([c['memory_usage'] for c in recent]) if recent else np.empty(0)
         
         # Calculate averages
-        if all_metrics:
-            avg_cpu = sum(float(m.get('cpu_usage', 0)) for m in all_metrics) / len(all_metrics)
-            avg_memory = sum(float(m.get('memory_usage', 0)) for m in all_metrics) / len(all_metrics)
-        else:
-            avg_cpu = 0.0
-            avg_memory = 0.0
+        avg_cpu = float(cpu.mean()) if cpu.size else 0.0
+        avg_memory = float(memory.mean()) if memory.size else 0.0
         
         # Recent activity (simplified)
         recent_activity = [
@@ -102,21 +82,63 @@ async def get_dashboard_stats(
         )
 
 
+@router.get("/monitoring/stats", response_model=Dict[str, Any])
+async def get_monitoring_stats(
+    current_user = Depends(get_admin_user)
+):
+    """Workload cache, metric buffer and rollup buffer counters for this process (admin only)"""
+    return {
+        'workload_cache': workload_cache.stats(),
+        'metric_buffers': metric_buffers.stats(),
+        'rollups': rollup_buffer.stats() if settings.rollups_enabled else {'enabled': False}
+    }
+
+
 @router.get("/metrics/{workload_id}", response_model=List[Metric])
 async def get_workload_metrics(
     workload_id: str,
+    response: Response,
     hours: int = 24,
+    limit: int = Query(500, ge=1, le=5000),
+    cursor: Optional[str] = None,
     current_user = Depends(get_current_user_optional)
 ):
-    """Get metrics for a specific workload"""
+    """Get a page of metrics for a specific workload, most recent first.
+    
+    When more remain, the X-Next-Cursor header holds the `cursor` for the
+    next page.
+    """
     try:
-        metrics_table = get_table('metrics')
-        
         # Calculate timestamp threshold
         threshold = int(time.time()) - (hours * 3600)
         
+        if cursor is None:
+            # Recent windows come from the in-memory buffer when it covers them in one page
+            window = await metric_buffers.window(workload_id, threshold)
+            if window is not None and len(window['id']) <= limit:
+                return [
+                    Metric(
+                        id=metric_id,
+                        workload_id=workload_id,
+                        cpu_usage=cpu_usage,
+                        memory_usage=memory_usage,
+                        gpu_usage=gpu_usage,
+                        timestamp=str(timestamp)
+                    )
+                    for metric_id, timestamp, cpu_usage, memory_usage, gpu_usage in zip(
+                        window['id'].tolist(),
+                        window['timestamp'].tolist(),
+                        window['cpu_usage'].tolist(),
+                        window['memory_usage'].tolist(),
+                        window['gpu_usage'].tolist()
+                    )
+                ]
+        
         try:
-            response = metrics_table.query(
+            items, next_cursor = await AsyncDynamoDBService.page(
+                'metrics',
+                limit,
+                cursor,
                 IndexName='workload-id-timestamp-index',
                 KeyConditionExpression='workload_id = :workload_id AND #timestamp >= :threshold',
                 ExpressionAttributeValues={
@@ -128,21 +150,14 @@ async def get_workload_metrics(
                 },
                 ScanIndexForward=False  # Most recent first
             )
-        except Exception:
-            # Fallback to scan if GSI doesn't exist yet
-            response = metrics_table.scan(
-                FilterExpression='workload_id = :workload_id AND #timestamp >= :threshold',
-                ExpressionAttributeValues={
-                    ':workload_id': workload_id,
-                    ':threshold': threshold
-                },
-                ExpressionAttributeNames={
-                    '#timestamp': 'timestamp'
-                }
-            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
         
-        metrics = [Metric(**item) for item in response.get('Items', [])]
-        return metrics
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return [Metric(**{**item, 'timestamp': str(item['timestamp'])}) for item in items]
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -171,7 +186,14 @@ async def create_metric(
             'timestamp': timestamp
         }
         
-        metrics_table.put_item(Item=metric_item)
+        await run_blocking('dynamodb', metrics_table.put_item, Item=to_dynamodb(metric_item))
+        try:
+            await run_blocking('dynamodb', MetricSummaryService.record, metric.workload_id, [metric_item])
+        except Exception as e:
+            print(f"Error updating metric summary: {e}")
+        metric_buffers.record([metric_item])
+        if settings.rollups_enabled:
+            rollup_buffer.add([metric_item])
         
         return Metric(**metric_item)
     except Exception as e:
@@ -181,55 +203,82 @@ async def create_metric(
         )
 
 
+@router.post("/metrics/bulk", response_model=MetricBulkResult)
+async def create_metrics_bulk(
+    request: Request,
+    current_user = Depends(get_current_user_optional)
+):
+    """Create many metrics from a JSON array or NDJSON (application/x-ndjson) body.
+    
+    Each sample gets a status (created, invalid or failed) at its index;
+    one bad sample does not reject the rest.
+    """
+    content_type = request.headers.get('content-type', '')
+    try:
+        samples = parse_payload(await request.body(), ndjson='ndjson' in content_type or 'jsonl' in content_type)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid metrics payload: {str(e)}")
+    if len(samples) > settings.metric_bulk_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.metric_bulk_max_items} metrics per request"
+        )
+    try:
+        return await MetricIngestService.ingest(samples)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error creating metrics: {str(e)}"
+        )
+
+
 @router.get("/performance", response_model=List[PerformanceTrend])
 async def get_performance_trends(
-    days: int = 7,
+    days: int = Query(7, ge=1, le=366),
+    workload_id: Optional[str] = None,
     current_user = Depends(get_current_user_optional)
 ):
-    """Get performance trends over time"""
+    """Get daily performance trends for the tenant, or for one workload"""
     try:
         tenant_id = current_user.tenant_id if current_user else "default-tenant"
-        workloads_table = get_table('workloads')
-        metrics_table = get_table('metrics')
+        # Get workloads for tenant (cached)
+        workloads = await workload_cache.get(tenant_id)
+        if workload_id is not None:
+            workloads = [w for w in workloads if w.get('id') == workload_id]
+            if not workloads:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Workload not found"
+                )
+        hourly_cost = sum(float(w.get('cost_per_hour', 0)) for w in workloads)
         
-        # Get workloads for tenant
-        try:
-            workloads_response = workloads_table.query(
-                IndexName='tenant-id-index',
-                KeyConditionExpression='tenant_id = :tenant_id',
-                ExpressionAttributeValues={':tenant_id': tenant_id}
-            )
-        except Exception:
-            # Fallback to scan if GSI doesn't exist yet
-            workloads_response = workloads_table.scan(
-                FilterExpression='tenant_id = :tenant_id',
-                ExpressionAttributeValues={':tenant_id': tenant_id}
-            )
-        workloads = workloads_response.get('Items', [])
+        # One pre-aggregated row per day, however many samples it holds
+        day = RESOLUTIONS['day']
+        today = int(time.time()) // day * day
+        start = today - (days - 1) * day
+        scope, scope_id = ('workload', workload_id) if workload_id is not None else ('tenant', tenant_id)
+        rows = {
+            row['bucket']: row
+            for row in await run_blocking('dynamodb', RollupService.query, scope, scope_id, 'day', start, today)
+        }
+        
+        def mean(row, field):
+            return round(row[field]['mean'], 1) if row and row[field] else None
         
-        # Generate trend data (simplified - in production, aggregate real metrics)
         trends = []
-        end_date = datetime.now()
-        
-        for i in range(days):
-            date = end_date - timedelta(days=days - i - 1)
-            date_str = date.strftime('%Y-%m-%d')
-            
-            # Aggregate metrics for this date (simplified)
-            total_cost = sum(float(w.get('cost_per_hour', 0)) * 24 for w in workloads)
-            avg_cpu = 65.0 + (i % 5) * 3  # Simulated variation
-            avg_memory = 70.0 + (i % 5) * 2
-            avg_gpu = 45.0 + (i % 5) * 3
-            
+        for bucket in range(start, today + 1, day):
+            row = rows.get(bucket)
             trends.append(PerformanceTrend(
-                date=date_str,
-                total_cost=round(total_cost, 2),
-                cpu_usage=round(avg_cpu, 1),
-                memory_usage=round(avg_memory, 1),
-                gpu_usage=round(avg_gpu, 1)
+                date=datetime.fromtimestamp(bucket, tz=timezone.utc).strftime('%Y-%m-%d'),
+                total_cost=round(hourly_cost * 24, 2),
+                cpu_usage=mean(row, 'cpu_usage'),
+                memory_usage=mean(row, 'memory_usage'),
+                gpu_usage=mean(row, 'gpu_usage')
             ))
         
         return trends
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1,6 +1,6 @@
 """Cost optimization routes"""
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from typing import List, Optional
 import uuid
 import time
 from backend.database import get_table
@@ -9,51 +9,55 @@ from backend.models.dynamodb import (
     CostAnalysis, EfficiencyAnalysis, SavingsSummary
 )
 from backend.auth.dependencies import get_current_user_optional
+from backend.services.async_dynamodb_service import AsyncDynamoDBService
+from backend.services.workload_cache import workload_cache
+from backend.utils.concurrency import run_blocking
 
 router = APIRouter(prefix="/api", tags=["optimization"])
 
 
 @router.get("/optimization", response_model=List[Optimization])
 async def get_optimizations(
+    response: Response,
     status_filter: str = None,
-    limit: int = 50,
+    limit: int = Query(50, ge=1, le=1000),
+    cursor: Optional[str] = None,
     current_user = Depends(get_current_user_optional)
 ):
-    """Get optimization recommendations"""
+    """Get a page of optimization recommendations.
+    
+    Recommendations of other tenants are filtered out of each page, so a
+    page can be short; keep following X-Next-Cursor until it is absent.
+    """
     try:
         tenant_id = current_user.tenant_id if current_user else "default-tenant"
-        optimizations_table = get_table('optimizations')
-        workloads_table = get_table('workloads')
         
-        # Get workloads for tenant
-        workloads_response = workloads_table.query(
-            IndexName='tenant-id-index',
-            KeyConditionExpression='tenant_id = :tenant_id',
-            ExpressionAttributeValues={':tenant_id': tenant_id}
-        )
-        workloads = workloads_response.get('Items', [])
+        # Ids of the tenant's workloads
+        workload_ids = {w['id'] for w in await workload_cache.get(tenant_id)}
         
         # Get optimizations
-        if status_filter:
-            response = optimizations_table.query(
-                IndexName='status-index',
-                KeyConditionExpression='#status = :status',
-                ExpressionAttributeValues={':status': status_filter},
-                ExpressionAttributeNames={'#status': 'status'},
-                Limit=limit
-            )
-        else:
-            response = optimizations_table.scan(Limit=limit)
-        
-        optimizations = []
-        for item in response.get('Items', []):
-            # Filter by tenant (check workload tenant)
-            workload_id = item.get('workload_id')
-            workload = next((w for w in workloads if w['id'] == workload_id), None)
-            if workload:
-                optimizations.append(Optimization(**item))
-        
-        return optimizations
+        try:
+            if status_filter:
+                items, next_cursor = await AsyncDynamoDBService.page(
+                    'optimizations',
+                    limit,
+                    cursor,
+                    IndexName='status-index',
+                    KeyConditionExpression='#status = :status',
+                    ExpressionAttributeValues={':status': status_filter},
+                    ExpressionAttributeNames={'#status': 'status'}
+                )
+            else:
+                items, next_cursor = await AsyncDynamoDBService.page('optimizations', limit, cursor, operation='scan')
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        # Filter by tenant (check workload tenant)
+        return [Optimization(**item) for item in items if item.get('workload_id') in workload_ids]
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -68,26 +72,10 @@ async def generate_recommendations(
     """Generate optimization recommendations"""
     try:
         tenant_id = current_user.tenant_id if current_user else "default-tenant"
-        workloads_table = get_table('workloads')
         optimizations_table = get_table('optimizations')
         
-        # Get workloads for tenant
-        try:
-            workloads_response = workloads_table.query(
-                IndexName='tenant-id-index',
-                KeyConditionExpression='tenant_id = :tenant_id',
-                ExpressionAttributeValues={':tenant_id': tenant_id}
-            )
-        except Exception:
-            # Fallback to scan if GSI doesn't exist yet
-            workloads_response = workloads_table.scan(
-                FilterExpression='tenant_id = :tenant_id',
-                ExpressionAttributeValues={':tenant_id': tenant_id}
-            )
-        workloads = workloads_response.get('Items', [])
-        
         recommendations = []
-        for workload in workloads:
+        for workload in await workload_cache.get(tenant_id):
             # Generate recommendations based on workload characteristics
             workload_id = workload['id']
             cost_per_hour = float(workload.get('cost_per_hour', 0))
@@ -102,7 +90,7 @@ async def generate_recommendations(
                     'status': OptimizationStatus.pending.value,
                     'created_at': str(int(time.time()))
                 }
-                optimizations_table.put_item(Item=rec)
+                await run_blocking('dynamodb', optimizations_table.put_item, Item=rec)
                 recommendations.append(Optimization(**rec))
             
             # Recommendation 2: Right-sizing
@@ -115,7 +103,7 @@ async def generate_recommendations(
                     'status': OptimizationStatus.pending.value,
                     'created_at': str(int(time.time()))
                 }
-                optimizations_table.put_item(Item=rec)
+                await run_blocking('dynamodb', optimizations_table.put_item, Item=rec)
                 recommendations.append(Optimization(**rec))
         
         return recommendations
@@ -135,7 +123,9 @@ async def apply_optimization(
     try:
         optimizations_table = get_table('optimizations')
         
-        optimizations_table.update_item(
+        await run_blocking(
+            'dynamodb',
+            optimizations_table.update_item,
             Key={'id': optimization_id},
             UpdateExpression="SET #status = :status, updated_at = :updated_at",
             ExpressionAttributeValues={
@@ -146,7 +136,7 @@ async def apply_optimization(
             ReturnValues='ALL_NEW'
         )
         
-        response = optimizations_table.get_item(Key={'id': optimization_id})
+        response = await run_blocking('dynamodb', optimizations_table.get_item, Key={'id': optimization_id})
         return Optimization(**response['Item'])
     except Exception as e:
         raise HTTPException(
@@ -162,21 +152,7 @@ async def get_cost_analysis(
     """Get cost analysis"""
     try:
         tenant_id = current_user.tenant_id if current_user else "default-tenant"
-        workloads_table = get_table('workloads')
-        
-        try:
-            workloads_response = workloads_table.query(
-                IndexName='tenant-id-index',
-                KeyConditionExpression='tenant_id = :tenant_id',
-                ExpressionAttributeValues={':tenant_id': tenant_id}
-            )
-        except Exception:
-            # Fallback to scan if GSI doesn't exist yet
-            workloads_response = workloads_table.scan(
-                FilterExpression='tenant_id = :tenant_id',
-                ExpressionAttributeValues={':tenant_id': tenant_id}
-            )
-        workloads = workloads_response.get('Items', [])
+        workloads = await workload_cache.get(tenant_id)
         
         total_monthly_cost = sum(
             float(w.get('cost_per_hour', 0)) * 24 * 30
@@ -217,21 +193,7 @@ async def get_efficiency_analysis(
     """Get efficiency analysis"""
     try:
         tenant_id = current_user.tenant_id if current_user else "default-tenant"
-        workloads_table = get_table('workloads')
-        
-        try:
-            workloads_response = workloads_table.query(
-                IndexName='tenant-id-index',
-                KeyConditionExpression='tenant_id = :tenant_id',
-                ExpressionAttributeValues={':tenant_id': tenant_id}
-            )
-        except Exception:
-            # Fallback to scan if GSI doesn't exist yet
-            workloads_response = workloads_table.scan(
-                FilterExpression='tenant_id = :tenant_id',
-                ExpressionAttributeValues={':tenant_id': tenant_id}
-            )
-        workloads = workloads_response.get('Items', [])
+        workloads = await workload_cache.get(tenant_id)
         
         efficiency_data = [
             {
@@ -261,32 +223,18 @@ async def get_savings_summary(
     """Get savings summary"""
     try:
         tenant_id = current_user.tenant_id if current_user else "default-tenant"
-        optimizations_table = get_table('optimizations')
-        
-        # Count applied optimizations
-        try:
-            response = optimizations_table.query(
-                IndexName='status-index',
-                KeyConditionExpression='#status = :status',
-                ExpressionAttributeValues={':status': OptimizationStatus.applied.value},
-                ExpressionAttributeNames={'#status': 'status'}
-            )
-        except Exception:
-            # Fallback to scan if GSI doesn't exist yet
-            response = optimizations_table.scan(
-                FilterExpression='#status = :status',
-                ExpressionAttributeValues={':status': OptimizationStatus.applied.value},
-                ExpressionAttributeNames={'#status': 'status'}
-            )
-        
-        applied_items = response.get('Items', [])
-        applied_count = len(applied_items)
-        
-        # Calculate savings
-        total_savings = sum(
-            float(item.get('potential_savings', 0))
-            for item in applied_items
-        )
+        # Count applied optimizations (every page, one page in memory at a time)
+        applied_count = 0
+        total_savings = 0.0
+        async for item in AsyncDynamoDBService.paginate(
+            'optimizations',
+            IndexName='status-index',
+            KeyConditionExpression='#status = :status',
+            ExpressionAttributeValues={':status': OptimizationStatus.applied.value},
+            ExpressionAttributeNames={'#status': 'status'}
+        ):
+            applied_count += 1
+            total_savings += float(item.get('potential_savings', 0))
         
         return SavingsSummary(
             applied_optimizations=applied_count,
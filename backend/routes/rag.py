@@ -1,14 +1,22 @@
 """RAG (Retrieval Augmented Generation) routes"""
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, Optional, Annotated
+import json
 import uuid
 import time
 from backend.database import get_table
+from backend.services.dynamodb_service import to_dynamodb
+from backend.services.document_summary_service import DocumentSummaryService
 from backend.models.dynamodb import Document, DocumentCreate, RAGQueryResponse
-from backend.auth.dependencies import get_current_user_optional
+from backend.auth.dependencies import get_current_user_optional, get_admin_user
 from backend.services.rag_service import RAGService
 from backend.services.s3_service import S3Service
-from pydantic import BaseModel
+from backend.services.llm_service import rate_limit_stats, completion_router
+from backend.services.circuit_breaker import breakers, breaker_stats
+from backend.services.batch_writer import get_batch_writer, batch_writer_stats
+from backend.utils.concurrency import run_blocking, stage_stats
+from pydantic import BaseModel, Field
 
 # Initialize services (lazy loading to handle missing dependencies)
 rag_service = None
@@ -31,6 +39,36 @@ router = APIRouter(prefix="/api/rag", tags=["rag"])
 
 class RAGQueryRequest(BaseModel):
     query: str
+    use_cache: bool = True  # False bypasses the semantic and completion caches
+
+
+class IndexModeRequest(BaseModel):
+    mode: str
+    nlist: Optional[int] = None
+    nprobe: Optional[int] = None
+
+
+def _history_item(query_id: str, query: str, response: Dict[str, Any], tenant_id: str) -> Dict[str, Any]:
+    """rag_queries item for an answered query"""
+    return {
+        'id': query_id,
+        'query': query,
+        'answer': response['answer'],
+        'sources': response['sources'],
+        'confidence_score': round(response['confidence_score'], 4),
+        'tenant_id': tenant_id,
+        'created_at': int(time.time())
+    }
+
+
+async def _store_history(item: Dict[str, Any]):
+    """Queue a history item for the background batch writer.
+
+    Only when the writer's queue is full does the request pay for a
+    synchronous put_item.
+    """
+    if not get_batch_writer('rag_queries').submit(item):
+        await run_blocking('dynamodb', get_table('rag_queries').put_item, Item=to_dynamodb(item))
 
 
 @router.post("/", response_model=RAGQueryResponse)
@@ -44,27 +82,20 @@ async def query_rag(
         
         # Use RAG service to get response
         rag = get_rag_service()
-        response = rag.query(query=request.query, tenant_id=tenant_id)
+        response = await rag.aquery(query=request.query, tenant_id=tenant_id, use_cache=request.use_cache)
         
-        # Store query in database
-        queries_table = get_table('rag_queries')
+        # Store query in database (written in the background)
         query_id = str(uuid.uuid4())
-        queries_table.put_item(Item={
-            'id': query_id,
-            'query': request.query,
-            'answer': response['answer'],
-            'sources': response['sources'],
-            'confidence_score': response['confidence_score'],
-            'tenant_id': tenant_id,
-            'created_at': int(time.time())
-        })
+        await _store_history(_history_item(query_id, request.query, response, tenant_id))
         
         return RAGQueryResponse(
             id=query_id,
             answer=response['answer'],
             sources=response['sources'],
             confidence_score=response['confidence_score'],
-            created_at=str(int(time.time()))
+            created_at=str(int(time.time())),
+            timings=response.get('timings'),
+            cached=response.get('cached', False)
         )
     except Exception as e:
         raise HTTPException(
@@ -73,39 +104,83 @@ async def query_rag(
         )
 
 
+@router.post("/stream")
+async def stream_rag(
+    request: RAGQueryRequest,
+    current_user = Depends(get_current_user_optional)
+):
+    """Query the RAG system, streaming the answer as Server-Sent Events.
+    
+    Events: ``sources`` after retrieval, ``token`` per chunk of generated
+    text, and ``done`` with the confidence score and persisted query id.
+    """
+    tenant_id = current_user.tenant_id if current_user else "default-tenant"
+    rag = get_rag_service()
+    
+    def sse(event: str, data: Dict[str, Any]) -> str:
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    
+    async def events():
+        async for message in rag.astream(query=request.query, tenant_id=tenant_id, use_cache=request.use_cache):
+            if message['event'] != 'done':
+                yield sse(message['event'], message['data'])
+                continue
+            
+            response = message['data']
+            query_id = str(uuid.uuid4())
+            try:
+                await _store_history(_history_item(query_id, request.query, response, tenant_id))
+            except Exception as e:
+                print(f"Error storing RAG query: {e}")
+                query_id = None
+            yield sse('done', {
+                'id': query_id,
+                'confidence_score': response['confidence_score'],
+                'created_at': str(int(time.time())),
+                'timings': response.get('timings'),
+                'cached': response.get('cached', False)
+            })
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @router.get("/", response_model=Dict[str, Any])
 async def get_rag_info(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
     current_user = Depends(get_current_user_optional)
 ):
-    """Get RAG system information, documents, and suggested questions"""
+    """Get RAG system information, a page of documents, and suggested questions.
+    
+    When more documents remain, the X-Next-Cursor header holds the
+    `cursor` for the next page.
+    """
     try:
         tenant_id = current_user.tenant_id if current_user else "default-tenant"
-        documents_table = get_table('documents')
         
-        # Get documents for tenant
+        # List from the summaries table: metadata and preview, no document bodies
         try:
-            response = documents_table.query(
-                IndexName='tenant-id-index',
-                KeyConditionExpression='tenant_id = :tenant_id',
-                ExpressionAttributeValues={':tenant_id': tenant_id}
-            )
-        except Exception:
-            # Fallback to scan if GSI doesn't exist yet
-            response = documents_table.scan(
-                FilterExpression='tenant_id = :tenant_id',
-                ExpressionAttributeValues={':tenant_id': tenant_id}
-            )
+            items, next_cursor = await run_blocking('dynamodb', DocumentSummaryService.page, tenant_id, limit, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
         
         documents = [
             {
                 'id': item['id'],
                 'title': item['title'],
-                'content': item['content'][:100] + "..." if len(item.get('content', '')) > 100 else item.get('content', ''),
+                'content': item.get('preview', ''),
                 'doc_type': item.get('doc_type', 'guide'),
                 'upload_date': item.get('upload_date', ''),
                 'tags': item.get('tags', [])
             }
-            for item in response.get('Items', [])
+            for item in items
         ]
         
         suggested_questions = [
@@ -125,6 +200,8 @@ async def get_rag_info(
             'documents': documents,
             'availableMethods': ["POST for queries", "GET for status"]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -147,7 +224,9 @@ async def upload_document(
         
         # Upload to S3
         s3 = get_s3_service()
-        s3_key = s3.upload_document(
+        s3_key = await run_blocking(
+            's3',
+            s3.upload_document,
             file_content=content,
             filename=file.filename,
             tenant_id=tenant_id
@@ -167,12 +246,15 @@ async def upload_document(
             'upload_date': str(int(time.time()))
         }
         
-        documents_table.put_item(Item=document_item)
+        await run_blocking('dynamodb', documents_table.put_item, Item=document_item)
+        await run_blocking('dynamodb', DocumentSummaryService.put, document_item)
         
         # Index document in vector store
         try:
             rag = get_rag_service()
-            rag.index_document(
+            await run_blocking(
+                'indexing',
+                rag.index_document,
                 doc_id=document_id,
                 title=file.filename,
                 content=content_str,
@@ -195,6 +277,111 @@ async def upload_document(
         )
 
 
+@router.get("/stats", response_model=Dict[str, Any])
+async def get_rag_stats(
+    current_user = Depends(get_admin_user)
+):
+    """Get RAG pipeline cache and concurrency statistics (process-wide, admin only)"""
+    rag = get_rag_service()
+    return {
+        'embedding_cache': rag.llm_service.embedding_cache_stats(),
+        'semantic_cache': rag.semantic_cache_stats(),
+        'completion_cache': rag.llm_service.completion_cache_stats(),
+        'coalescing': rag.coalescing_stats(),
+        'rate_limits': rate_limit_stats(),
+        'providers': completion_router.stats(),
+        'batch_writers': batch_writer_stats(),
+        'stages': stage_stats()
+    }
+
+
+@router.get("/circuits", response_model=Dict[str, Any])
+async def get_circuits(
+    current_user = Depends(get_admin_user)
+):
+    """Circuit breaker state per external dependency (OpenAI, Bedrock, Pinecone)"""
+    return breaker_stats()
+
+
+@router.post("/circuits/{name}/reset", response_model=Dict[str, Any])
+async def reset_circuit(
+    name: str,
+    current_user = Depends(get_admin_user)
+):
+    """Force a circuit breaker closed (affects every tenant, admin only)"""
+    breaker = breakers.get(name)
+    if breaker is None:
+        raise HTTPException(status_code=404, detail=f"Unknown circuit: {name}")
+    breaker.reset()
+    return {name: breaker.stats()}
+
+
+@router.get("/index", response_model=Dict[str, Any])
+async def get_index_stats(
+    current_user = Depends(get_current_user_optional)
+):
+    """Get vector index backend and ANN settings for the tenant"""
+    tenant_id = current_user.tenant_id if current_user else "default-tenant"
+    rag = get_rag_service()
+    return await run_blocking('indexing', rag.vector_service.index_stats, tenant_id)
+
+
+@router.put("/index", response_model=Dict[str, Any])
+async def set_index_mode(
+    request: IndexModeRequest,
+    current_user = Depends(get_admin_user)
+):
+    """Switch the tenant's local vector index between flat and IVF search (admin only)"""
+    try:
+        tenant_id = current_user.tenant_id
+        rag = get_rag_service()
+        return await run_blocking(
+            'indexing',
+            rag.vector_service.set_index_mode,
+            tenant_id,
+            request.mode,
+            nlist=request.nlist,
+            nprobe=request.nprobe
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/index/report", response_model=Dict[str, Any])
+async def get_index_report(
+    sample_size: int = Query(100, ge=1, le=1000),
+    top_k: int = Query(10, ge=1, le=100),
+    nprobe: Optional[List[Annotated[int, Field(ge=1, le=4096)]]] = Query(None, max_length=16),
+    current_user = Depends(get_admin_user)
+):
+    """Recall/latency report for the tenant's ANN index (admin only)"""
+    try:
+        tenant_id = current_user.tenant_id
+        rag = get_rag_service()
+        return await run_blocking(
+            'indexing',
+            rag.vector_service.index_report,
+            tenant_id,
+            sample_size=sample_size,
+            top_k=top_k,
+            nprobe_values=nprobe
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.post("/index/reembed", response_model=Dict[str, Any])
+async def reembed_documents(
+    current_user = Depends(get_admin_user)
+):
+    """Add vectors for the tenant's documents uploaded while embeddings were unavailable"""
+    rag = get_rag_service()
+    if not rag.vector_service.embeddings_available():
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Embedding providers are unavailable")
+    indexed = await run_blocking('indexing', rag.reembed_pending, current_user.tenant_id)
+    return {'tenant_id': current_user.tenant_id, 'reembedded': indexed}
+
+
 @router.delete("/{document_id}")
 async def delete_document(
     document_id: str,
@@ -206,7 +393,7 @@ async def delete_document(
         documents_table = get_table('documents')
         
         # Get document
-        response = documents_table.get_item(Key={'id': document_id})
+        response = await run_blocking('dynamodb', documents_table.get_item, Key={'id': document_id})
         if 'Item' not in response:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -224,17 +411,20 @@ async def delete_document(
         if document.get('s3_key'):
             try:
                 s3 = get_s3_service()
-                s3.delete_document(document['s3_key'])
+                await run_blocking('s3', s3.delete_document, document['s3_key'])
             except Exception as e:
                 print(f"Error deleting from S3: {e}")
         
         # Delete from DynamoDB
-        documents_table.delete_item(Key={'id': document_id})
+        await run_blocking('dynamodb', documents_table.delete_item, Key={'id': document_id})
+        await run_blocking('dynamodb', DocumentSummaryService.delete, document_id)
+        if document.get('needs_embedding'):
+            await run_blocking('dynamodb', DocumentSummaryService.count_pending_embeddings, tenant_id, -1)
         
         # Delete from vector store
         try:
             rag = get_rag_service()
-            rag.delete_document(document_id, tenant_id)
+            await run_blocking('indexing', rag.delete_document, document_id, tenant_id)
         except Exception as e:
             print(f"Error deleting from vector store: {e}")
         
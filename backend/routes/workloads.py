@@ -1,6 +1,6 @@
 """Workload management routes"""
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from typing import List, Optional
 import uuid
 import time
 from backend.database import get_table
@@ -8,6 +8,9 @@ from backend.models.dynamodb import (
     Workload, WorkloadCreate, WorkloadUpdate, WorkloadStatus
 )
 from backend.auth.dependencies import get_current_user_optional
+from backend.services.async_dynamodb_service import AsyncDynamoDBService
+from backend.services.workload_cache import workload_cache
+from backend.utils.concurrency import run_blocking
 
 router = APIRouter(prefix="/api/workloads", tags=["workloads"])
 
@@ -23,36 +26,47 @@ def calculate_cost(cpu_cores: int, gpu_count: int, memory_gb: float) -> float:
 
 @router.get("/", response_model=List[Workload])
 async def get_workloads(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
     current_user = Depends(get_current_user_optional)
 ):
-    """Get all workloads for current tenant"""
+    """Get a page of workloads for current tenant.
+    
+    When more remain, the X-Next-Cursor header holds the `cursor` for the
+    next page.
+    """
     try:
         tenant_id = current_user.tenant_id if current_user else "default-tenant"
-        workloads_table = get_table('workloads')
         
-        # Query by tenant_id using GSI
+        # The whole set is cached and fits on the first page: serve it from the cache
+        cached, token = None, None
+        if cursor is None:
+            cached, token = await workload_cache.peek(tenant_id)
+            if cached is not None and len(cached) <= limit:
+                return [Workload(**item) for item in cached]
+        
+        # Query by tenant_id using GSI (scan fallback handled by the service)
         try:
-            response = workloads_table.query(
+            items, next_cursor = await AsyncDynamoDBService.page(
+                'workloads',
+                limit,
+                cursor,
                 IndexName='tenant-id-index',
                 KeyConditionExpression='tenant_id = :tenant_id',
-                ExpressionAttributeValues={':tenant_id': tenant_id},
-                Limit=limit
-            )
-        except Exception:
-            # Fallback to scan if GSI doesn't exist yet
-            response = workloads_table.scan(
-                FilterExpression='tenant_id = :tenant_id',
-                ExpressionAttributeValues={':tenant_id': tenant_id},
-                Limit=limit
+                ExpressionAttributeValues={':tenant_id': tenant_id}
             )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
         
-        workloads = []
-        for item in response.get('Items', []):
-            workloads.append(Workload(**item))
-        
-        return workloads
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        elif cursor is None and cached is None:
+            # The first page held every workload: cache it for the next reader
+            await workload_cache.fill(tenant_id, items, token)
+        return [Workload(**item) for item in items]
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -68,7 +82,7 @@ async def get_workload(
     """Get specific workload by ID"""
     try:
         workloads_table = get_table('workloads')
-        response = workloads_table.get_item(Key={'id': workload_id})
+        response = await run_blocking('dynamodb', workloads_table.get_item, Key={'id': workload_id})
         
         if 'Item' not in response:
             raise HTTPException(
@@ -127,7 +141,8 @@ async def create_workload(
             'updated_at': str(int(time.time()))
         }
         
-        workloads_table.put_item(Item=workload_item)
+        await run_blocking('dynamodb', workloads_table.put_item, Item=workload_item)
+        await workload_cache.invalidate(tenant_id)
         
         return Workload(**workload_item)
     except Exception as e:
@@ -148,7 +163,7 @@ async def update_workload(
         workloads_table = get_table('workloads')
         
         # Get existing workload
-        response = workloads_table.get_item(Key={'id': workload_id})
+        response = await run_blocking('dynamodb', workloads_table.get_item, Key={'id': workload_id})
         if 'Item' not in response:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -195,7 +210,9 @@ async def update_workload(
         expression_attribute_values[':cost_per_hour'] = new_cost
         
         # Update workload
-        workloads_table.update_item(
+        await run_blocking(
+            'dynamodb',
+            workloads_table.update_item,
             Key={'id': workload_id},
             UpdateExpression=update_expression,
             ExpressionAttributeValues=expression_attribute_values,
@@ -206,9 +223,10 @@ async def update_workload(
             },
             ReturnValues='ALL_NEW'
         )
+        await workload_cache.invalidate(tenant_id)
         
         # Get updated workload
-        response = workloads_table.get_item(Key={'id': workload_id})
+        response = await run_blocking('dynamodb', workloads_table.get_item, Key={'id': workload_id})
         return Workload(**response['Item'])
     except HTTPException:
         raise
@@ -229,7 +247,7 @@ async def delete_workload(
         workloads_table = get_table('workloads')
         
         # Check if workload exists and user has access
-        response = workloads_table.get_item(Key={'id': workload_id})
+        response = await run_blocking('dynamodb', workloads_table.get_item, Key={'id': workload_id})
         if 'Item' not in response:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -243,7 +261,8 @@ async def delete_workload(
                 detail="Access denied"
             )
         
-        workloads_table.delete_item(Key={'id': workload_id})
+        await run_blocking('dynamodb', workloads_table.delete_item, Key={'id': workload_id})
+        await workload_cache.invalidate(tenant_id)
         return None
     except HTTPException:
         raise
@@ -0,0 +1,126 @@
+"""Async DynamoDB access for routes"""
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+from backend.services.dynamodb_service import DynamoDBService
+from backend.utils.concurrency import run_blocking
+
+
+class AsyncDynamoDBService:
+    """Awaitable mirror of DynamoDBService.
+
+    Every method runs its DynamoDBService counterpart on the dynamodb
+    executor (DYNAMODB_CONCURRENCY threads over a botocore pool of
+    DYNAMODB_MAX_POOL_CONNECTIONS), so the event loop never blocks on
+    DynamoDB and routes can move over one call at a time. Error handling
+    is the same as DynamoDBService.
+    """
+
+    @staticmethod
+    async def get_item(table_name: str, key: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return await run_blocking('dynamodb', DynamoDBService.get_item, table_name, key)
+
+    @staticmethod
+    async def put_item(table_name: str, item: Dict[str, Any]) -> bool:
+        return await run_blocking('dynamodb', DynamoDBService.put_item, table_name, item)
+
+    @staticmethod
+    async def update_item(
+        table_name: str,
+        key: Dict[str, Any],
+        update_expression: str,
+        expression_attribute_values: Dict[str, Any],
+        expression_attribute_names: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        return await run_blocking(
+            'dynamodb',
+            DynamoDBService.update_item,
+            table_name,
+            key,
+            update_expression,
+            expression_attribute_values,
+            expression_attribute_names
+        )
+
+    @staticmethod
+    async def delete_item(table_name: str, key: Dict[str, Any]) -> bool:
+        return await run_blocking('dynamodb', DynamoDBService.delete_item, table_name, key)
+
+    @staticmethod
+    async def query(
+        table_name: str,
+        key_condition_expression: str,
+        expression_attribute_values: Dict[str, Any],
+        index_name: Optional[str] = None,
+        limit: Optional[int] = None,
+        scan_index_forward: bool = True
+    ) -> List[Dict[str, Any]]:
+        return await run_blocking(
+            'dynamodb',
+            DynamoDBService.query,
+            table_name,
+            key_condition_expression,
+            expression_attribute_values,
+            index_name,
+            limit,
+            scan_index_forward
+        )
+
+    @staticmethod
+    async def scan(
+        table_name: str,
+        filter_expression: Optional[str] = None,
+        expression_attribute_values: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        return await run_blocking(
+            'dynamodb',
+            DynamoDBService.scan,
+            table_name,
+            filter_expression,
+            expression_attribute_values,
+            limit
+        )
+
+    @staticmethod
+    async def batch_write(table_name: str, items: List[Dict[str, Any]]) -> bool:
+        return await run_blocking('dynamodb', DynamoDBService.batch_write, table_name, items)
+
+    @staticmethod
+    async def page(
+        table_name: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        operation: str = 'query',
+        **kwargs
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        return await run_blocking('dynamodb', DynamoDBService.page, table_name, limit, cursor, operation, **kwargs)
+
+    @staticmethod
+    async def paginate(
+        table_name: str,
+        operation: str = 'query',
+        page_size: Optional[int] = None,
+        **kwargs
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Async iterator over every matching item, one executor hop per DynamoDB page.
+        
+        The stage slot is only held while a page is fetched, so the loop body
+        may make further DynamoDB calls.
+        """
+        pages = DynamoDBService.pages(table_name, operation, page_size, **kwargs)
+        while True:
+            items = await run_blocking('dynamodb', next, pages, None)
+            if items is None:
+                return
+            for item in items:
+                yield item
+
+    @staticmethod
+    async def paginate_tenant(table_name: str, tenant_id: str, **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        """Async iterator over every item of a tenant via the tenant-id-index GSI"""
+        async for item in AsyncDynamoDBService.paginate(table_name, **DynamoDBService.tenant_query(tenant_id), **kwargs):
+            yield item
+
+    @staticmethod
+    async def collect_tenant(table_name: str, tenant_id: str, **kwargs) -> List[Dict[str, Any]]:
+        """Every item of a tenant as a list"""
+        return [item async for item in AsyncDynamoDBService.paginate_tenant(table_name, tenant_id, **kwargs)]
@@ -0,0 +1,157 @@
+"""Background BatchWriteItem writer for fire-and-forget DynamoDB puts"""
+import queue
+import random
+import threading
+import time
+from typing import Dict, Any, List, Optional
+from backend.config.settings import get_settings
+from backend.database import dynamodb_resource, TABLES
+from backend.services.dynamodb_service import to_dynamodb
+
+settings = get_settings()
+
+MAX_BATCH_SIZE = 25  # DynamoDB BatchWriteItem limit
+
+
+class DynamoBatchWriter:
+    """Queue items and write them in 25-item BatchWriteItem calls from a daemon thread.
+
+    A batch is flushed when it is full or flush_interval seconds after its
+    first item arrived. UnprocessedItems (and throttling errors) are retried
+    with exponential backoff and jitter; stop() drains the queue.
+    """
+
+    def __init__(
+        self,
+        table_name: str,
+        resource=None,
+        flush_interval: float = 0.5,
+        max_queue: int = 10000,
+        max_retries: int = 8
+    ):
+        self.table_name = table_name
+        self.resource = resource or dynamodb_resource
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {'submitted': 0, 'written': 0, 'batches': 0, 'retries': 0, 'failed': 0, 'rejected': 0}
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name=f"batch-writer-{self.table_name}", daemon=True)
+                self._thread.start()
+
+    def submit(self, item: Dict[str, Any]) -> bool:
+        """Queue an item without blocking; False if the queue is full"""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(to_dynamodb(item))
+        except queue.Full:
+            with self._lock:
+                self._stats['rejected'] += 1
+            return False
+        with self._lock:
+            self._stats['submitted'] += 1
+        return True
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            try:
+                batch = [self._queue.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < MAX_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))
+                    elif self._stopping.is_set():
+                        # Draining: fill batches with whatever is already queued
+                        batch.append(self._queue.get_nowait())
+                    else:
+                        break
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, items: List[Dict[str, Any]]):
+        requests = [{'PutRequest': {'Item': item}} for item in items]
+        attempt = 0
+        while requests:
+            try:
+                response = self.resource.batch_write_item(RequestItems={self.table_name: requests})
+                written = len(requests)
+                requests = response.get('UnprocessedItems', {}).get(self.table_name, [])
+                with self._lock:
+                    self._stats['written'] += written - len(requests)
+                    if attempt == 0:
+                        self._stats['batches'] += 1
+            except Exception as e:
+                print(f"Error batch writing to {self.table_name}: {e}")
+            if not requests:
+                return
+            attempt += 1
+            if attempt > self.max_retries:
+                with self._lock:
+                    self._stats['failed'] += len(requests)
+                print(f"Giving up on {len(requests)} items for {self.table_name} after {self.max_retries} retries")
+                return
+            with self._lock:
+                self._stats['retries'] += 1
+            time.sleep(min(5.0, 0.05 * 2 ** attempt) * random.uniform(0.5, 1.0))
+
+    def flush(self):
+        """Block until everything queued so far has been written (or given up on)"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def stop(self, timeout: float = 10.0):
+        """Drain the queue and stop the writer thread"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, 'queued': self._queue.qsize()}
+
+
+batch_writers: Dict[str, DynamoBatchWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_batch_writer(table_name: str) -> DynamoBatchWriter:
+    """Shared writer for a table (by TABLES key or full name)"""
+    with _writers_lock:
+        writer = batch_writers.get(table_name)
+        if writer is None:
+            writer = batch_writers[table_name] = DynamoBatchWriter(
+                TABLES.get(table_name, table_name),
+                flush_interval=settings.batch_writer_flush_ms / 1000,
+                max_queue=settings.batch_writer_max_queue
+            )
+        return writer
+
+
+def stop_batch_writers(timeout: float = 10.0):
+    """Drain every writer (called on application shutdown)"""
+    with _writers_lock:
+        writers = list(batch_writers.values())
+    for writer in writers:
+        writer.stop(timeout)
+
+
+def batch_writer_stats() -> Dict[str, Dict[str, Any]]:
+    with _writers_lock:
+        writers = dict(batch_writers)
+    return {name: writer.stats() for name, writer in writers.items()}
@@ -0,0 +1,122 @@
+"""Document chunking for retrieval"""
+import re
+from typing import Dict, Any, List, Optional
+
+WORD_PATTERN = re.compile(r"\S+")
+HEADING_PATTERN = re.compile(r"^(#{1,6})[ \t]+(.+?)[ \t]*#*[ \t]*$", re.MULTILINE)
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def _make_chunk(text: str, start: int, end: int, heading: Optional[str] = None) -> Dict[str, Any]:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return {
+        'text': text[start:end],
+        'start': start,
+        'end': end,
+        'heading': heading
+    }
+
+
+def validate_window(chunk_size: int, overlap: int):
+    """Reject sizes under which windows could not advance (or would repeat most words)"""
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, got {chunk_size}")
+    if not 0 <= overlap < chunk_size:
+        raise ValueError(f"chunk overlap must be between 0 and chunk_size - 1 ({chunk_size - 1}), got {overlap}")
+
+
+def _windows(text: str, start: int, end: int, chunk_size: int, overlap: int, heading: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Sliding word windows over text[start:end], keeping character offsets"""
+    words = [(m.start(), m.end()) for m in WORD_PATTERN.finditer(text, start, end)]
+    if not words:
+        return []
+    step = max(1, chunk_size - overlap)
+    chunks = []
+    for first in range(0, len(words), step):
+        window = words[first:first + chunk_size]
+        chunks.append(_make_chunk(text, window[0][0], window[-1][1], heading))
+        if first + chunk_size >= len(words):
+            break
+    return chunks
+
+
+def chunk_tokens(text: str, chunk_size: int = 200, overlap: int = 40) -> List[Dict[str, Any]]:
+    """Fixed-size word windows with overlap"""
+    validate_window(chunk_size, overlap)
+    return _windows(text, 0, len(text), chunk_size, overlap)
+
+
+def chunk_markdown(text: str, chunk_size: int = 200, overlap: int = 40) -> List[Dict[str, Any]]:
+    """Split on headings, then pack whole paragraphs up to chunk_size words.
+
+    Paragraphs longer than chunk_size fall back to overlapping word windows.
+    Heading lines are not part of the chunk text; each chunk records the
+    heading of the section it came from instead.
+    """
+    validate_window(chunk_size, overlap)
+    sections = []
+    headings = list(HEADING_PATTERN.finditer(text))
+    if not headings or headings[0].start() > 0:
+        sections.append((0, headings[0].start() if headings else len(text), None))
+    for i, match in enumerate(headings):
+        section_end = headings[i + 1].start() if i + 1 < len(headings) else len(text)
+        sections.append((match.end(), section_end, match.group(2)))
+
+    chunks = []
+    for section_start, section_end, heading in sections:
+        # Paragraph spans within the section
+        paragraphs = []
+        cursor = section_start
+        for brk in PARAGRAPH_BREAK.finditer(text, section_start, section_end):
+            paragraphs.append((cursor, brk.start()))
+            cursor = brk.end()
+        paragraphs.append((cursor, section_end))
+
+        pending_start, pending_end, pending_words = None, None, 0
+        for para_start, para_end in paragraphs:
+            words = len(WORD_PATTERN.findall(text, para_start, para_end))
+            if words == 0:
+                continue
+            if words > chunk_size:
+                if pending_start is not None:
+                    chunks.append(_make_chunk(text, pending_start, pending_end, heading))
+                    pending_start, pending_words = None, 0
+                chunks.extend(_windows(text, para_start, para_end, chunk_size, overlap, heading))
+                continue
+            if pending_start is not None and pending_words + words > chunk_size:
+                chunks.append(_make_chunk(text, pending_start, pending_end, heading))
+                pending_start, pending_words = None, 0
+            if pending_start is None:
+                pending_start = para_start
+            pending_end = para_end
+            pending_words += words
+        if pending_start is not None:
+            chunks.append(_make_chunk(text, pending_start, pending_end, heading))
+    return chunks
+
+
+def chunk_document(
+    text: str,
+    strategy: str = 'auto',
+    chunk_size: int = 200,
+    overlap: int = 40,
+    filename: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Chunk a document with the given strategy (auto, tokens or markdown).
+
+    ``auto`` uses the Markdown chunker for .md files or text with headings.
+    Returns dicts with index, text, start/end character offsets and heading.
+    """
+    if strategy == 'auto':
+        is_markdown = (filename or '').lower().endswith(('.md', '.markdown')) or HEADING_PATTERN.search(text)
+        strategy = 'markdown' if is_markdown else 'tokens'
+    if strategy == 'markdown':
+        chunks = chunk_markdown(text, chunk_size, overlap)
+    else:
+        chunks = chunk_tokens(text, chunk_size, overlap)
+    for index, chunk in enumerate(chunks):
+        chunk['index'] = index
+    return chunks
@@ -0,0 +1,226 @@
+"""Circuit breakers for external dependencies (OpenAI, Bedrock, Pinecone)"""
+import functools
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+from backend.config.settings import get_settings
+from backend.services.rate_limiter import RateLimitTimeout
+
+settings = get_settings()
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+# Our own admission control timing out says nothing about the dependency's health
+IGNORED_EXCEPTIONS = (RateLimitTimeout,)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose breaker is open"""
+
+
+class CircuitBreaker:
+    """Closed -> open when the recent failure or slow-call rate crosses a threshold.
+
+    Rates are computed over calls in the last window_seconds once at least
+    minimum_calls were made. After open_seconds the breaker lets
+    half_open_max_calls probe calls through: one success closes it, a
+    failure re-opens it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        slow_call_ms: Optional[float] = None,
+        slow_call_rate_threshold: float = 0.8,
+        minimum_calls: int = 10,
+        window_seconds: float = 60,
+        open_seconds: float = 30,
+        half_open_max_calls: int = 1
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_ms = slow_call_ms
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self._calls = deque()  # (timestamp, failed, slow)
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._lock = threading.Lock()
+        self._stats = {'rejected': 0, 'opened': 0}
+
+    @property
+    def is_open(self) -> bool:
+        """Calls would be rejected right now (cheap, does not start a probe)"""
+        return self.state == OPEN and time.monotonic() - self._opened_at < self.open_seconds
+
+    def allow(self) -> bool:
+        """Whether a call may proceed; moves open -> half-open after the cool-down"""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    self._stats['rejected'] += 1
+                    return False
+                self.state, self._half_open_calls = HALF_OPEN, 0
+            if self.state == HALF_OPEN:
+                if self._half_open_calls >= self.half_open_max_calls:
+                    self._stats['rejected'] += 1
+                    return False
+                self._half_open_calls += 1
+            return True
+
+    def _open(self, now: float):
+        self.state, self._opened_at = OPEN, now
+        self._stats['opened'] += 1
+
+    def record(self, failed: bool, latency_ms: Optional[float] = None):
+        now = time.monotonic()
+        slow = self.slow_call_ms is not None and latency_ms is not None and latency_ms > self.slow_call_ms
+        with self._lock:
+            if self.state == HALF_OPEN:
+                if failed or slow:
+                    self._open(now)
+                else:
+                    self.state = CLOSED
+                    self._calls.clear()
+                return
+            self._calls.append((now, failed, slow))
+            while self._calls and self._calls[0][0] < now - self.window_seconds:
+                self._calls.popleft()
+            if self.state == CLOSED and len(self._calls) >= self.minimum_calls:
+                failures = sum(1 for _, call_failed, _ in self._calls if call_failed)
+                slow_calls = sum(1 for _, _, call_slow in self._calls if call_slow)
+                if (failures / len(self._calls) >= self.failure_rate_threshold
+                        or slow_calls / len(self._calls) >= self.slow_call_rate_threshold):
+                    self._open(now)
+                    self._calls.clear()
+
+    def _release_probe(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._half_open_calls = max(0, self._half_open_calls - 1)
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """Run func through the breaker (raises CircuitOpenError when open)"""
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit '{self.name}' is open")
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except IGNORED_EXCEPTIONS:
+            self._release_probe()
+            raise
+        except Exception:
+            self.record(True, (time.perf_counter() - start) * 1000)
+            raise
+        self.record(False, (time.perf_counter() - start) * 1000)
+        return result
+
+    def stream(self, func: Callable, *args, **kwargs):
+        """Generator variant of call(); stream duration is not treated as latency"""
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit '{self.name}' is open")
+        try:
+            yield from func(*args, **kwargs)
+        except (GeneratorExit,) + IGNORED_EXCEPTIONS:
+            # Consumer stopped early or admission timed out: no verdict on the dependency
+            self._release_probe()
+            raise
+        except Exception:
+            self.record(True)
+            raise
+        self.record(False)
+
+    def reset(self):
+        with self._lock:
+            self.state = CLOSED
+            self._calls.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            recent = [call for call in self._calls if call[0] >= now - self.window_seconds]
+            return {
+                'state': self.state,
+                'recent_calls': len(recent),
+                'recent_failures': sum(1 for _, failed, _ in recent if failed),
+                'recent_slow_calls': sum(1 for _, _, slow in recent if slow),
+                'retry_in_seconds': round(max(0.0, self.open_seconds - (now - self._opened_at)), 2) if self.state == OPEN else 0.0,
+                'slow_call_ms': self.slow_call_ms,
+                **self._stats
+            }
+
+
+# Slow-call threshold per dependency
+SLOW_CALL_MS = {
+    'openai-chat': settings.circuit_llm_slow_call_ms,
+    'bedrock-chat': settings.circuit_llm_slow_call_ms,
+    'openai-embeddings': settings.circuit_embedding_slow_call_ms,
+    'bedrock-embeddings': settings.circuit_embedding_slow_call_ms,
+    'pinecone': settings.circuit_vector_slow_call_ms,
+}
+
+breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> Optional[CircuitBreaker]:
+    """Shared breaker for a dependency (None when circuit breaking is disabled)"""
+    if not settings.circuit_breaker_enabled:
+        return None
+    with _breakers_lock:
+        breaker = breakers.get(name)
+        if breaker is None:
+            breaker = breakers[name] = CircuitBreaker(
+                name,
+                failure_rate_threshold=settings.circuit_failure_rate_threshold,
+                slow_call_ms=SLOW_CALL_MS.get(name),
+                slow_call_rate_threshold=settings.circuit_slow_call_rate_threshold,
+                minimum_calls=settings.circuit_minimum_calls,
+                window_seconds=settings.circuit_window_seconds,
+                open_seconds=settings.circuit_open_seconds
+            )
+        return breaker
+
+
+def circuit(name: str):
+    """Decorator routing calls through the named breaker"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            breaker = get_breaker(name)
+            if breaker is None:
+                return func(*args, **kwargs)
+            return breaker.call(func, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def circuit_stream(name: str):
+    """Decorator routing a generator through the named breaker"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            breaker = get_breaker(name)
+            if breaker is None:
+                return func(*args, **kwargs)
+            return breaker.stream(func, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def is_open(name: str) -> bool:
+    breaker = get_breaker(name)
+    return breaker is not None and breaker.is_open
+
+
+def breaker_stats() -> Dict[str, Dict[str, Any]]:
+    """State and recent outcome counts per dependency"""
+    with _breakers_lock:
+        current = list(breakers.values())
+    return {breaker.name: breaker.stats() for breaker in current}
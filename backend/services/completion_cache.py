@@ -0,0 +1,143 @@
+"""LLM completion cache (in-memory LRU + optional shared SQLite tier)"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+
+class CompletionCache:
+    """Cache completions by (provider, model, prompt hash, max_tokens, temperature).
+
+    Entries expire after ttl_seconds. The SQLite tier (WAL mode) is shared
+    by every worker on the host and is pruned to max_entries, oldest first.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        ttl_seconds: float = 3600,
+        max_entries: int = 50000,
+        memory_entries: int = 1000
+    ):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._conn_pid = None
+        self._writes_since_prune = 0
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+
+    @staticmethod
+    def make_key(provider: str, model: str, prompt: str, max_tokens: int, temperature: float) -> str:
+        prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        return f"{provider}:{model}:{max_tokens}:{temperature}:{prompt_hash}"
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """Per-process SQLite connection (re-opened after a fork)"""
+        if not self.db_path:
+            return None
+        if self._conn is None or self._conn_pid != os.getpid():
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS completions ("
+                "key TEXT PRIMARY KEY, completion TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS completions_created_at ON completions (created_at)")
+            self._conn, self._conn_pid = conn, os.getpid()
+        return self._conn
+
+    def _remember(self, key: str, completion: str, created_at: float):
+        self._memory[key] = (completion, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, provider: str, model: str, prompt: str, max_tokens: int, temperature: float) -> Optional[str]:
+        """Unexpired cached completion, or None"""
+        key = self.make_key(provider, model, prompt, max_tokens, temperature)
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[1] >= cutoff:
+                self._memory.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return entry[0]
+            try:
+                conn = self._connection()
+                if conn is not None:
+                    row = conn.execute(
+                        "SELECT completion, created_at FROM completions WHERE key = ? AND created_at >= ?",
+                        (key, cutoff)
+                    ).fetchone()
+                    if row is not None:
+                        self._remember(key, row[0], row[1])
+                        self._stats['disk_hits'] += 1
+                        return row[0]
+            except Exception as e:
+                print(f"Error reading completion cache: {e}")
+            self._stats['misses'] += 1
+            return None
+
+    def put(self, provider: str, model: str, prompt: str, max_tokens: int, temperature: float, completion: str):
+        """Store a completion in both tiers"""
+        key = self.make_key(provider, model, prompt, max_tokens, temperature)
+        now = time.time()
+        with self._lock:
+            self._remember(key, completion, now)
+            self._stats['writes'] += 1
+            try:
+                conn = self._connection()
+                if conn is not None:
+                    with conn:
+                        conn.execute(
+                            "INSERT OR REPLACE INTO completions (key, completion, created_at) VALUES (?, ?, ?)",
+                            (key, completion, now)
+                        )
+                    self._writes_since_prune += 1
+                    if self._writes_since_prune >= 500:
+                        self._prune(conn)
+            except Exception as e:
+                print(f"Error writing completion cache: {e}")
+
+    def _prune(self, conn: sqlite3.Connection):
+        """Drop expired entries, then the oldest beyond max_entries"""
+        self._writes_since_prune = 0
+        with conn:
+            expired = conn.execute(
+                "DELETE FROM completions WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,)
+            ).rowcount
+            (count,) = conn.execute("SELECT COUNT(*) FROM completions").fetchone()
+            overflow = max(0, count - self.max_entries)
+            if overflow:
+                conn.execute(
+                    "DELETE FROM completions WHERE key IN "
+                    "(SELECT key FROM completions ORDER BY created_at LIMIT ?)",
+                    (overflow,)
+                )
+        self._stats['evictions'] += expired + overflow
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters"""
+        with self._lock:
+            hits = self._stats['memory_hits'] + self._stats['disk_hits']
+            lookups = hits + self._stats['misses']
+            return {
+                **self._stats,
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'ttl_seconds': self.ttl_seconds,
+                'max_entries': self.max_entries,
+                'disk_path': self.db_path
+            }
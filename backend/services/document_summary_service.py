@@ -0,0 +1,97 @@
+"""Document summaries: small sidecar items for listing the knowledge base"""
+import time
+from typing import Dict, Any, List, Optional, Set, Tuple
+from backend.database import get_table
+from backend.services.dynamodb_service import DynamoDBService
+
+PREVIEW_LENGTH = 100
+
+# Every attribute a listing needs except the body
+SUMMARY_ATTRIBUTES = ('id', 'tenant_id', 'title', 'doc_type', 'upload_date', 'tags')
+
+# Tenants whose pre-existing documents have been backfilled by this process
+_backfilled: Set[str] = set()
+
+
+def _preview(content: str) -> str:
+    return content[:PREVIEW_LENGTH] + "..." if len(content) > PREVIEW_LENGTH else content
+
+
+def summary_item(document: Dict[str, Any]) -> Dict[str, Any]:
+    """document_summaries item for a documents item"""
+    content = document.get('content', '')
+    summary = {attribute: document[attribute] for attribute in SUMMARY_ATTRIBUTES if attribute in document}
+    summary['preview'] = _preview(content)
+    summary['content_length'] = len(content)
+    return summary
+
+
+class DocumentSummaryService:
+    """Keeps document_summaries in step with documents and lists from it.
+
+    The documents tenant-id-index projects ALL attributes, so listing
+    through it reads every body. Summaries hold the metadata plus a
+    precomputed preview, so listing a page costs kilobytes.
+    """
+
+    @staticmethod
+    def put(document: Dict[str, Any]):
+        get_table('document_summaries').put_item(Item=summary_item(document))
+
+    @staticmethod
+    def delete(document_id: str):
+        get_table('document_summaries').delete_item(Key={'id': document_id})
+
+    @staticmethod
+    def backfill(tenant_id: str) -> int:
+        """Write summaries for a tenant's documents; returns how many were written"""
+        written = 0
+        with get_table('document_summaries').batch_writer() as batch:
+            for document in DynamoDBService.paginate_tenant('documents', tenant_id, page_size=100):
+                batch.put_item(Item=summary_item(document))
+                written += 1
+        return written
+
+    @staticmethod
+    def ensure_backfilled(tenant_id: str):
+        """Backfill documents stored before summaries existed, once per tenant.
+
+        Completion is recorded in a marker item without a tenant_id, which
+        keeps it out of the tenant-id-index listings.
+        """
+        if tenant_id in _backfilled:
+            return
+        table = get_table('document_summaries')
+        marker = {'id': f"backfill#{tenant_id}"}
+        if 'Item' not in table.get_item(Key=marker):
+            DocumentSummaryService.backfill(tenant_id)
+            table.put_item(Item={**marker, 'completed_at': int(time.time())})
+        _backfilled.add(tenant_id)
+
+    @staticmethod
+    def pending_embeddings(tenant_id: str) -> int:
+        """How many of the tenant's documents are flagged needs_embedding (kept in a marker item)"""
+        item = get_table('document_summaries').get_item(Key={'id': f"reembed#{tenant_id}"}).get('Item')
+        return int(item.get('pending', 0)) if item else 0
+
+    @staticmethod
+    def count_pending_embeddings(tenant_id: str, delta: int):
+        """Adjust the needs_embedding count as documents are flagged, re-embedded or deleted"""
+        get_table('document_summaries').update_item(
+            Key={'id': f"reembed#{tenant_id}"},
+            UpdateExpression='ADD pending :delta',
+            ExpressionAttributeValues={':delta': delta}
+        )
+
+    @staticmethod
+    def page(tenant_id: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """A page of a tenant's summaries: (items, next_cursor)"""
+        DocumentSummaryService.ensure_backfilled(tenant_id)
+        return DynamoDBService.page(
+            'document_summaries',
+            limit,
+            cursor,
+            IndexName='tenant-id-index',
+            KeyConditionExpression='tenant_id = :tenant_id',
+            ExpressionAttributeValues={':tenant_id': tenant_id}
+        )
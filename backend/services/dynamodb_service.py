@@ -1,9 +1,75 @@
 """DynamoDB service wrapper for common operations"""
-from typing import Dict, Any, List, Optional
+import base64
+import binascii
+import json
+from decimal import Decimal
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from backend.database import get_table, dynamodb_client
 from botocore.exceptions import ClientError
 
 
+def to_dynamodb(value: Any) -> Any:
+    """Convert floats (at any depth) to Decimal, which is all boto3 accepts for numbers"""
+    if isinstance(value, float):
+        return Decimal(str(value))
+    if isinstance(value, dict):
+        return {key: to_dynamodb(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_dynamodb(item) for item in value]
+    return value
+
+
+def _json_number(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, set):
+        return sorted(value)
+    raise TypeError(f"Cannot encode {type(value).__name__} as JSON")
+
+
+def to_json(value: Any) -> str:
+    """Serialise DynamoDB items (Decimal numbers) to compact JSON"""
+    return json.dumps(value, separators=(',', ':'), default=_json_number)
+
+
+def from_json(text: str) -> Any:
+    """Inverse of to_json: numbers come back as Decimal, like boto3 returns them"""
+    return json.loads(text, parse_float=Decimal, parse_int=Decimal)
+
+
+def encode_cursor(last_evaluated_key: Dict[str, Any], fallback: bool = False) -> str:
+    """Opaque, URL-safe cursor for a LastEvaluatedKey.
+
+    `fallback` records that the page came from the scan fallback, so the
+    next page is read the same way.
+    """
+    payload = to_json({'k': last_evaluated_key, 's': int(fallback)})
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[Dict[str, Any], bool]:
+    """(ExclusiveStartKey, fallback) for a cursor; ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = from_json(raw)
+        key, fallback = payload['k'], bool(payload.get('s'))
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}") from e
+    if not isinstance(key, dict):
+        raise ValueError("Invalid cursor")
+    return key, fallback
+
+
+def _scan_kwargs(query_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn query arguments into the equivalent filtered scan"""
+    kwargs = {k: v for k, v in query_kwargs.items() if k not in ('IndexName', 'ScanIndexForward', 'KeyConditionExpression')}
+    condition = query_kwargs['KeyConditionExpression']
+    if 'FilterExpression' in kwargs:
+        condition = f"({condition}) AND ({kwargs['FilterExpression']})"
+    kwargs['FilterExpression'] = condition
+    return kwargs
+
+
 class DynamoDBService:
     """Service wrapper for DynamoDB operations"""
     
@@ -130,4 +196,103 @@ class DynamoDBService:
         except ClientError as e:
             print(f"Error batch writing to {table_name}: {e}")
             return False
-
+    
+    @staticmethod
+    def _read(table, operation: str, fallback: bool, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        if operation == 'scan':
+            return table.scan(**kwargs)
+        if fallback:
+            return table.scan(**_scan_kwargs(kwargs))
+        return table.query(**kwargs)
+    
+    @staticmethod
+    def _read_with_fallback(table, operation: str, fallback: bool, kwargs: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """Read one page; the first query that fails is retried as a filtered scan"""
+        try:
+            return DynamoDBService._read(table, operation, fallback, kwargs), fallback
+        except Exception:
+            # Fallback to scan if the GSI doesn't exist yet
+            if operation != 'query' or fallback or 'ExclusiveStartKey' in kwargs:
+                raise
+            return DynamoDBService._read(table, operation, True, kwargs), True
+    
+    @staticmethod
+    def page(
+        table_name: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        operation: str = 'query',
+        **kwargs
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of a query or scan: (items, next_cursor), next_cursor None on the last page.
+        
+        kwargs are table.query()/table.scan() arguments. A query that fails
+        (e.g. the GSI does not exist yet) is retried as a scan filtered on
+        the key condition. Never returns more than `limit` items; filtered
+        pages may return fewer while a cursor remains. Errors are raised.
+        """
+        table = get_table(table_name)
+        start_key, fallback = decode_cursor(cursor) if cursor else (None, False)
+        items: List[Dict[str, Any]] = []
+        while len(items) < limit:
+            # Never ask for more than is left, so LastEvaluatedKey is exactly where this page stops
+            request = {**kwargs, 'Limit': limit - len(items)}
+            if start_key:
+                request['ExclusiveStartKey'] = start_key
+            response, fallback = DynamoDBService._read_with_fallback(table, operation, fallback, request)
+            items.extend(response.get('Items', []))
+            start_key = response.get('LastEvaluatedKey')
+            if not start_key:
+                break
+        return items, encode_cursor(start_key, fallback) if start_key else None
+    
+    @staticmethod
+    def pages(
+        table_name: str,
+        operation: str = 'query',
+        page_size: Optional[int] = None,
+        **kwargs
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Yield the items of each DynamoDB page of a query or scan, following LastEvaluatedKey.
+        
+        Only one page (1 MB, or page_size items) is held at a time. Falls
+        back from query to scan like page().
+        """
+        table = get_table(table_name)
+        start_key, fallback = None, False
+        while True:
+            request = dict(kwargs)
+            if page_size:
+                request['Limit'] = page_size
+            if start_key:
+                request['ExclusiveStartKey'] = start_key
+            response, fallback = DynamoDBService._read_with_fallback(table, operation, fallback, request)
+            yield response.get('Items', [])
+            start_key = response.get('LastEvaluatedKey')
+            if not start_key:
+                return
+    
+    @staticmethod
+    def paginate(
+        table_name: str,
+        operation: str = 'query',
+        page_size: Optional[int] = None,
+        **kwargs
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield every item a query or scan matches (see pages())"""
+        for items in DynamoDBService.pages(table_name, operation, page_size, **kwargs):
+            yield from items
+    
+    @staticmethod
+    def tenant_query(tenant_id: str) -> Dict[str, Any]:
+        """Query arguments selecting a tenant's items via the tenant-id-index GSI"""
+        return {
+            'IndexName': 'tenant-id-index',
+            'KeyConditionExpression': 'tenant_id = :tenant_id',
+            'ExpressionAttributeValues': {':tenant_id': tenant_id}
+        }
+    
+    @staticmethod
+    def paginate_tenant(table_name: str, tenant_id: str, **kwargs) -> Iterator[Dict[str, Any]]:
+        """Yield every item of a tenant via the table's tenant-id-index GSI"""
+        return DynamoDBService.paginate(table_name, **DynamoDBService.tenant_query(tenant_id), **kwargs)
@@ -0,0 +1,150 @@
+"""Content-addressed embedding cache (in-memory LRU + optional SQLite tier)"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+import numpy as np
+
+
+class EmbeddingCache:
+    """Cache embeddings by (model id, sha256 of text).
+
+    The memory tier is a bounded LRU per process. The optional SQLite tier
+    (WAL mode) is shared by every worker on the host, so a text embedded by
+    one uvicorn worker is a disk hit for the others.
+    """
+
+    def __init__(self, max_entries: int = 10000, db_path: Optional[str] = None, disk_max_entries: int = 200000):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.disk_max_entries = disk_max_entries
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._conn_pid = None
+        self._writes_since_prune = 0
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'writes': 0}
+
+    @staticmethod
+    def make_key(model_id: str, text: str) -> str:
+        return f"{model_id}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """Per-process SQLite connection (re-opened after a fork)"""
+        if not self.db_path:
+            return None
+        if self._conn is None or self._conn_pid != os.getpid():
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn, self._conn_pid = conn, os.getpid()
+        return self._conn
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, model_id: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Cached embeddings in input order (None for misses)"""
+        keys = [self.make_key(model_id, text) for text in texts]
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        with self._lock:
+            pending = {}
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    results[i] = vector
+                    self._stats['memory_hits'] += 1
+                else:
+                    pending.setdefault(key, []).append(i)
+
+            if pending:
+                try:
+                    conn = self._connection()
+                    if conn is not None:
+                        pending_keys = list(pending)
+                        for start in range(0, len(pending_keys), 500):
+                            batch = pending_keys[start:start + 500]
+                            rows = conn.execute(
+                                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                                batch
+                            ).fetchall()
+                            for key, blob in rows:
+                                vector = np.frombuffer(blob, dtype=np.float32)
+                                self._remember(key, vector)
+                                for i in pending.pop(key):
+                                    results[i] = vector
+                                    self._stats['disk_hits'] += 1
+                except Exception as e:
+                    print(f"Error reading embedding cache: {e}")
+            self._stats['misses'] += sum(len(indexes) for indexes in pending.values())
+        return [vector.tolist() if vector is not None else None for vector in results]
+
+    def get(self, model_id: str, text: str) -> Optional[List[float]]:
+        return self.get_many(model_id, [text])[0]
+
+    def put_many(self, model_id: str, texts: List[str], embeddings: List[List[float]]):
+        """Store embeddings in both tiers"""
+        entries = [
+            (self.make_key(model_id, text), np.asarray(embedding, dtype=np.float32))
+            for text, embedding in zip(texts, embeddings)
+        ]
+        with self._lock:
+            for key, vector in entries:
+                self._remember(key, vector)
+            self._stats['writes'] += len(entries)
+            try:
+                conn = self._connection()
+                if conn is not None:
+                    now = time.time()
+                    with conn:
+                        conn.executemany(
+                            "INSERT OR REPLACE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                            [(key, vector.tobytes(), now) for key, vector in entries]
+                        )
+                    self._writes_since_prune += len(entries)
+                    if self._writes_since_prune >= 1000:
+                        self._prune(conn)
+            except Exception as e:
+                print(f"Error writing embedding cache: {e}")
+
+    def put(self, model_id: str, text: str, embedding: List[float]):
+        self.put_many(model_id, [text], [embedding])
+
+    def _prune(self, conn: sqlite3.Connection):
+        """Drop the oldest disk entries beyond disk_max_entries"""
+        self._writes_since_prune = 0
+        (count,) = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        if count > self.disk_max_entries:
+            with conn:
+                conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY created_at LIMIT ?)",
+                    (count - self.disk_max_entries,)
+                )
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters"""
+        with self._lock:
+            lookups = self._stats['memory_hits'] + self._stats['disk_hits'] + self._stats['misses']
+            hits = self._stats['memory_hits'] + self._stats['disk_hits']
+            return {
+                **self._stats,
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'max_entries': self.max_entries,
+                'disk_path': self.db_path
+            }
@@ -0,0 +1,407 @@
+"""BM25 inverted index for keyword retrieval"""
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from botocore.exceptions import ClientError
+
+# Cross-process locking of shared index files (POSIX)
+FCNTL_AVAILABLE = False
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    pass
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# How long an S3 object's ETag is trusted by readers before it is checked again
+S3_STAMP_TTL_SECONDS = 5.0
+
+# Conditional S3 writes that lost to another worker's save are re-applied this often
+MAX_UPDATE_ATTEMPTS = 5
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class TenantKeywordIndex:
+    """Term -> {doc key: term frequency} postings for one tenant"""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.doc_lengths: Dict[str, int] = {}
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, doc_key: str, text: str, metadata: Dict[str, Any]):
+        """Index (or re-index) a document"""
+        self.remove(doc_key)
+        term_counts = Counter(tokenize(text))
+        for term, tf in term_counts.items():
+            self.postings[term][doc_key] = tf
+        length = sum(term_counts.values())
+        self.doc_lengths[doc_key] = length
+        self.documents[doc_key] = {**metadata, 'terms': list(term_counts)}
+        self.total_length += length
+
+    def remove(self, doc_key: str) -> bool:
+        """Drop a document's postings"""
+        document = self.documents.pop(doc_key, None)
+        if document is None:
+            return False
+        for term in document.get('terms', []):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(doc_key, None)
+                if not postings:
+                    del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(doc_key, 0)
+        return True
+
+    def search(self, query: str, top_k: int = 3, k1: float = 1.2, b: float = 0.75) -> List[Dict[str, Any]]:
+        """Score documents containing any query term with Okapi BM25"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        doc_count = len(self.doc_lengths)
+        if not terms or doc_count == 0:
+            return []
+        avg_length = self.total_length / doc_count or 1.0
+
+        scores: Dict[str, float] = defaultdict(float)
+        matched: Dict[str, int] = defaultdict(int)
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_key, tf in postings.items():
+                norm = k1 * (1 - b + b * self.doc_lengths[doc_key] / avg_length)
+                scores[doc_key] += idf * tf * (k1 + 1) / (tf + norm)
+                matched[doc_key] += 1
+
+        top = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [
+            {
+                'key': doc_key,
+                'score': score,
+                'matched_terms': matched[doc_key],
+                'query_terms': len(terms),
+                'metadata': self.documents[doc_key]
+            }
+            for doc_key, score in top
+        ]
+
+    def copy(self) -> 'TenantKeywordIndex':
+        """Independent copy to apply changes to (published indexes are never mutated)"""
+        index = TenantKeywordIndex()
+        index.postings = defaultdict(dict, {term: dict(postings) for term, postings in self.postings.items()})
+        index.doc_lengths = dict(self.doc_lengths)
+        index.documents = dict(self.documents)
+        index.total_length = self.total_length
+        return index
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            'documents': self.documents,
+            'postings': self.postings,
+            'doc_lengths': self.doc_lengths
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'TenantKeywordIndex':
+        index = cls()
+        index.documents = state.get('documents', {})
+        index.postings = defaultdict(dict, state.get('postings', {}))
+        index.doc_lengths = state.get('doc_lengths', {})
+        index.total_length = sum(index.doc_lengths.values())
+        return index
+
+
+class KeywordIndex:
+    """Per-tenant BM25 indexes persisted to local disk or S3
+
+    A tenant's stored index is identified by a stamp: (inode, mtime_ns,
+    size) of the JSON file on disk, or the object's ETag on S3. An index
+    whose stamp changed since it was loaded was rewritten by another
+    worker and is reloaded; the stamp is also the tenant's version, so
+    every worker sees the same one. Without storage the index lives in
+    this process only and a local counter serves as the version.
+
+    Changes go through update(), which applies them to a copy of the
+    latest stored index and publishes the copy once it is saved. On disk
+    an flock on the tenant's lock file serialises writers across
+    processes; on S3 the put is conditional on the ETag the copy was read
+    at, and a lost race is re-applied to the newer index. Searches use
+    the published index without waiting for writers or storage I/O.
+    """
+
+    def __init__(
+        self,
+        storage_dir: Optional[str] = None,
+        s3_client=None,
+        s3_bucket: Optional[str] = None,
+        s3_prefix: Optional[str] = None,
+        k1: float = 1.2,
+        b: float = 0.75
+    ):
+        self.storage_dir = storage_dir
+        self.s3_client = s3_client
+        self.s3_bucket = s3_bucket
+        self.s3_prefix = s3_prefix
+        self.k1 = k1
+        self.b = b
+        self._indexes: Dict[str, TenantKeywordIndex] = {}
+        self._loaded_stamps: Dict[str, Any] = {}
+        self._s3_stamps: Dict[str, tuple] = {}  # tenant -> (etag, checked at)
+        self._versions: Dict[str, int] = defaultdict(int)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._write_locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        if self.storage_dir:
+            os.makedirs(self.storage_dir, exist_ok=True)
+
+    @property
+    def use_s3(self) -> bool:
+        return bool(self.s3_client and self.s3_bucket and self.s3_prefix)
+
+    def _safe_name(self, tenant_id: str) -> str:
+        return re.sub(r'[^A-Za-z0-9_.-]', '_', tenant_id)
+
+    def _path(self, tenant_id: str) -> str:
+        return os.path.join(self.storage_dir, f"{self._safe_name(tenant_id)}.json")
+
+    def _s3_key(self, tenant_id: str) -> str:
+        return f"{self.s3_prefix.rstrip('/')}/{tenant_id}.json"
+
+    def _lock(self, tenant_id: str) -> threading.Lock:
+        """Guards the tenant's published index and stamp (held only for dict updates)"""
+        with self._locks_guard:
+            lock = self._locks.get(tenant_id)
+            if lock is None:
+                lock = self._locks[tenant_id] = threading.Lock()
+            return lock
+
+    @contextmanager
+    def _writer(self, tenant_id: str):
+        """One writer per tenant: in this process, and across processes for disk storage"""
+        with self._locks_guard:
+            lock = self._write_locks.get(tenant_id)
+            if lock is None:
+                lock = self._write_locks[tenant_id] = threading.Lock()
+        with lock:
+            lock_file = None
+            if self.storage_dir and not self.use_s3 and FCNTL_AVAILABLE:
+                lock_file = open(os.path.join(self.storage_dir, f"{self._safe_name(tenant_id)}.lock"), 'a')
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if lock_file is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    lock_file.close()
+
+    def _stamp(self, tenant_id: str, max_age: float = S3_STAMP_TTL_SECONDS):
+        """Identity of the tenant's stored index (None when nothing is stored)"""
+        if self.use_s3:
+            etag, checked_at = self._s3_stamps.get(tenant_id, (None, 0.0))
+            if time.monotonic() - checked_at < max_age:
+                return etag
+            try:
+                etag = self.s3_client.head_object(Bucket=self.s3_bucket, Key=self._s3_key(tenant_id))['ETag']
+            except Exception as e:
+                if '404' not in str(e) and 'NotFound' not in str(e):
+                    print(f"Error checking keyword index for tenant {tenant_id}: {e}")
+                    return self._loaded_stamps.get(tenant_id)
+                etag = None
+            self._s3_stamps[tenant_id] = (etag, time.monotonic())
+            return etag
+        if self.storage_dir:
+            try:
+                stat = os.stat(self._path(tenant_id))
+            except FileNotFoundError:
+                return None
+            return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        return None
+
+    def _load(self, tenant_id: str) -> Tuple[Optional[TenantKeywordIndex], Any]:
+        """Read the stored index and its stamp (no locks held)"""
+        if self.use_s3:
+            try:
+                response = self.s3_client.get_object(Bucket=self.s3_bucket, Key=self._s3_key(tenant_id))
+            except Exception as e:
+                if 'NoSuchKey' not in str(e):
+                    raise
+                return None, None
+            etag = response.get('ETag')
+            self._s3_stamps[tenant_id] = (etag, time.monotonic())
+            return TenantKeywordIndex.from_state(json.loads(response['Body'].read())), etag
+        if self.storage_dir:
+            try:
+                with open(self._path(tenant_id)) as f:
+                    stat = os.fstat(f.fileno())
+                    state = json.load(f)
+            except FileNotFoundError:
+                return None, None
+            return TenantKeywordIndex.from_state(state), (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        return None, None
+
+    def _publish(self, tenant_id: str, index: TenantKeywordIndex, stamp: Any, expected: Any = ...) -> bool:
+        """Make index the one searches use, unless the stamp moved from expected meanwhile"""
+        with self._lock(tenant_id):
+            if expected is not ... and self._loaded_stamps.get(tenant_id) != expected:
+                return False
+            self._indexes[tenant_id] = index
+            self._loaded_stamps[tenant_id] = stamp
+            self._versions[tenant_id] += 1
+            return True
+
+    def version(self, tenant_id: str):
+        """Token that changes whenever the tenant's index is rewritten, by any worker"""
+        if self.use_s3 or self.storage_dir:
+            return self._stamp(tenant_id) or 0
+        return self._versions[tenant_id]
+
+    def get(self, tenant_id: str) -> Optional[TenantKeywordIndex]:
+        """Published index for a tenant, (re)loading it from storage if another worker rewrote it.
+
+        The result must not be mutated.
+        """
+        with self._lock(tenant_id):
+            index = self._indexes.get(tenant_id)
+            loaded = self._loaded_stamps.get(tenant_id)
+        if not self.use_s3 and not self.storage_dir:
+            return index
+        stamp = self._stamp(tenant_id)
+        if index is not None and (stamp is None or stamp == loaded):
+            return index
+        try:
+            fresh, fresh_stamp = self._load(tenant_id)
+        except Exception as e:
+            print(f"Error loading keyword index for tenant {tenant_id}: {e}")
+            return index
+        if fresh is None:
+            return index
+        # A concurrent update may have published something newer while we read
+        if not self._publish(tenant_id, fresh, fresh_stamp, expected=loaded):
+            with self._lock(tenant_id):
+                return self._indexes.get(tenant_id)
+        return fresh
+
+    def _latest(self, tenant_id: str, refresh: bool) -> Tuple[Optional[TenantKeywordIndex], Any]:
+        """Index to base an update on, with the stamp it was stored at (writer lock held)"""
+        with self._lock(tenant_id):
+            index = self._indexes.get(tenant_id)
+            loaded = self._loaded_stamps.get(tenant_id)
+        if self.use_s3:
+            # The conditional put catches a stale copy; refresh only after losing a race
+            if index is not None and not refresh:
+                return index, loaded
+        elif self.storage_dir:
+            # Under the flock the file cannot change: compare stamps instead of re-reading it
+            if index is not None and self._stamp(tenant_id) == loaded:
+                return index, loaded
+        else:
+            return index, None
+        return self._load(tenant_id)
+
+    def _store(self, tenant_id: str, index: TenantKeywordIndex, stamp: Any) -> Tuple[bool, Any]:
+        """Write index; on S3 only if the stored ETag is still stamp. Returns (saved, new stamp)."""
+        payload = json.dumps(index.to_state())
+        if self.use_s3:
+            condition = {'IfMatch': stamp} if stamp is not None else {'IfNoneMatch': '*'}
+            try:
+                response = self.s3_client.put_object(
+                    Bucket=self.s3_bucket,
+                    Key=self._s3_key(tenant_id),
+                    Body=payload.encode('utf-8'),
+                    ContentType='application/json',
+                    **condition
+                )
+            except ClientError as e:
+                if e.response['Error']['Code'] in ('PreconditionFailed', 'ConditionalRequestConflict'):
+                    return False, None
+                raise
+            etag = response.get('ETag')
+            self._s3_stamps[tenant_id] = (etag, time.monotonic())
+            return True, etag
+        if self.storage_dir:
+            path = self._path(tenant_id)
+            with open(f"{path}.tmp", 'w') as f:
+                f.write(payload)
+                f.flush()
+                stat = os.fstat(f.fileno())
+            os.replace(f"{path}.tmp", path)
+            return True, (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        return True, None
+
+    def update(self, tenant_id: str, change: Callable[[TenantKeywordIndex], bool]) -> bool:
+        """Apply change to a copy of the tenant's latest index and save it.
+
+        change returns whether it modified the index; nothing is written
+        otherwise. It may run more than once (after a lost S3 race), each
+        time on a fresh copy. Returns whether a change was saved.
+        """
+        with self._writer(tenant_id):
+            refresh = False
+            for _ in range(MAX_UPDATE_ATTEMPTS):
+                base, stamp = self._latest(tenant_id, refresh)
+                index = base.copy() if base is not None else TenantKeywordIndex()
+                if not change(index):
+                    return False
+                saved, new_stamp = self._store(tenant_id, index, stamp)
+                if saved:
+                    self._publish(tenant_id, index, new_stamp)
+                    return True
+                refresh = True
+        raise RuntimeError(f"Keyword index for tenant {tenant_id} kept changing; gave up after {MAX_UPDATE_ATTEMPTS} attempts")
+
+    def build(self, tenant_id: str, documents: List[Dict[str, Any]]) -> bool:
+        """Index (key, text, metadata) documents the tenant's index does not have yet.
+
+        Used to create a missing index; documents another worker indexed
+        meanwhile are left as they are.
+        """
+        def add_missing(index: TenantKeywordIndex) -> bool:
+            missing = [document for document in documents if document['key'] not in index.documents]
+            for document in missing:
+                index.add(document['key'], document['text'], document['metadata'])
+            return bool(missing) or len(index) == 0
+        return self.update(tenant_id, add_missing)
+
+    def add(self, tenant_id: str, doc_key: str, text: str, metadata: Dict[str, Any]):
+        """Index (or re-index) one document"""
+        def add_document(index: TenantKeywordIndex) -> bool:
+            index.add(doc_key, text, metadata)
+            return True
+        self.update(tenant_id, add_document)
+
+    def remove(self, tenant_id: str, doc_keys: List[str]) -> bool:
+        """Remove documents from a tenant's index; returns whether any were indexed"""
+        return self.update(tenant_id, lambda index: any([index.remove(doc_key) for doc_key in doc_keys]))
+
+    def remove_prefix(self, tenant_id: str, prefix: str) -> bool:
+        """Remove every document whose key starts with prefix (e.g. all passages of one upload)"""
+        return self.update(tenant_id, lambda index: remove_prefix(index, prefix))
+
+    def search(self, tenant_id: str, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
+        """BM25 search within a tenant"""
+        index = self.get(tenant_id)
+        if index is None:
+            return []
+        return index.search(query, top_k, k1=self.k1, b=self.b)
+
+
+def remove_prefix(index: TenantKeywordIndex, prefix: str) -> bool:
+    """Drop every document of index whose key starts with prefix; returns whether any were"""
+    return any([index.remove(doc_key) for doc_key in list(index.documents) if doc_key.startswith(prefix)])
@@ -1,8 +1,18 @@
 """LLM service using AWS Bedrock or OpenAI"""
+import contextvars
 import json
+import threading
 import boto3
-from typing import Optional, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, List, Iterator, Tuple
 from backend.config.settings import get_settings
+from backend.services.embedding_cache import EmbeddingCache
+from backend.services.local_embedding import HashingEmbedder
+from backend.services.completion_cache import CompletionCache
+from backend.services.rate_limiter import ProviderLimiter, estimate_tokens, request_priority
+from backend.services.provider_router import ProviderRouter
+from backend.services.circuit_breaker import circuit, circuit_stream, is_open
+from backend.utils.singleflight import SingleFlight
 
 settings = get_settings()
 
@@ -37,6 +47,90 @@ if settings.use_openai and OPENAI_AVAILABLE and settings.openai_api_key:
         print(f"Error initializing OpenAI client: {e}")
 
 
+class EmbeddingUnavailableError(RuntimeError):
+    """No configured embedding provider could embed a whole request"""
+
+
+class FallbackResponse(str):
+    """Template text returned in place of a provider completion; never cached"""
+
+
+SYSTEM_PROMPT = "You are a helpful AI assistant specializing in AI infrastructure, workload management, and optimization."
+TEMPERATURE = 0.7
+
+# Bounds the number of embedding requests in flight across the process
+embedding_executor = ThreadPoolExecutor(
+    max_workers=max(1, settings.embedding_max_concurrency),
+    thread_name_prefix="embeddings"
+)
+
+# Offline embedding provider (used when no embedding provider is configured)
+local_embedder = HashingEmbedder(settings.local_embedding_dimension)
+
+# Shared embedding cache
+embedding_cache = None
+if settings.embedding_cache_enabled:
+    embedding_cache = EmbeddingCache(
+        max_entries=settings.embedding_cache_size,
+        db_path=settings.embedding_cache_path or None
+    )
+
+# Shared completion cache
+completion_cache = None
+if settings.completion_cache_enabled:
+    completion_cache = CompletionCache(
+        db_path=settings.completion_cache_path or None,
+        ttl_seconds=settings.completion_cache_ttl_seconds,
+        max_entries=settings.completion_cache_max_entries,
+        memory_entries=settings.completion_cache_memory_entries
+    )
+
+# Identical concurrent completion requests share one provider call
+completion_flights = SingleFlight('completions')
+
+# Per provider/model admission control (requests and tokens per minute)
+PROVIDER_LIMITS = {
+    ('openai', 'chat'): (settings.openai_requests_per_minute, settings.openai_tokens_per_minute),
+    ('openai', 'embedding'): (settings.openai_embedding_requests_per_minute, settings.openai_embedding_tokens_per_minute),
+    ('bedrock', 'chat'): (settings.bedrock_requests_per_minute, settings.bedrock_tokens_per_minute),
+    ('bedrock', 'embedding'): (settings.bedrock_embedding_requests_per_minute, settings.bedrock_embedding_tokens_per_minute),
+}
+provider_limiters: Dict[str, ProviderLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+# Orders completion providers by health and latency, hedging slow calls when enabled
+completion_router = ProviderRouter(
+    ['openai', 'bedrock'],
+    window=settings.provider_latency_window,
+    min_samples=settings.provider_latency_min_samples,
+    max_error_rate=settings.provider_max_error_rate,
+    hedge_percentile=settings.provider_hedge_percentile,
+    hedge_min_delay_ms=settings.provider_hedge_min_delay_ms,
+    hedge_default_delay_ms=settings.provider_hedge_default_delay_ms
+)
+
+
+def get_provider_limiter(provider: str, model: str, kind: str) -> Optional[ProviderLimiter]:
+    """Shared limiter for a provider model (None when rate limiting is disabled)"""
+    if not settings.rate_limit_enabled:
+        return None
+    name = f"{provider}:{model}"
+    with _limiters_lock:
+        limiter = provider_limiters.get(name)
+        if limiter is None:
+            requests_per_minute, tokens_per_minute = PROVIDER_LIMITS[(provider, kind)]
+            limiter = provider_limiters[name] = ProviderLimiter(name, requests_per_minute, tokens_per_minute)
+        return limiter
+
+
+def rate_limit_stats() -> Dict[str, dict]:
+    """Budget and queue counters per provider model"""
+    with _limiters_lock:
+        limiters = list(provider_limiters.values())
+    return {limiter.name: limiter.stats() for limiter in limiters}
+
+
 class LLMService:
     """Service for LLM operations using AWS Bedrock or OpenAI"""
     
@@ -50,88 +144,347 @@ class LLMService:
         self.use_bedrock = settings.use_bedrock and bedrock_client is not None
         self.use_openai = settings.use_openai and OPENAI_AVAILABLE and openai_client is not None
     
+    def _embedding_model_id(self, provider: Optional[str] = None) -> str:
+        """Cache namespace for the embedding model of a provider (default: the preferred one)"""
+        if provider is None:
+            provider = 'openai' if self.use_openai else 'bedrock' if self.use_bedrock else 'local'
+        if provider == 'openai':
+            return f"openai:{self.openai_embedding_model}"
+        if provider == 'bedrock':
+            return f"bedrock:{self.bedrock_embedding_model}"
+        return local_embedder.model_id
+    
+    def preferred_embedding_model(self) -> str:
+        """Model whose vectors the vector stores hold"""
+        return self._embedding_model_id()
+    
+    def _admit(self, provider: str, model: str, kind: str, tokens: int) -> tuple:
+        """Wait for provider budget; returns (limiter, tokens taken) for settling actual usage"""
+        limiter = get_provider_limiter(provider, model, kind)
+        if limiter is None:
+            return None, tokens
+        if request_priority.get() == 'bulk':
+            timeout = settings.rate_limit_bulk_max_wait_seconds
+        else:
+            timeout = settings.rate_limit_max_wait_seconds
+        return limiter, limiter.acquire(tokens, timeout=timeout)
+    
     def generate_embedding(self, text: str) -> List[float]:
         """Generate embedding using OpenAI or Bedrock Titan"""
-        # Try OpenAI first if available
-        if self.use_openai:
+        return self.embed_batch([text])[1][0]
+    
+    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for many texts, preserving input order (see embed_batch)"""
+        return self.embed_batch(texts)[1]
+    
+    def embed_batch(self, texts: List[str]) -> Tuple[str, List[List[float]]]:
+        """Embed every text with one model: returns (model id, embeddings).
+        
+        OpenAI inputs are sent in provider-sized batches and Bedrock (one text
+        per request) calls are issued concurrently, both bounded by
+        EMBEDDING_MAX_CONCURRENCY. A provider that cannot embed the whole
+        batch is abandoned for the next one, so results never mix embedding
+        spaces. The local hashing embedding is only used when no provider is
+        configured; otherwise EmbeddingUnavailableError is raised.
+        """
+        providers = [
+            (provider, embed) for provider, active, embed in (
+                ('openai', self.use_openai, self._openai_embeddings),
+                ('bedrock', self.use_bedrock, self._bedrock_embeddings)
+            ) if active
+        ]
+        if not providers:
+            return local_embedder.model_id, [embedding.tolist() for embedding in local_embedder.embed_batch(texts)]
+        for provider, embed in providers:
+            model_id = self._embedding_model_id(provider)
+            embeddings: List[Optional[List[float]]] = [None] * len(texts)
+            if embedding_cache is not None:
+                embeddings = embedding_cache.get_many(model_id, texts)
+            missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+            if missing:
+                for i, embedding in zip(missing, embed([texts[i] for i in missing])):
+                    embeddings[i] = embedding
+                fresh = [i for i in missing if embeddings[i] is not None]
+                if embedding_cache is not None and fresh:
+                    embedding_cache.put_many(model_id, [texts[i] for i in fresh], [embeddings[i] for i in fresh])
+            if all(embedding is not None for embedding in embeddings):
+                return model_id, embeddings
+            print(f"{provider} embedded {len(texts) - embeddings.count(None)} of {len(texts)} texts, trying the next provider")
+        raise EmbeddingUnavailableError("No embedding provider could embed the whole batch")
+    
+    def _openai_embeddings(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """OpenAI embeddings in concurrent provider-sized batches (None where a batch failed)"""
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        batch_size = max(1, settings.openai_embedding_batch_size)
+        futures = [
+            (start, embedding_executor.submit(
+                contextvars.copy_context().run, self._openai_embedding_batch, texts[start:start + batch_size]
+            ))
+            for start in range(0, len(texts), batch_size)
+        ]
+        for start, future in futures:
             try:
-                response = self.openai_client.embeddings.create(
-                    model=self.openai_embedding_model,
-                    input=text
-                )
-                return response.data[0].embedding
+                batch_embeddings = future.result()
+                embeddings[start:start + len(batch_embeddings)] = batch_embeddings
             except Exception as e:
-                print(f"Error generating embedding with OpenAI: {e}")
-                # Fall through to Bedrock or simple embedding
-        
-        # Try Bedrock if available
-        if self.use_bedrock:
+                print(f"Error generating batch embeddings with OpenAI: {e}")
+        return embeddings
+    
+    def _bedrock_embeddings(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Concurrent Bedrock embeddings, one request per text (None where a request failed)"""
+        futures = [embedding_executor.submit(contextvars.copy_context().run, self._bedrock_embedding, text) for text in texts]
+        embeddings: List[Optional[List[float]]] = []
+        for future in futures:
             try:
-                response = self.bedrock_client.invoke_model(
-                    modelId=self.bedrock_embedding_model,
-                    body=json.dumps({'inputText': text})
-                )
-                response_body = json.loads(response['body'].read())
-                return response_body['embedding']
+                embeddings.append(future.result())
             except Exception as e:
                 print(f"Error generating embedding with Bedrock: {e}")
-                return self._simple_embedding(text)
+                embeddings.append(None)
+        return embeddings
+    
+    def embeddings_available(self) -> bool:
+        """False when model embeddings are configured but every provider's circuit is open"""
+        providers = [name for name, active in (('openai', self.use_openai), ('bedrock', self.use_bedrock)) if active]
+        return not providers or not all(is_open(f"{name}-embeddings") for name in providers)
+    
+    def completions_available(self) -> bool:
+        """False when LLM providers are configured but every provider's circuit is open"""
+        providers = [name for name, active in (('openai', self.use_openai), ('bedrock', self.use_bedrock)) if active]
+        return not providers or not all(is_open(f"{name}-chat") for name in providers)
+    
+    def embedding_cache_stats(self) -> dict:
+        """Embedding cache hit/miss counters"""
+        if embedding_cache is None:
+            return {'enabled': False}
+        return {'enabled': True, **embedding_cache.stats()}
+    
+    @circuit('openai-embeddings')
+    def _openai_embedding_batch(self, texts: List[str]) -> List[List[float]]:
+        """One OpenAI embeddings request for a batch of inputs"""
+        self._admit('openai', self.openai_embedding_model, 'embedding', sum(estimate_tokens(text) for text in texts))
+        response = self.openai_client.embeddings.create(
+            model=self.openai_embedding_model,
+            input=[text or " " for text in texts]  # Empty strings are rejected
+        )
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+    
+    @circuit('bedrock-embeddings')
+    def _bedrock_embedding(self, text: str) -> List[float]:
+        """One Bedrock Titan embeddings request"""
+        self._admit('bedrock', self.bedrock_embedding_model, 'embedding', estimate_tokens(text))
+        response = self.bedrock_client.invoke_model(
+            modelId=self.bedrock_embedding_model,
+            body=json.dumps({'inputText': text})
+        )
+        return json.loads(response['body'].read())['embedding']
+    
+    def _completion_models(self) -> List[tuple]:
+        """(provider, model) pairs in the order generate_response tries them"""
+        models = []
+        if self.use_openai:
+            models.append(('openai', self.openai_model))
+        if self.use_bedrock:
+            models.append(('bedrock', self.bedrock_model_id))
+        return models
+    
+    def _cached_completion(self, prompt: str, max_tokens: int) -> Optional[str]:
+        if completion_cache is None:
+            return None
+        for provider, model in self._completion_models():
+            cached = completion_cache.get(provider, model, prompt, max_tokens, TEMPERATURE)
+            if cached is not None:
+                return cached
+        return None
+    
+    def _cache_completion(self, provider: str, model: str, prompt: str, max_tokens: int, completion: str):
+        if completion_cache is not None and completion and not isinstance(completion, FallbackResponse):
+            completion_cache.put(provider, model, prompt, max_tokens, TEMPERATURE, completion)
+    
+    def completion_cache_stats(self) -> dict:
+        """Completion cache hit/miss counters"""
+        if completion_cache is None:
+            return {'enabled': False}
+        return {'enabled': True, **completion_cache.stats()}
+    
+    def generate_response(self, prompt: str, max_tokens: int = 500, use_cache: bool = True) -> str:
+        """Generate response using OpenAI or Bedrock Claude
         
-        # Fallback to simple embedding
-        return self._simple_embedding(text)
-    
-    def _simple_embedding(self, text: str) -> List[float]:
-        """Simple fallback embedding"""
-        import hashlib
-        hash_obj = hashlib.md5(text.encode())
-        hash_hex = hash_obj.hexdigest()
-        return [float(int(hash_hex[i:i+2], 16)) / 255.0 for i in range(0, min(32, len(hash_hex)), 2)] * 48
-    
-    def generate_response(self, prompt: str, max_tokens: int = 500) -> str:
-        """Generate response using OpenAI or Bedrock Claude"""
-        # Try OpenAI first if available
+        Provider completions are cached; use_cache=False skips the lookup
+        (the fresh completion still replaces the cached one). Concurrent
+        identical requests share one in-flight call. When every provider
+        fails the result is a FallbackResponse, which callers must not cache.
+        """
+        if not settings.request_coalescing_enabled:
+            return self._generate_response(prompt, max_tokens, use_cache)
+        return completion_flights.do(
+            (prompt, max_tokens, use_cache),
+            self._generate_response, prompt, max_tokens, use_cache
+        )
+    
+    def _generate_response(self, prompt: str, max_tokens: int, use_cache: bool) -> str:
+        if use_cache:
+            cached = self._cached_completion(prompt, max_tokens)
+            if cached is not None:
+                return cached
+        
+        attempts = []
         if self.use_openai:
+            attempts.append(('openai', lambda: self._openai_completion(prompt, max_tokens)))
+        if self.use_bedrock:
+            attempts.append(('bedrock', lambda: self._bedrock_completion(prompt, max_tokens)))
+        if attempts:
             try:
-                response = self.openai_client.chat.completions.create(
-                    model=self.openai_model,
-                    messages=[
-                        {"role": "system", "content": "You are a helpful AI assistant specializing in AI infrastructure, workload management, and optimization."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    max_tokens=max_tokens,
-                    temperature=0.7
+                return completion_router.call(
+                    attempts,
+                    hedge=settings.provider_hedging_enabled,
+                    route=settings.provider_routing_enabled
                 )
-                return response.choices[0].message.content.strip()
             except Exception as e:
-                print(f"Error calling OpenAI: {e}")
-                # Fall through to Bedrock or template response
+                print(f"Error calling LLM providers: {e}")
+        
+        # Fallback to template response
+        return self._template_response(prompt)
+    
+    @circuit('openai-chat')
+    def _openai_completion(self, prompt: str, max_tokens: int) -> str:
+        """One OpenAI chat completion (raises on failure)"""
+        limiter, admitted = self._admit(
+            'openai', self.openai_model, 'chat', estimate_tokens(SYSTEM_PROMPT + prompt) + max_tokens
+        )
+        response = self.openai_client.chat.completions.create(
+            model=self.openai_model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=max_tokens,
+            temperature=TEMPERATURE
+        )
+        if limiter is not None and getattr(response, 'usage', None) is not None:
+            limiter.settle(admitted, response.usage.total_tokens)
+        completion = response.choices[0].message.content.strip()
+        self._cache_completion('openai', self.openai_model, prompt, max_tokens, completion)
+        return completion
+    
+    @circuit('bedrock-chat')
+    def _bedrock_completion(self, prompt: str, max_tokens: int) -> str:
+        """One Bedrock Claude completion (raises on failure)"""
+        # Format prompt for Claude
+        claude_prompt = f"Human: {prompt}\n\nAssistant:"
         
-        # Try Bedrock if available
+        self._admit('bedrock', self.bedrock_model_id, 'chat', estimate_tokens(claude_prompt) + max_tokens)
+        response = self.bedrock_client.invoke_model(
+            modelId=self.bedrock_model_id,
+            body=json.dumps({
+                "prompt": claude_prompt,
+                "max_tokens_to_sample": max_tokens,
+                "temperature": TEMPERATURE
+            })
+        )
+        
+        response_body = json.loads(response['body'].read())
+        completion = response_body['completion']
+        self._cache_completion('bedrock', self.bedrock_model_id, prompt, max_tokens, completion)
+        return completion
+    
+    def stream_response(self, prompt: str, max_tokens: int = 500, use_cache: bool = True) -> Iterator[str]:
+        """Yield response text incrementally from OpenAI or Bedrock Claude.
+        
+        A provider that fails before its first token falls through to the next
+        one; a failure mid-stream re-raises after what was produced, so the
+        caller knows the text is truncated. When no provider starts, the
+        template is yielded as a single FallbackResponse. A cached completion
+        is yielded in one piece; completed streams are cached like
+        generate_response results.
+        """
+        if use_cache:
+            cached = self._cached_completion(prompt, max_tokens)
+            if cached is not None:
+                yield cached
+                return
+        
+        streams = []
+        if self.use_openai:
+            streams.append(('openai', self._openai_stream))
         if self.use_bedrock:
+            streams.append(('bedrock', self._bedrock_stream))
+        if settings.provider_routing_enabled:
+            # Streams are not hedged, but start on the currently fastest healthy provider
+            order = completion_router.order([provider for provider, _ in streams])
+            streams.sort(key=lambda item: order.index(item[0]))
+        
+        for provider, stream in streams:
+            started = False
             try:
-                # Format prompt for Claude
-                claude_prompt = f"Human: {prompt}\n\nAssistant:"
-                
-                response = self.bedrock_client.invoke_model(
-                    modelId=self.bedrock_model_id,
-                    body=json.dumps({
-                        "prompt": claude_prompt,
-                        "max_tokens_to_sample": max_tokens,
-                        "temperature": 0.7
-                    })
-                )
-                
-                response_body = json.loads(response['body'].read())
-                return response_body['completion']
+                for text in stream(prompt, max_tokens):
+                    started = True
+                    yield text
+                return
             except Exception as e:
-                print(f"Error calling Bedrock: {e}")
-                return self._template_response(prompt)
+                print(f"Error streaming from {provider}: {e}")
+                if started:
+                    raise
         
-        # Fallback to template response
-        return self._template_response(prompt)
+        yield self._template_response(prompt)
     
-    def _template_response(self, prompt: str) -> str:
+    @circuit_stream('openai-chat')
+    def _openai_stream(self, prompt: str, max_tokens: int) -> Iterator[str]:
+        self._admit(
+            'openai', self.openai_model, 'chat', estimate_tokens(SYSTEM_PROMPT + prompt) + max_tokens
+        )
+        stream = self.openai_client.chat.completions.create(
+            model=self.openai_model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=max_tokens,
+            temperature=TEMPERATURE,
+            stream=True
+        )
+        parts = []
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        finally:
+            stream.close()  # Releases the HTTP response when the consumer stops early
+        self._cache_completion('openai', self.openai_model, prompt, max_tokens, ''.join(parts).strip())
+    
+    @circuit_stream('bedrock-chat')
+    def _bedrock_stream(self, prompt: str, max_tokens: int) -> Iterator[str]:
+        self._admit('bedrock', self.bedrock_model_id, 'chat', estimate_tokens(prompt) + max_tokens)
+        response = self.bedrock_client.invoke_model_with_response_stream(
+            modelId=self.bedrock_model_id,
+            body=json.dumps({
+                "prompt": f"Human: {prompt}\n\nAssistant:",
+                "max_tokens_to_sample": max_tokens,
+                "temperature": TEMPERATURE
+            })
+        )
+        parts = []
+        try:
+            for event in response['body']:
+                chunk = event.get('chunk')
+                if not chunk:
+                    continue
+                completion = json.loads(chunk['bytes']).get('completion', '')
+                if completion:
+                    parts.append(completion)
+                    yield completion
+        finally:
+            response['body'].close()  # Releases the HTTP response when the consumer stops early
+        self._cache_completion('bedrock', self.bedrock_model_id, prompt, max_tokens, ''.join(parts))
+    
+    def _template_response(self, prompt: str) -> FallbackResponse:
         """Fallback template-based response"""
+        return FallbackResponse(self._template_text(prompt))
+    
+    def _template_text(self, prompt: str) -> str:
         # Simple template responses for demo
         if "optimize" in prompt.lower() or "cost" in prompt.lower():
             return "To optimize costs, consider using spot instances, right-sizing your resources, and implementing auto-scaling based on demand. Monitor your usage patterns and adjust resources accordingly."
@@ -0,0 +1,91 @@
+"""Local embeddings from feature-hashed word and character n-grams"""
+import re
+import zlib
+from collections import Counter
+from typing import List, Tuple
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Dropped from word features only; character n-grams still see them
+STOP_WORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on or "
+    "should the this to was what when where which who why will with you your".split()
+)
+
+
+class HashingEmbedder:
+    """Stateless text embedder: no vocabulary, no model download.
+
+    Word uni/bigrams and character n-grams (within word boundaries) are
+    hashed with CRC32 into `dimension` signed buckets, weighted by sublinear
+    term frequency (1 + log tf), and the vector is L2-normalised, so the dot
+    product of two embeddings is their cosine similarity. The same text
+    always maps to the same vector in every process.
+    """
+
+    def __init__(
+        self,
+        dimension: int = 768,
+        word_ngrams: Tuple[int, int] = (1, 2),
+        char_ngrams: Tuple[int, int] = (3, 5),
+        char_weight: float = 0.5
+    ):
+        self.dimension = dimension
+        self.word_ngrams = word_ngrams
+        self.char_ngrams = char_ngrams
+        self.char_weight = char_weight
+
+    @property
+    def model_id(self) -> str:
+        return f"hashing-{self.dimension}"
+
+    def _features(self, text: str) -> Counter:
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        features = Counter()
+        words = [token for token in tokens if token not in STOP_WORDS] or tokens
+        low, high = self.word_ngrams
+        for n in range(low, high + 1):
+            for i in range(len(words) - n + 1):
+                features["w:" + " ".join(words[i:i + n])] += 1
+        low, high = self.char_ngrams
+        for token in tokens:
+            padded = f" {token} "
+            for n in range(low, high + 1):
+                for i in range(len(padded) - n + 1):
+                    features["c:" + padded[i:i + n]] += 1
+        return features
+
+    def _row(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Bucket indexes and signed weights for one text"""
+        features = self._features(text)
+        if not features:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        hashes = np.fromiter(
+            (zlib.crc32(feature.encode('utf-8')) for feature in features),
+            dtype=np.uint64,
+            count=len(features)
+        )
+        counts = np.fromiter(features.values(), dtype=np.float32, count=len(features))
+        weights = 1.0 + np.log(counts)
+        is_char = np.fromiter((feature[0] == 'c' for feature in features), dtype=bool, count=len(features))
+        weights[is_char] *= self.char_weight
+        # Top bit picks the sign so colliding features tend to cancel instead of pile up
+        signs = np.where(hashes >> np.uint64(31), -1.0, 1.0).astype(np.float32)
+        return (hashes % np.uint64(self.dimension)).astype(np.int64), weights * signs
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """(len(texts), dimension) float32 matrix of unit-length rows (zero rows for empty text)"""
+        matrix = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        rows = [self._row(text) for text in texts]
+        if rows:
+            row_ids = np.repeat(np.arange(len(rows)), [len(indexes) for indexes, _ in rows])
+            columns = np.concatenate([indexes for indexes, _ in rows])
+            values = np.concatenate([weights for _, weights in rows])
+            np.add.at(matrix, (row_ids, columns), values)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.embed_batch([text])[0]
@@ -0,0 +1,248 @@
+"""Per-workload ring buffers of recent metric samples (columnar, NumPy-backed)"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+from backend.config.settings import get_settings
+from backend.services.async_dynamodb_service import AsyncDynamoDBService
+from backend.utils.singleflight import AsyncSingleFlight
+
+settings = get_settings()
+
+VALUE_FIELDS = ('cpu_usage', 'memory_usage', 'gpu_usage')
+
+# Writes from other processes can carry a timestamp slightly older than our last sync
+SYNC_SKEW_SECONDS = 30
+
+
+def columns(samples: Iterable[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Metric items (or summary samples) as timestamp / value columns"""
+    samples = list(samples)
+    result = {'timestamp': np.array([int(s.get('timestamp', 0)) for s in samples], dtype=np.int64)}
+    for field in VALUE_FIELDS:
+        result[field] = np.array([float(s.get(field) or 0.0) for s in samples], dtype=np.float64)
+    return result
+
+
+class WorkloadRingBuffer:
+    """Fixed-capacity columns of one workload's samples; the oldest insert is overwritten first.
+
+    covered_from is the earliest timestamp from which the buffer holds
+    every sample this process knows of (None until loaded from DynamoDB
+    or fed by ingest).
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.ids = np.empty(capacity, dtype=object)
+        self.timestamps = np.zeros(capacity, dtype=np.int64)
+        self.values = {field: np.zeros(capacity, dtype=np.float64) for field in VALUE_FIELDS}
+        self.start = 0
+        self.size = 0
+        self.covered_from: Optional[int] = None
+        self.synced_at = 0.0  # time.monotonic() of the last DynamoDB read
+        self.synced_ts = 0  # ...and its wall-clock time, for the next incremental read
+        self.truncated_at = 0.0  # time.monotonic() of the last full load that held more than capacity
+
+    def _order(self) -> np.ndarray:
+        return (self.start + np.arange(self.size)) % self.capacity
+
+    def append(self, items: List[Dict[str, Any]]):
+        """Add freshly ingested samples"""
+        for item in items:
+            if self.size < self.capacity:
+                slot = (self.start + self.size) % self.capacity
+                self.size += 1
+            else:
+                slot = self.start
+                self.start = (self.start + 1) % self.capacity
+                # Evicting a sample means older timestamps are no longer complete
+                evicted = int(self.timestamps[slot]) + 1
+                self.covered_from = max(self.covered_from or evicted, evicted)
+            self.ids[slot] = item['id']
+            self.timestamps[slot] = int(item['timestamp'])
+            for field in VALUE_FIELDS:
+                self.values[field][slot] = float(item.get(field) or 0.0)
+        if items and self.covered_from is None:
+            self.covered_from = min(int(item['timestamp']) for item in items)
+
+    def merge(self, items: List[Dict[str, Any]], covered_from: int, contiguous: bool = True):
+        """Fold samples read from DynamoDB into the buffer (deduplicated by id), oldest evicted.
+
+        items hold every sample from covered_from on; contiguous means that
+        range joins up with what the buffer already covers.
+        """
+        if contiguous and self.covered_from is not None:
+            covered_from = min(self.covered_from, covered_from)
+        order = self._order()
+        known = set(self.ids[order])
+        new = [item for item in items if item['id'] not in known]
+        incoming = columns(new)
+        ids = np.concatenate([self.ids[order], np.array([item['id'] for item in new], dtype=object)])
+        timestamps = np.concatenate([self.timestamps[order], incoming['timestamp']])
+        keep = np.argsort(timestamps, kind='stable')[-self.capacity:]
+        count = len(keep)
+        if len(timestamps) > self.capacity:
+            dropped = np.argsort(timestamps, kind='stable')[:-self.capacity]
+            covered_from = max(covered_from, int(timestamps[dropped].max()) + 1)
+        for field in VALUE_FIELDS:
+            merged = np.concatenate([self.values[field][order], incoming[field]])
+            self.values[field][:count] = merged[keep]
+        self.ids[:count] = ids[keep]
+        self.timestamps[:count] = timestamps[keep]
+        self.start = 0
+        self.size = count
+        self.covered_from = covered_from
+        self.synced_at = time.monotonic()
+        self.synced_ts = int(time.time())
+
+    def window(self, since: int) -> Dict[str, np.ndarray]:
+        """Columns (plus ids) of samples with timestamp >= since, most recent first"""
+        order = self._order()
+        order = order[self.timestamps[order] >= since]
+        order = order[np.argsort(-self.timestamps[order], kind='stable')]
+        result = {'id': self.ids[order], 'timestamp': self.timestamps[order]}
+        for field in VALUE_FIELDS:
+            result[field] = self.values[field][order]
+        return result
+
+    def latest(self, count: int) -> Dict[str, np.ndarray]:
+        """Columns of the most recent samples, at most count of them"""
+        return {name: column[:count] for name, column in self.window(np.iinfo(np.int64).min).items()}
+
+
+class MetricBufferStore:
+    """Ring buffers for recently read or ingested workloads, as a bounded LRU.
+
+    Ingest in this process appends straight to the buffer. A buffer is
+    re-synced from the metrics GSI at most every refresh_seconds when read,
+    picking up samples other processes wrote; a workload read for the first
+    time (or for a window older than its buffer covers) is loaded once.
+    Buffers are only mutated on the event loop.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 1440,
+        window_seconds: int = 86400,
+        refresh_seconds: float = 10.0,
+        max_workloads: int = 500
+    ):
+        self.capacity = capacity
+        self.window_seconds = window_seconds
+        self.refresh_seconds = refresh_seconds
+        self.max_workloads = max_workloads
+        self._buffers: "OrderedDict[str, WorkloadRingBuffer]" = OrderedDict()
+        self._loads = AsyncSingleFlight('metric-buffer')
+        self._stats = {'hits': 0, 'loads': 0, 'refreshes': 0, 'uncovered': 0}
+
+    def _buffer(self, workload_id: str) -> WorkloadRingBuffer:
+        buffer = self._buffers.get(workload_id)
+        if buffer is None:
+            buffer = self._buffers[workload_id] = WorkloadRingBuffer(self.capacity)
+        self._buffers.move_to_end(workload_id)
+        while len(self._buffers) > self.max_workloads:
+            self._buffers.popitem(last=False)
+        return buffer
+
+    def record(self, metric_items: List[Dict[str, Any]]):
+        """Feed ingested metric items"""
+        by_workload: Dict[str, List[Dict[str, Any]]] = {}
+        for item in metric_items:
+            by_workload.setdefault(item['workload_id'], []).append(item)
+        for workload_id, items in by_workload.items():
+            self._buffer(workload_id).append(items)
+
+    async def _load(self, workload_id: str, since: int):
+        items, next_cursor = await AsyncDynamoDBService.page(
+            'metrics',
+            self.capacity,
+            IndexName='workload-id-timestamp-index',
+            KeyConditionExpression='workload_id = :workload_id AND #timestamp >= :since',
+            ExpressionAttributeValues={':workload_id': workload_id, ':since': since},
+            ExpressionAttributeNames={'#timestamp': 'timestamp'},
+            ScanIndexForward=False  # Most recent first
+        )
+        if next_cursor and items:
+            # Only the most recent `capacity` samples fit: coverage starts above the oldest one read
+            buffer = self._buffer(workload_id)
+            buffer.merge(items, int(items[-1]['timestamp']) + 1, contiguous=False)
+            buffer.truncated_at = time.monotonic()
+        else:
+            self._buffer(workload_id).merge(items, since)
+
+    async def window(self, workload_id: str, since: int) -> Optional[Dict[str, np.ndarray]]:
+        """Samples with timestamp >= since, most recent first, or None when the
+        window is older than the buffers keep (or than this buffer can hold)."""
+        now = int(time.time())
+        if since < now - self.window_seconds:
+            self._stats['uncovered'] += 1
+            return None
+        buffer = self._buffers.get(workload_id)
+        if buffer is None or buffer.synced_at == 0.0 or buffer.covered_from is None or buffer.covered_from > since:
+            if buffer is not None and time.monotonic() - buffer.truncated_at < self.refresh_seconds:
+                # A full load just came back larger than the buffer: this window won't fit until it shrinks
+                self._stats['uncovered'] += 1
+                return None
+            self._stats['loads'] += 1
+            await self._loads.do(workload_id, self._load, workload_id, now - self.window_seconds)
+        elif time.monotonic() - buffer.synced_at > self.refresh_seconds:
+            self._stats['refreshes'] += 1
+            await self._loads.do(workload_id, self._load, workload_id, buffer.synced_ts - SYNC_SKEW_SECONDS)
+        else:
+            self._stats['hits'] += 1
+        buffer = self._buffers.get(workload_id)
+        if buffer is None or buffer.covered_from is None or buffer.covered_from > since:
+            self._stats['uncovered'] += 1
+            return None
+        return buffer.window(since)
+
+    def fresh_latest(self, workload_ids: List[str], count: int) -> Dict[str, Dict[str, np.ndarray]]:
+        """Latest samples for workloads whose buffer is synced and holds at least count samples.
+
+        Never reads DynamoDB; callers get the rest elsewhere.
+        """
+        deadline = time.monotonic() - self.refresh_seconds
+        result = {}
+        for workload_id in workload_ids:
+            buffer = self._buffers.get(workload_id)
+            if buffer is not None and buffer.synced_at >= deadline and buffer.size >= count:
+                result[workload_id] = buffer.latest(count)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            'workloads': len(self._buffers),
+            'samples': sum(buffer.size for buffer in self._buffers.values())
+        }
+
+
+class UnbufferedMetrics:
+    """Drop-in for MetricBufferStore when buffering is disabled"""
+
+    def record(self, metric_items: List[Dict[str, Any]]):
+        pass
+
+    async def window(self, workload_id: str, since: int) -> Optional[Dict[str, np.ndarray]]:
+        return None
+
+    def fresh_latest(self, workload_ids: List[str], count: int) -> Dict[str, Dict[str, np.ndarray]]:
+        return {}
+
+    def stats(self) -> Dict[str, Any]:
+        return {'enabled': False}
+
+
+def _create_metric_buffers():
+    if not settings.metric_buffer_enabled:
+        return UnbufferedMetrics()
+    return MetricBufferStore(
+        capacity=settings.metric_buffer_capacity,
+        window_seconds=settings.metric_buffer_window_hours * 3600,
+        refresh_seconds=settings.metric_buffer_refresh_seconds,
+        max_workloads=settings.metric_buffer_max_workloads
+    )
+
+
+metric_buffers = _create_metric_buffers()
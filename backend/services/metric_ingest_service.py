@@ -0,0 +1,167 @@
+"""Bulk metric ingestion: parse, validate and batch-write many samples per request"""
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from backend.config.settings import get_settings
+from backend.database import dynamodb_resource, TABLES
+from backend.models.dynamodb import MetricCreate, MetricIngestStatus, MetricBulkResult
+from backend.services.batch_writer import MAX_BATCH_SIZE
+from backend.services.dynamodb_service import to_dynamodb
+from backend.services.metric_buffer import metric_buffers
+from backend.services.metric_summary_service import MetricSummaryService
+from backend.services.rollup_service import rollup_buffer
+from backend.utils.concurrency import run_blocking
+
+settings = get_settings()
+
+
+def parse_payload(body: bytes, ndjson: bool) -> List[Any]:
+    """Raw samples from a JSON array or NDJSON body.
+
+    An NDJSON line that is not valid JSON is returned as a
+    json.JSONDecodeError so it can be reported against its index.
+    """
+    if not ndjson:
+        payload = json.loads(body)
+        if not isinstance(payload, list):
+            raise ValueError("Expected a JSON array of metrics")
+        return payload
+    samples: List[Any] = []
+    for line in body.decode('utf-8').splitlines():
+        if not line.strip():
+            continue
+        try:
+            samples.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            samples.append(e)
+    return samples
+
+
+def _validation_error(error: ValidationError) -> str:
+    return '; '.join(
+        f"{'.'.join(str(part) for part in detail['loc']) or 'body'}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+
+def write_batch(items: List[Dict[str, Any]], max_retries: int = 8) -> List[str]:
+    """BatchWriteItem up to 25 metric items; returns the ids that could not be written"""
+    table_name = TABLES['metrics']
+    requests = [{'PutRequest': {'Item': item}} for item in items]
+    attempt = 0
+    while requests:
+        try:
+            response = dynamodb_resource.batch_write_item(RequestItems={table_name: requests})
+            requests = response.get('UnprocessedItems', {}).get(table_name, [])
+        except Exception as e:
+            print(f"Error batch writing metrics: {e}")
+        if not requests:
+            break
+        attempt += 1
+        if attempt > max_retries:
+            print(f"Giving up on {len(requests)} metrics after {max_retries} retries")
+            break
+        time.sleep(min(5.0, 0.05 * 2 ** attempt) * random.uniform(0.5, 1.0))
+    return [request['PutRequest']['Item']['id'] for request in requests]
+
+
+class MetricIngestService:
+    """Writes a request's worth of samples with few DynamoDB round trips.
+
+    Samples go out as 25-item BatchWriteItem calls, metric_ingest_concurrency
+    at a time. Summaries are then updated once per workload, instead of
+    once per sample, and samples are handed to the rollup buffer.
+    """
+
+    @staticmethod
+    def validate(samples: List[Any]) -> Tuple[List[Tuple[int, MetricCreate]], List[MetricIngestStatus]]:
+        """Split samples into (index, metric) pairs and per-item errors"""
+        valid: List[Tuple[int, MetricCreate]] = []
+        invalid: List[MetricIngestStatus] = []
+        for index, sample in enumerate(samples):
+            if isinstance(sample, json.JSONDecodeError):
+                invalid.append(MetricIngestStatus(index=index, status='invalid', error=f"Invalid JSON: {sample.msg}"))
+                continue
+            try:
+                valid.append((index, MetricCreate.model_validate(sample)))
+            except ValidationError as e:
+                invalid.append(MetricIngestStatus(index=index, status='invalid', error=_validation_error(e)))
+        return valid, invalid
+
+    @staticmethod
+    async def write(metric_items: List[Dict[str, Any]]) -> List[str]:
+        """Write metric items in concurrent batches; returns the ids that failed"""
+        semaphore = asyncio.Semaphore(max(1, settings.metric_ingest_concurrency))
+        dynamo_items = [to_dynamodb(item) for item in metric_items]
+
+        async def bounded(batch: List[Dict[str, Any]]) -> List[str]:
+            async with semaphore:
+                return await run_blocking('dynamodb', write_batch, batch)
+
+        failed: List[str] = []
+        for result in await asyncio.gather(*[
+            bounded(dynamo_items[i:i + MAX_BATCH_SIZE]) for i in range(0, len(dynamo_items), MAX_BATCH_SIZE)
+        ]):
+            failed.extend(result)
+        return failed
+
+    @staticmethod
+    async def update_aggregates(metric_items: List[Dict[str, Any]]):
+        """Fold written samples into ring buffers and metric summaries, and queue their rollups"""
+        metric_buffers.record(metric_items)
+        by_workload: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for item in metric_items:
+            by_workload[item['workload_id']].append(item)
+        semaphore = asyncio.Semaphore(max(1, settings.metric_ingest_concurrency))
+
+        async def record_summary(workload_id: str, items: List[Dict[str, Any]]):
+            async with semaphore:
+                try:
+                    await run_blocking('dynamodb', MetricSummaryService.record, workload_id, items)
+                except Exception as e:
+                    print(f"Error updating metric summary: {e}")
+
+        await asyncio.gather(*[record_summary(workload_id, items) for workload_id, items in by_workload.items()])
+        if settings.rollups_enabled:
+            rollup_buffer.add(metric_items)
+
+    @staticmethod
+    async def ingest(samples: List[Any], timestamp: Optional[int] = None) -> MetricBulkResult:
+        """Validate, write and aggregate samples, reporting a status per input index"""
+        timestamp = timestamp if timestamp is not None else int(time.time())
+        valid, results = MetricIngestService.validate(samples)
+
+        metric_items = []
+        for index, metric in valid:
+            metric_items.append({
+                'id': str(uuid.uuid4()),
+                'workload_id': metric.workload_id,
+                'cpu_usage': metric.cpu_usage,
+                'memory_usage': metric.memory_usage,
+                'gpu_usage': metric.gpu_usage if metric.gpu_usage is not None else 0.0,
+                'timestamp': timestamp
+            })
+
+        failed = set(await MetricIngestService.write(metric_items)) if metric_items else set()
+        for (index, _), item in zip(valid, metric_items):
+            if item['id'] in failed:
+                results.append(MetricIngestStatus(index=index, status='failed', error="Write failed after retries"))
+            else:
+                results.append(MetricIngestStatus(index=index, status='created', id=item['id']))
+
+        written = [item for item in metric_items if item['id'] not in failed]
+        if written:
+            await MetricIngestService.update_aggregates(written)
+
+        results.sort(key=lambda result: result.index)
+        return MetricBulkResult(
+            created=len(written),
+            invalid=len(samples) - len(valid),
+            failed=len(failed),
+            results=results
+        )
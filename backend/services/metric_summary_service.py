@@ -0,0 +1,136 @@
+"""Latest-N metric samples per workload, readable in bulk"""
+import asyncio
+import random
+import time
+from typing import Any, Dict, Iterable, List, Tuple
+from botocore.exceptions import ClientError
+from backend.config.settings import get_settings
+from backend.database import dynamodb_resource, get_table, TABLES
+from backend.services.async_dynamodb_service import AsyncDynamoDBService
+from backend.services.dynamodb_service import to_dynamodb
+from backend.utils.concurrency import run_blocking
+
+settings = get_settings()
+
+SAMPLE_FIELDS = ('cpu_usage', 'memory_usage', 'gpu_usage', 'timestamp')
+BATCH_GET_LIMIT = 100  # DynamoDB BatchGetItem keys per request
+
+
+def _sample(metric: Dict[str, Any]) -> Dict[str, Any]:
+    return {field: metric[field] for field in SAMPLE_FIELDS if field in metric}
+
+
+def _latest(samples: Iterable[Dict[str, Any]], count: int) -> List[Dict[str, Any]]:
+    return sorted(samples, key=lambda sample: sample.get('timestamp', 0), reverse=True)[:count]
+
+
+class MetricSummaryService:
+    """One metric_summaries item per workload holding its latest samples.
+
+    Reading a fleet's recent metrics costs one BatchGetItem per 100
+    workloads instead of one metrics GSI query per workload. Summaries are
+    written with an optimistic version check, so concurrent ingests for
+    the same workload do not lose samples.
+    """
+
+    @staticmethod
+    def record(workload_id: str, metrics: List[Dict[str, Any]], max_attempts: int = 5) -> bool:
+        """Merge new metric items into a workload's summary"""
+        table = get_table('metric_summaries')
+        new_samples = [to_dynamodb(_sample(metric)) for metric in metrics]
+        for attempt in range(max_attempts):
+            current = table.get_item(Key={'workload_id': workload_id}, ConsistentRead=True).get('Item')
+            version = current.get('version', 0) if current else 0
+            samples = _latest(new_samples + (current.get('samples', []) if current else []), settings.metric_summary_samples)
+            try:
+                table.put_item(
+                    Item={
+                        'workload_id': workload_id,
+                        'samples': samples,
+                        'version': version + 1,
+                        'updated_at': int(time.time())
+                    },
+                    ConditionExpression='attribute_not_exists(workload_id) OR version = :version',
+                    ExpressionAttributeValues={':version': version}
+                )
+                return True
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+                time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+        print(f"Gave up updating metric summary for {workload_id} after {max_attempts} attempts")
+        return False
+
+    @staticmethod
+    def batch_get(workload_ids: List[str], max_retries: int = 8) -> Tuple[Dict[str, List[Dict[str, Any]]], List[str]]:
+        """Samples per workload for up to 100 ids, plus the ids still unprocessed after max_retries.
+
+        Workloads without a summary are absent from both.
+        """
+        table_name = TABLES['metric_summaries']
+        keys = [{'workload_id': workload_id} for workload_id in workload_ids]
+        summaries: Dict[str, List[Dict[str, Any]]] = {}
+        attempt = 0
+        while keys:
+            response = dynamodb_resource.batch_get_item(RequestItems={table_name: {'Keys': keys}})
+            for item in response.get('Responses', {}).get(table_name, []):
+                summaries[item['workload_id']] = item.get('samples', [])
+            keys = response.get('UnprocessedKeys', {}).get(table_name, {}).get('Keys', [])
+            if not keys:
+                break
+            attempt += 1
+            if attempt > max_retries:
+                print(f"Giving up on {len(keys)} metric summaries after {max_retries} retries")
+                break
+            time.sleep(min(2.0, 0.05 * 2 ** attempt) * random.uniform(0.5, 1.0))
+        return summaries, [key['workload_id'] for key in keys]
+
+    @staticmethod
+    async def _query_latest(workload_id: str) -> List[Dict[str, Any]]:
+        items, _ = await AsyncDynamoDBService.page(
+            'metrics',
+            settings.metric_summary_samples,
+            IndexName='workload-id-timestamp-index',
+            KeyConditionExpression='workload_id = :workload_id',
+            ExpressionAttributeValues={':workload_id': workload_id},
+            ScanIndexForward=False  # Most recent first
+        )
+        return _latest((_sample(item) for item in items), settings.metric_summary_samples)
+
+    @staticmethod
+    async def latest(workload_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Latest samples for every workload, with at most dashboard_fanout_concurrency calls in flight.
+
+        Workloads that have no summary yet (metrics written before
+        summaries existed) are read from the metrics GSI once and their
+        summary is written, so the next read is a bulk one. Summaries
+        still throttled after batch_get's retries are left out.
+        """
+        semaphore = asyncio.Semaphore(max(1, settings.dashboard_fanout_concurrency))
+
+        async def bounded(func, *args):
+            async with semaphore:
+                return await func(*args)
+
+        chunks = [workload_ids[i:i + BATCH_GET_LIMIT] for i in range(0, len(workload_ids), BATCH_GET_LIMIT)]
+        summaries: Dict[str, List[Dict[str, Any]]] = {}
+        unprocessed = set()
+        for result, throttled in await asyncio.gather(*[
+            bounded(run_blocking, 'dynamodb', MetricSummaryService.batch_get, chunk) for chunk in chunks
+        ]):
+            summaries.update(result)
+            unprocessed.update(throttled)
+
+        async def backfill(workload_id: str):
+            samples = await MetricSummaryService._query_latest(workload_id)
+            summaries[workload_id] = samples
+            # Written even when empty, so idle workloads are not queried again
+            await run_blocking('dynamodb', MetricSummaryService.record, workload_id, samples)
+
+        # Throttled ids may well have a summary: backfilling them would only add load
+        missing = [
+            workload_id for workload_id in workload_ids
+            if workload_id not in summaries and workload_id not in unprocessed
+        ]
+        await asyncio.gather(*[bounded(backfill, workload_id) for workload_id in missing])
+        return summaries
@@ -0,0 +1,158 @@
+"""Latency-aware routing and hedging across LLM providers"""
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, List, Tuple
+import numpy as np
+
+
+class LatencyTracker:
+    """Rolling window of call latencies and outcomes for one provider.
+
+    The error rate only counts outcomes from the last error_window_seconds,
+    so a provider that stops being called is not marked unhealthy forever.
+    """
+
+    def __init__(self, window: int = 200, error_window_seconds: float = 60):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.error_window_seconds = error_window_seconds
+
+    def record(self, latency_ms: float, ok: bool):
+        if ok:
+            self.latencies.append(latency_ms)
+        self.outcomes.append((time.monotonic(), ok))
+
+    def percentile(self, q: float) -> float:
+        return float(np.percentile(self.latencies, q)) if self.latencies else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        cutoff = time.monotonic() - self.error_window_seconds
+        recent = [ok for recorded_at, ok in self.outcomes if recorded_at >= cutoff]
+        return recent.count(False) / len(recent) if recent else 0.0
+
+
+class ProviderRouter:
+    """Order providers by health and rolling p50, optionally hedging slow calls.
+
+    A provider is unhealthy when its recent error rate exceeds
+    max_error_rate. Providers with fewer than min_samples successful calls
+    are tried as if fastest, so every provider keeps getting measured.
+    """
+
+    def __init__(
+        self,
+        providers: List[str],
+        window: int = 200,
+        min_samples: int = 20,
+        max_error_rate: float = 0.5,
+        hedge_percentile: float = 95,
+        hedge_min_delay_ms: float = 250,
+        hedge_default_delay_ms: float = 2000,
+        max_workers: int = 32
+    ):
+        self.providers = list(providers)
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay_ms = hedge_min_delay_ms
+        self.hedge_default_delay_ms = hedge_default_delay_ms
+        self._trackers = {provider: LatencyTracker(window) for provider in self.providers}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="provider-router")
+        self._stats = {'calls': 0, 'hedged': 0, 'hedge_wins': 0, 'failovers': 0}
+
+    def _record(self, provider: str, start: float, future: Future):
+        with self._lock:
+            self._trackers[provider].record((time.perf_counter() - start) * 1000, future.exception() is None)
+
+    def order(self, providers: List[str]) -> List[str]:
+        """Healthy providers first, then by p50 latency, then configured order"""
+        with self._lock:
+            def key(provider):
+                tracker = self._trackers[provider]
+                measured = len(tracker.latencies) >= self.min_samples
+                return (
+                    tracker.error_rate > self.max_error_rate,
+                    tracker.percentile(50) if measured else 0.0,
+                    self.providers.index(provider)
+                )
+            return sorted(providers, key=key)
+
+    def hedge_delay(self, provider: str) -> float:
+        """Seconds to wait on a provider before sending a hedged request"""
+        with self._lock:
+            tracker = self._trackers[provider]
+            if len(tracker.latencies) < self.min_samples:
+                delay_ms = self.hedge_default_delay_ms
+            else:
+                delay_ms = max(self.hedge_min_delay_ms, tracker.percentile(self.hedge_percentile))
+        return delay_ms / 1000
+
+    def call(self, attempts: List[Tuple[str, Callable[[], Any]]], hedge: bool = False, route: bool = True) -> Any:
+        """Run (provider, fn) attempts until one succeeds and return its result.
+
+        With route=True attempts are reordered by order(). A failure starts
+        the next attempt immediately; with hedge=True the next attempt also
+        starts once the first exceeds its hedge delay, and whichever
+        succeeds first wins (the other is left to finish in the background).
+        """
+        functions = dict(attempts)
+        queue = self.order(list(functions)) if route else [provider for provider, _ in attempts]
+        pending: Dict[Future, str] = {}
+        errors = []
+        hedged = False
+
+        def launch():
+            provider = queue.pop(0)
+            start = time.perf_counter()
+            future = self._executor.submit(contextvars.copy_context().run, functions[provider])
+            future.add_done_callback(lambda f: self._record(provider, start, f))
+            pending[future] = provider
+
+        with self._lock:
+            self._stats['calls'] += 1
+        primary = queue[0]
+        launch()
+        while pending:
+            timeout = None
+            if hedge and not hedged and queue and len(pending) == 1:
+                timeout = self.hedge_delay(primary)
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                with self._lock:
+                    self._stats['hedged'] += 1
+                launch()
+                continue
+            for future in done:
+                provider = pending.pop(future)
+                if future.exception() is None:
+                    if hedged and provider != primary:
+                        with self._lock:
+                            self._stats['hedge_wins'] += 1
+                    return future.result()
+                errors.append(f"{provider}: {future.exception()}")
+            if not pending and queue:
+                with self._lock:
+                    self._stats['failovers'] += 1
+                launch()
+        raise RuntimeError("All providers failed: " + "; ".join(errors))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                'providers': {
+                    provider: {
+                        'p50_ms': round(tracker.percentile(50), 2),
+                        'p99_ms': round(tracker.percentile(99), 2),
+                        'samples': len(tracker.latencies),
+                        'error_rate': round(tracker.error_rate, 4)
+                    }
+                    for provider, tracker in self._trackers.items()
+                }
+            }
@@ -1,47 +1,123 @@
 """RAG (Retrieval Augmented Generation) service"""
-from typing import Dict, List, Any
+import contextvars
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Tuple, Optional, AsyncIterator
 from backend.services.vector_service import VectorService
-from backend.services.llm_service import LLMService
+from backend.services.llm_service import LLMService, FallbackResponse, completion_flights
+from backend.services.semantic_cache import SemanticCache
+from backend.services.keyword_index import tokenize
+from backend.services.rate_limiter import admission_context, iterate_in_context
 from backend.config.settings import get_settings
+from backend.utils.concurrency import run_blocking, iterate_blocking
+from backend.utils.singleflight import SingleFlight, AsyncSingleFlight
 
 settings = get_settings()
 
+NO_CONTEXT_ANSWER = "I don't have specific information about that topic in my knowledge base. You can ask me about GPU optimization, cost management, workload management, model training, or infrastructure monitoring. What would you like to know?"
+
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n+")
+
+# Runs the lexical and vector legs of hybrid retrieval side by side
+retrieval_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="rag-retrieval")
+
+# Answers for near-duplicate questions, per tenant
+semantic_cache = None
+if settings.semantic_cache_enabled:
+    semantic_cache = SemanticCache(
+        threshold=settings.semantic_cache_threshold,
+        max_entries_per_tenant=settings.semantic_cache_max_entries,
+        ttl_seconds=settings.semantic_cache_ttl_seconds
+    )
+
+# Identical concurrent questions from one tenant share a single pipeline run
+query_flights = SingleFlight('rag_queries')
+aquery_flights = AsyncSingleFlight('rag_aqueries')
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def _flight_key(query: str, tenant_id: str, use_cache: bool) -> tuple:
+    return tenant_id, ' '.join(query.lower().split()), use_cache
+
+
+def reciprocal_rank_fusion(result_lists: List[List[Dict[str, Any]]], k: int = 60) -> List[Dict[str, Any]]:
+    """Merge ranked lists by summing 1 / (k + rank) per document"""
+    fused: Dict[str, Dict[str, Any]] = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            key = doc.get('chunk_id') or doc.get('doc_id') or doc.get('title')
+            entry = fused.get(key)
+            if entry is None:
+                entry = fused[key] = {**doc, 'fusion_score': 0.0}
+            else:
+                entry['similarity_score'] = max(entry.get('similarity_score', 0), doc.get('similarity_score', 0))
+            entry['fusion_score'] += 1.0 / (k + rank)
+    return sorted(fused.values(), key=lambda doc: doc['fusion_score'], reverse=True)
+
+
+def weighted_score_fusion(
+    vector_results: List[Dict[str, Any]],
+    keyword_results: List[Dict[str, Any]],
+    vector_weight: float = 0.5
+) -> List[Dict[str, Any]]:
+    """Merge lists by a weighted sum of min-max normalised scores"""
+    fused: Dict[str, Dict[str, Any]] = {}
+    legs = [
+        (vector_results, 'similarity_score', vector_weight),
+        (keyword_results, 'bm25_score', 1.0 - vector_weight)
+    ]
+    for results, score_key, weight in legs:
+        if not results:
+            continue
+        scores = [doc.get(score_key, doc.get('similarity_score', 0)) for doc in results]
+        low, high = min(scores), max(scores)
+        for doc, score in zip(results, scores):
+            normalized = (score - low) / (high - low) if high > low else 1.0
+            key = doc.get('chunk_id') or doc.get('doc_id') or doc.get('title')
+            entry = fused.get(key)
+            if entry is None:
+                entry = fused[key] = {**doc, 'fusion_score': 0.0}
+            else:
+                entry['similarity_score'] = max(entry.get('similarity_score', 0), doc.get('similarity_score', 0))
+            entry['fusion_score'] += weight * normalized
+    return sorted(fused.values(), key=lambda doc: doc['fusion_score'], reverse=True)
+
 
 class RAGService:
     """Complete RAG pipeline service"""
     
     def __init__(self):
-        self.vector_service = VectorService()
         self.llm_service = LLMService()
+        self.vector_service = VectorService(self.llm_service)
     
-    def query(self, query: str, tenant_id: str) -> Dict[str, Any]:
-        """Complete RAG query pipeline"""
-        try:
-            query_lower = query.lower().strip()
-            
-            # Handle simple greetings and casual queries
-            simple_greetings = ['hi', 'hello', 'hey', 'good morning', 'good afternoon', 'good evening', 'howdy', 'greetings']
-            is_simple_greeting = any(query_lower == greeting or query_lower.startswith(greeting + ' ') for greeting in simple_greetings)
-            
-            if is_simple_greeting or len(query_lower) < 10:
-                # Simple, friendly response for greetings
-                return {
-                    'answer': "Hello! I'm here to help you with questions about AI infrastructure, workload management, cost optimization, and more. What would you like to know?",
-                    'sources': [],
-                    'confidence_score': 0.95
-                }
-            
-            # Step 1: Vector search to retrieve relevant documents
-            relevant_docs = self.vector_service.search(query, tenant_id, top_k=3)
-            
-            # Step 2: Generate response using LLM with context
-            if relevant_docs and len(relevant_docs) > 0:
-                context = "\n\n".join([
-                    f"Document: {doc['title']}\n{doc['content']}"
-                    for doc in relevant_docs
-                ])
-                
-                prompt = f"""You are an AI assistant helping with infrastructure questions. Keep responses concise and helpful.
+    def _greeting_response(self, query: str):
+        """Canned reply for greetings and very short queries, or None"""
+        query_lower = query.lower().strip()
+        
+        # Handle simple greetings and casual queries
+        simple_greetings = ['hi', 'hello', 'hey', 'good morning', 'good afternoon', 'good evening', 'howdy', 'greetings']
+        is_simple_greeting = any(query_lower == greeting or query_lower.startswith(greeting + ' ') for greeting in simple_greetings)
+        
+        if is_simple_greeting or len(query_lower) < 10:
+            # Simple, friendly response for greetings
+            return {
+                'answer': "Hello! I'm here to help you with questions about AI infrastructure, workload management, cost optimization, and more. What would you like to know?",
+                'sources': [],
+                'confidence_score': 0.95
+            }
+        return None
+    
+    def _build_prompt(self, query: str, relevant_docs: List[Dict[str, Any]]) -> str:
+        context = "\n\n".join([
+            f"Document: {doc['title']}\n{doc['content']}"
+            for doc in relevant_docs
+        ])
+        
+        return f"""You are an AI assistant helping with infrastructure questions. Keep responses concise and helpful.
 
 Context from knowledge base:
 {context}
@@ -49,31 +125,204 @@ Context from knowledge base:
 Question: {query}
 
 Please provide a helpful, concise answer based on the context above. If the context doesn't contain relevant information, say so briefly."""
-                
-                answer = self.llm_service.generate_response(prompt, max_tokens=500)
-                
-                # Calculate confidence based on similarity scores
-                avg_similarity = sum(doc.get('similarity_score', 0) for doc in relevant_docs) / len(relevant_docs)
-                confidence = min(0.95, max(0.3, avg_similarity))
-            else:
-                # No relevant documents found - provide helpful guidance
-                answer = "I don't have specific information about that topic in my knowledge base. You can ask me about GPU optimization, cost management, workload management, model training, or infrastructure monitoring. What would you like to know?"
-                confidence = 0.3
+    
+    def _confidence(self, relevant_docs: List[Dict[str, Any]]) -> float:
+        """Confidence based on similarity scores"""
+        if not relevant_docs:
+            return 0.3
+        avg_similarity = sum(doc.get('similarity_score', 0) for doc in relevant_docs) / len(relevant_docs)
+        return min(0.95, max(0.3, avg_similarity))
+    
+    def _format_sources(self, relevant_docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """One source entry per document, even if several passages matched"""
+        sources = []
+        seen_docs = set()
+        for doc in relevant_docs:
+            doc_key = doc.get('doc_id') or doc['title']
+            if doc_key in seen_docs:
+                continue
+            seen_docs.add(doc_key)
+            sources.append({
+                'title': doc['title'],
+                'doc_type': doc.get('doc_type', 'guide')
+            })
+        return sources
+    
+    def _extractive_answer(self, query: str, relevant_docs: List[Dict[str, Any]], max_sentences: int = 3) -> str:
+        """Answer from the retrieved passages' best-matching sentences, without an LLM.
+        
+        Used while every LLM provider's circuit is open.
+        """
+        terms = set(tokenize(query))
+        candidates = []
+        for rank, doc in enumerate(relevant_docs):
+            for position, sentence in enumerate(SENTENCE_BREAK.split(doc.get('content', ''))):
+                sentence = sentence.strip()
+                if len(sentence) < 20:
+                    continue
+                overlap = len(terms & set(tokenize(sentence)))
+                candidates.append((-overlap, rank, position, sentence))
+        if not candidates:
+            return NO_CONTEXT_ANSWER
+        
+        best = sorted(sorted(candidates)[:max_sentences], key=lambda candidate: (candidate[1], candidate[2]))
+        titles = list(dict.fromkeys(relevant_docs[rank]['title'] for _, rank, _, _ in best))
+        return f"From {', '.join(titles)}: " + " ".join(sentence for _, _, _, sentence in best)
+    
+    @property
+    def semantic_cache_active(self) -> bool:
+        """Only model embeddings separate paraphrases from unrelated questions"""
+        return semantic_cache is not None and (self.llm_service.use_openai or self.llm_service.use_bedrock)
+    
+    def _cache_lookup(self, query: str, tenant_id: str, use_cache: bool = True) -> Tuple[Optional[Dict[str, Any]], Optional[tuple]]:
+        """Cached answer for a near-duplicate query, plus the key to store a fresh answer under"""
+        if not self.semantic_cache_active:
+            return None, None
+        try:
+            embedding = self.llm_service.generate_embedding(query)
+            version = self.vector_service.corpus_version(tenant_id)
+            cached = semantic_cache.lookup(tenant_id, embedding, version) if use_cache else None
+            return cached, (embedding, version)
+        except Exception as e:
+            print(f"Error checking semantic cache: {e}")
+            return None, None
+    
+    def _cache_store(self, tenant_id: str, cache_key: Optional[tuple], response: Dict[str, Any]):
+        if cache_key is not None:
+            embedding, version = cache_key
+            semantic_cache.store(tenant_id, embedding, {
+                'answer': response['answer'],
+                'sources': response['sources'],
+                'confidence_score': response['confidence_score']
+            }, version)
+    
+    def semantic_cache_stats(self) -> Dict[str, Any]:
+        """Semantic answer cache counters"""
+        if not self.semantic_cache_active:
+            return {'enabled': False}
+        return {'enabled': True, **semantic_cache.stats()}
+    
+    def coalescing_stats(self) -> Dict[str, Any]:
+        """Executed vs coalesced counts for the single-flight groups"""
+        return {
+            'enabled': settings.request_coalescing_enabled,
+            'queries': query_flights.stats(),
+            'async_queries': aquery_flights.stats(),
+            'completions': completion_flights.stats()
+        }
+    
+    def query(self, query: str, tenant_id: str, use_cache: bool = True) -> Dict[str, Any]:
+        """Complete RAG query pipeline
+        
+        Concurrent calls with the same tenant and (case/whitespace-normalised)
+        question share one run.
+        """
+        with admission_context('interactive', tenant_id):
+            if not settings.request_coalescing_enabled:
+                return self._query(query, tenant_id, use_cache)
+            return dict(query_flights.do(_flight_key(query, tenant_id, use_cache), self._query, query, tenant_id, use_cache))
+    
+    def _query(self, query: str, tenant_id: str, use_cache: bool) -> Dict[str, Any]:
+        try:
+            greeting = self._greeting_response(query)
+            if greeting is not None:
+                return greeting
             
-            # Format sources
-            sources = [
-                {
-                    'title': doc['title'],
-                    'doc_type': doc.get('doc_type', 'guide')
-                }
-                for doc in relevant_docs
-            ]
+            start = time.perf_counter()
             
+            # Step 0: Reuse the answer to a near-duplicate question
+            cached, cache_key = self._cache_lookup(query, tenant_id, use_cache)
+            if cached is not None:
+                return {**cached, 'cached': True, 'timings': {'total_ms': _elapsed_ms(start)}}
+            
+            # Step 1: Retrieve relevant documents
+            relevant_docs, timings = self.retrieve(query, tenant_id, top_k=3)
+            
+            # Step 2: Generate response using LLM with context
+            generation_start = time.perf_counter()
+            llm_available = self.llm_service.completions_available()
+            if relevant_docs and not llm_available:
+                answer = self._extractive_answer(query, relevant_docs)
+            elif relevant_docs:
+                answer = self.llm_service.generate_response(
+                    self._build_prompt(query, relevant_docs),
+                    max_tokens=500,
+                    use_cache=use_cache
+                )
+            else:
+                answer = NO_CONTEXT_ANSWER
+            timings['generation_ms'] = _elapsed_ms(generation_start)
+            timings['total_ms'] = _elapsed_ms(start)
+            
+            response = {
+                'answer': answer,
+                'sources': self._format_sources(relevant_docs),
+                'confidence_score': self._confidence(relevant_docs),
+                'timings': timings
+            }
+            if llm_available and not isinstance(answer, FallbackResponse):
+                self._cache_store(tenant_id, cache_key, response)
+            return response
+        except Exception as e:
+            print(f"Error in RAG query: {e}")
+            # Fallback response
             return {
+                'answer': "I'm sorry, I encountered an error processing your question. Please try again.",
+                'sources': [],
+                'confidence_score': 0.1
+            }
+    
+    async def aquery(self, query: str, tenant_id: str, use_cache: bool = True) -> Dict[str, Any]:
+        """RAG query pipeline for async callers.
+        
+        Retrieval and generation run on the bounded blocking executor with
+        per-stage concurrency limits, so a slow provider call never blocks
+        the event loop. Identical concurrent questions share one run.
+        """
+        with admission_context('interactive', tenant_id):
+            if not settings.request_coalescing_enabled:
+                return await self._aquery(query, tenant_id, use_cache)
+            return dict(await aquery_flights.do(_flight_key(query, tenant_id, use_cache), self._aquery, query, tenant_id, use_cache))
+    
+    async def _aquery(self, query: str, tenant_id: str, use_cache: bool) -> Dict[str, Any]:
+        try:
+            greeting = self._greeting_response(query)
+            if greeting is not None:
+                return greeting
+            
+            start = time.perf_counter()
+            cached, cache_key = await run_blocking('retrieval', self._cache_lookup, query, tenant_id, use_cache)
+            if cached is not None:
+                return {**cached, 'cached': True, 'timings': {'total_ms': _elapsed_ms(start)}}
+            
+            relevant_docs, timings = await run_blocking('retrieval', self.retrieve, query, tenant_id, 3)
+            
+            generation_start = time.perf_counter()
+            llm_available = self.llm_service.completions_available()
+            if relevant_docs and not llm_available:
+                answer = self._extractive_answer(query, relevant_docs)
+            elif relevant_docs:
+                answer = await run_blocking(
+                    'llm',
+                    self.llm_service.generate_response,
+                    self._build_prompt(query, relevant_docs),
+                    max_tokens=500,
+                    use_cache=use_cache
+                )
+            else:
+                answer = NO_CONTEXT_ANSWER
+            timings['generation_ms'] = _elapsed_ms(generation_start)
+            timings['total_ms'] = _elapsed_ms(start)
+            
+            response = {
                 'answer': answer,
-                'sources': sources,
-                'confidence_score': confidence
+                'sources': self._format_sources(relevant_docs),
+                'confidence_score': self._confidence(relevant_docs),
+                'timings': timings
             }
+            if llm_available and not isinstance(answer, FallbackResponse):
+                self._cache_store(tenant_id, cache_key, response)
+            return response
         except Exception as e:
             print(f"Error in RAG query: {e}")
             # Fallback response
@@ -83,12 +332,156 @@ Please provide a helpful, concise answer based on the context above. If the cont
                 'confidence_score': 0.1
             }
     
+    async def astream(self, query: str, tenant_id: str, use_cache: bool = True) -> AsyncIterator[Dict[str, Any]]:
+        """Streaming RAG pipeline.
+        
+        Yields ``sources`` as soon as retrieval finishes, then ``token`` events
+        as the LLM produces text, then a ``done`` event with the full answer,
+        confidence and timings.
+        """
+        start = time.perf_counter()
+        greeting = self._greeting_response(query)
+        if greeting is not None:
+            yield {'event': 'sources', 'data': {'sources': []}}
+            yield {'event': 'token', 'data': {'text': greeting['answer']}}
+            yield {'event': 'done', 'data': {**greeting, 'timings': {'total_ms': _elapsed_ms(start)}}}
+            return
+        
+        with admission_context('interactive', tenant_id):
+            cached, cache_key = await run_blocking('retrieval', self._cache_lookup, query, tenant_id, use_cache)
+        if cached is not None:
+            yield {'event': 'sources', 'data': {'sources': cached['sources']}}
+            yield {'event': 'token', 'data': {'text': cached['answer']}}
+            yield {'event': 'done', 'data': {**cached, 'cached': True, 'timings': {'total_ms': _elapsed_ms(start)}}}
+            return
+        
+        try:
+            with admission_context('interactive', tenant_id):
+                relevant_docs, timings = await run_blocking('retrieval', self.retrieve, query, tenant_id, 3)
+        except Exception as e:
+            print(f"Error in RAG retrieval: {e}")
+            relevant_docs, timings = [], {}
+            cache_key = None
+        sources = self._format_sources(relevant_docs)
+        yield {'event': 'sources', 'data': {'sources': sources}}
+        
+        generation_start = time.perf_counter()
+        parts = []
+        failed = False
+        if relevant_docs and not self.llm_service.completions_available():
+            failed = True  # Not cached: the LLM answer replaces it once a circuit closes
+            parts.append(self._extractive_answer(query, relevant_docs))
+            yield {'event': 'token', 'data': {'text': parts[0]}}
+        elif relevant_docs:
+            try:
+                # Context is applied inside the generator: this one suspends between tokens
+                async for text in iterate_blocking(
+                    'llm',
+                    iterate_in_context,
+                    'interactive',
+                    tenant_id,
+                    self.llm_service.stream_response,
+                    self._build_prompt(query, relevant_docs),
+                    max_tokens=500,
+                    use_cache=use_cache
+                ):
+                    if not parts:
+                        timings['first_token_ms'] = _elapsed_ms(start)
+                    if isinstance(text, FallbackResponse):
+                        failed = True  # Every provider failed: not cached, like the extractive answer
+                    parts.append(text)
+                    yield {'event': 'token', 'data': {'text': text}}
+            except Exception as e:
+                print(f"Error streaming RAG answer: {e}")
+                failed = True
+                if not parts:
+                    parts.append("I'm sorry, I encountered an error processing your question. Please try again.")
+                    yield {'event': 'token', 'data': {'text': parts[0]}}
+        else:
+            parts.append(NO_CONTEXT_ANSWER)
+            yield {'event': 'token', 'data': {'text': NO_CONTEXT_ANSWER}}
+        timings['generation_ms'] = _elapsed_ms(generation_start)
+        timings['total_ms'] = _elapsed_ms(start)
+        
+        response = {
+            'answer': ''.join(parts),
+            'sources': sources,
+            'confidence_score': self._confidence(relevant_docs),
+            'timings': timings
+        }
+        if not failed:
+            self._cache_store(tenant_id, cache_key, response)
+        yield {'event': 'done', 'data': response}
+    
+    def retrieve(self, query: str, tenant_id: str, top_k: int = 3) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+        """Retrieve documents for a query, returning them with per-stage timings"""
+        start = time.perf_counter()
+        mode = settings.rag_retrieval_mode
+        if mode == 'hybrid' and not self.vector_service.has_semantic_backend:
+            mode = 'keyword'
+        
+        if mode == 'hybrid':
+            docs, timings = self._hybrid_retrieve(query, tenant_id, top_k)
+        elif mode == 'vector':
+            docs, timings = self.vector_service.semantic_search(query, tenant_id, top_k), {}
+        elif mode == 'keyword':
+            docs, timings = self.vector_service.keyword_search(query, tenant_id, top_k), {}
+        else:
+            docs, timings = self.vector_service.search(query, tenant_id, top_k), {}
+        
+        timings['retrieval_ms'] = _elapsed_ms(start)
+        return docs, timings
+    
+    def _hybrid_retrieve(self, query: str, tenant_id: str, top_k: int) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+        """Run lexical and vector retrieval concurrently and fuse the rankings"""
+        candidates = max(top_k, settings.rag_hybrid_candidates)
+        
+        def timed(search):
+            leg_start = time.perf_counter()
+            try:
+                return search(query, tenant_id, candidates), _elapsed_ms(leg_start)
+            except Exception as e:
+                print(f"Error in hybrid retrieval leg: {e}")
+                return [], _elapsed_ms(leg_start)
+        
+        # Each leg runs in a copy of the caller's context (admission priority, tenant)
+        vector_future = retrieval_executor.submit(contextvars.copy_context().run, timed, self.vector_service.semantic_search)
+        keyword_future = retrieval_executor.submit(contextvars.copy_context().run, timed, self.vector_service.keyword_search)
+        vector_results, vector_ms = vector_future.result()
+        keyword_results, keyword_ms = keyword_future.result()
+        
+        fusion_start = time.perf_counter()
+        if settings.rag_fusion_method == 'weighted':
+            fused = weighted_score_fusion(vector_results, keyword_results, settings.rag_hybrid_vector_weight)
+        else:
+            fused = reciprocal_rank_fusion([vector_results, keyword_results], k=settings.rag_rrf_k)
+        
+        return fused[:top_k], {
+            'vector_ms': vector_ms,
+            'keyword_ms': keyword_ms,
+            'fusion_ms': _elapsed_ms(fusion_start)
+        }
+    
     def index_document(self, doc_id: str, title: str, content: str, doc_type: str, tenant_id: str):
         """Index a document in the vector store"""
         try:
-            self.vector_service.index_document(doc_id, title, content, doc_type, tenant_id)
+            # Ingestion embeddings queue behind interactive queries
+            with admission_context('bulk', tenant_id):
+                self.vector_service.index_document(doc_id, title, content, doc_type, tenant_id)
         except Exception as e:
             print(f"Error indexing document: {e}")
+        finally:
+            if semantic_cache is not None:
+                semantic_cache.invalidate(tenant_id)
+    
+    def reembed_pending(self, tenant_id: str) -> int:
+        """Add vectors for documents indexed by keyword only during an embedding outage"""
+        try:
+            with admission_context('bulk', tenant_id):
+                return self.vector_service.reembed_pending(tenant_id)
+        finally:
+            if semantic_cache is not None:
+                semantic_cache.invalidate(tenant_id)
     
     def delete_document(self, doc_id: str, tenant_id: str):
         """Delete a document from the vector store"""
@@ -96,4 +489,7 @@ Please provide a helpful, concise answer based on the context above. If the cont
             self.vector_service.delete_document(doc_id, tenant_id)
         except Exception as e:
             print(f"Error deleting document: {e}")
+        finally:
+            if semantic_cache is not None:
+                semantic_cache.invalidate(tenant_id)
 
@@ -0,0 +1,164 @@
+"""Admission control for provider calls: token buckets + priority queue"""
+import contextvars
+import itertools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+PRIORITIES = {'interactive': 0, 'bulk': 1}
+
+# Who a provider call is made for; copied into executor threads by run_blocking
+request_priority: contextvars.ContextVar = contextvars.ContextVar('request_priority', default='interactive')
+request_tenant: contextvars.ContextVar = contextvars.ContextVar('request_tenant', default=None)
+
+
+@contextmanager
+def admission_context(priority: str = 'interactive', tenant_id: Optional[str] = None):
+    """Tag provider calls made inside the block with a priority and tenant"""
+    priority_token = request_priority.set(priority)
+    tenant_token = request_tenant.set(tenant_id)
+    try:
+        yield
+    finally:
+        request_priority.reset(priority_token)
+        request_tenant.reset(tenant_token)
+
+
+def iterate_in_context(priority: str, tenant_id: Optional[str], func, *args, **kwargs):
+    """Generator counterpart of admission_context for streams consumed via iterate_blocking"""
+    with admission_context(priority, tenant_id):
+        yield from func(*args, **kwargs)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)"""
+    return max(1, len(text) // 4)
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a call could not be admitted within the wait budget"""
+
+
+class TokenBucket:
+    """Refills continuously at rate_per_minute up to capacity (one minute of budget)"""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.available = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount can be taken (0 if available now)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.available >= amount else (amount - self.available) / self.rate
+
+    def take(self, amount: float):
+        self.available -= min(amount, self.capacity)
+
+    def give_back(self, amount: float):
+        self.available = min(self.capacity, self.available + amount)
+
+
+class ProviderLimiter:
+    """Request and token budgets for one provider model.
+
+    Waiting calls are admitted in priority order (interactive before bulk);
+    within a priority the tenant with the least recent usage goes first,
+    then arrival order.
+    """
+
+    def __init__(self, name: str, requests_per_minute: float, tokens_per_minute: float, usage_half_life: float = 60.0):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.usage_half_life = usage_half_life
+        self._usage: Dict[Optional[str], float] = {}
+        self._usage_updated = time.monotonic()
+        self._waiters: Dict[int, tuple] = {}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._stats = {'admitted': 0, 'queued': 0, 'timeouts': 0, 'wait_ms_total': 0.0}
+
+    def _decay_usage(self, now: float):
+        factor = math.pow(0.5, (now - self._usage_updated) / self.usage_half_life)
+        self._usage = {tenant: usage * factor for tenant, usage in self._usage.items() if usage * factor > 1}
+        self._usage_updated = now
+
+    def _next_waiter(self) -> int:
+        return min(
+            self._waiters,
+            key=lambda seq: (self._waiters[seq][0], self._usage.get(self._waiters[seq][1], 0.0), seq)
+        )
+
+    def acquire(self, tokens: int, priority: Optional[str] = None, tenant_id: Optional[str] = None, timeout: float = 30.0) -> int:
+        """Block until one request and `tokens` tokens are available.
+
+        Priority and tenant default to the current admission_context.
+        Returns the tokens taken, for settle().
+        """
+        priority = priority or request_priority.get()
+        tenant_id = tenant_id if tenant_id is not None else request_tenant.get()
+        start = time.monotonic()
+        deadline = start + timeout
+        with self._condition:
+            seq = next(self._sequence)
+            self._waiters[seq] = (PRIORITIES.get(priority, 0), tenant_id)
+            try:
+                while True:
+                    now = time.monotonic()
+                    delay = None
+                    if self._next_waiter() == seq:
+                        delay = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+                        if delay == 0:
+                            self.requests.take(1)
+                            self.tokens.take(tokens)
+                            self._decay_usage(now)
+                            self._usage[tenant_id] = self._usage.get(tenant_id, 0.0) + tokens
+                            self._stats['admitted'] += 1
+                            waited = now - start
+                            if waited > 0.001:
+                                self._stats['queued'] += 1
+                            self._stats['wait_ms_total'] += waited * 1000
+                            return tokens
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise RateLimitTimeout(f"{self.name}: not admitted within {timeout}s")
+                    self._condition.wait(min(remaining, delay) if delay is not None else remaining)
+            finally:
+                del self._waiters[seq]
+                self._condition.notify_all()
+
+    def settle(self, estimated: int, actual: Optional[int]):
+        """Correct the token bucket once the provider reports real usage"""
+        if actual is None:
+            return
+        with self._condition:
+            if actual < estimated:
+                self.tokens.give_back(estimated - actual)
+            else:
+                self.tokens.take(actual - estimated)
+            self._condition.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            now = time.monotonic()
+            self.requests.wait_time(0, now)
+            self.tokens.wait_time(0, now)
+            return {
+                **self._stats,
+                'wait_ms_total': round(self._stats['wait_ms_total'], 2),
+                'waiting': len(self._waiters),
+                'requests_available': round(self.requests.available, 2),
+                'requests_per_minute': self.requests.capacity,
+                'tokens_available': round(self.tokens.available, 2),
+                'tokens_per_minute': self.tokens.capacity
+            }
@@ -0,0 +1,356 @@
+"""Incremental metric rollups: count/sum/min/max/sumsq per time bucket"""
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from botocore.exceptions import ClientError
+from backend.config.settings import get_settings
+from backend.database import dynamodb_resource, get_table, TABLES
+from backend.services.dynamodb_service import DynamoDBService, to_dynamodb
+
+settings = get_settings()
+
+RESOLUTIONS = {'minute': 60, 'hour': 3600, 'day': 86400}
+
+# Seconds a bucket is kept after it closes (None = forever); enforced by the table's TTL
+RETENTION = {
+    'minute': settings.rollup_minute_retention_hours * 3600,
+    'hour': settings.rollup_hour_retention_days * 86400,
+    'day': None,
+}
+
+FIELDS = ('cpu_usage', 'memory_usage', 'gpu_usage')
+
+
+def series_key(scope: str, scope_id: str, resolution: str) -> str:
+    """Partition key of a rollup series, e.g. tenant#default-tenant#day"""
+    return f"{scope}#{scope_id}#{resolution}"
+
+
+class BucketStats:
+    """Running aggregates of the samples falling in one bucket"""
+
+    def __init__(self):
+        self.count = 0
+        self.sums = dict.fromkeys(FIELDS, 0.0)
+        self.sumsqs = dict.fromkeys(FIELDS, 0.0)
+        self.mins: Dict[str, float] = {}
+        self.maxs: Dict[str, float] = {}
+
+    def add(self, metric: Dict[str, Any]):
+        self.count += 1
+        for field in FIELDS:
+            value = float(metric.get(field) or 0.0)
+            self.sums[field] += value
+            self.sumsqs[field] += value * value
+            self.mins[field] = min(self.mins.get(field, value), value)
+            self.maxs[field] = max(self.maxs.get(field, value), value)
+
+    def merge(self, other: 'BucketStats'):
+        self.count += other.count
+        for field in FIELDS:
+            self.sums[field] += other.sums[field]
+            self.sumsqs[field] += other.sumsqs[field]
+            if field in other.mins:
+                self.mins[field] = min(self.mins.get(field, other.mins[field]), other.mins[field])
+                self.maxs[field] = max(self.maxs.get(field, other.maxs[field]), other.maxs[field])
+
+
+def summarize(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Mean, min, max and standard deviation per field for a stored rollup row"""
+    count = int(row.get('sample_count', 0))
+    summary: Dict[str, Any] = {'bucket': int(row['bucket']), 'count': count}
+    for field in FIELDS:
+        if not count:
+            summary[field] = None
+            continue
+        mean = float(row.get(f'{field}_sum', 0)) / count
+        variance = max(0.0, float(row.get(f'{field}_sumsq', 0)) / count - mean * mean)
+        summary[field] = {
+            'mean': mean,
+            'min': float(row[f'{field}_min']) if f'{field}_min' in row else None,
+            'max': float(row[f'{field}_max']) if f'{field}_max' in row else None,
+            'stddev': math.sqrt(variance)
+        }
+    return summary
+
+
+class RollupService:
+    """Maintains metric_rollups: one row per (series, bucket) for every workload and
+    tenant at minute, hour and day resolution.
+
+    Samples are grouped by row first (see RollupBuffer), so a batch costs
+    one ADD update per touched row, plus a conditional update when a min
+    or max moves. Trend queries read one row per bucket instead of raw
+    samples.
+    """
+
+    @staticmethod
+    def aggregate(metrics: Iterable[Dict[str, Any]]) -> Dict[Tuple[str, str, int], BucketStats]:
+        """Per (workload_id, resolution, bucket) aggregates of samples"""
+        rows: Dict[Tuple[str, str, int], BucketStats] = defaultdict(BucketStats)
+        for metric in metrics:
+            timestamp = int(metric['timestamp'])
+            for resolution, seconds in RESOLUTIONS.items():
+                rows[(metric['workload_id'], resolution, timestamp - timestamp % seconds)].add(metric)
+        return rows
+
+    @staticmethod
+    def workload_tenants(workload_ids: List[str], max_retries: int = 5) -> Dict[str, str]:
+        """Owning tenant of each workload that exists (BatchGetItem, 100 ids per call)"""
+        table_name = TABLES['workloads']
+        tenants: Dict[str, str] = {}
+        for start in range(0, len(workload_ids), 100):
+            keys = [{'id': workload_id} for workload_id in workload_ids[start:start + 100]]
+            attempt = 0
+            while keys:
+                response = dynamodb_resource.batch_get_item(RequestItems={table_name: {
+                    'Keys': keys,
+                    'ProjectionExpression': 'id, tenant_id'
+                }})
+                for item in response.get('Responses', {}).get(table_name, []):
+                    if item.get('tenant_id'):
+                        tenants[item['id']] = item['tenant_id']
+                keys = response.get('UnprocessedKeys', {}).get(table_name, {}).get('Keys', [])
+                if keys:
+                    attempt += 1
+                    if attempt > max_retries:
+                        raise RuntimeError(f"{len(keys)} workload lookups unprocessed after {max_retries} retries")
+                    time.sleep(min(2.0, 0.05 * 2 ** attempt) * random.uniform(0.5, 1.0))
+        return tenants
+
+    @staticmethod
+    def apply(series: str, bucket: int, stats: BucketStats):
+        """Fold one row's aggregates into DynamoDB"""
+        table = get_table('metric_rollups')
+        key = {'series': series, 'bucket': bucket}
+        resolution = series.rsplit('#', 1)[1]
+        adds = ['sample_count :count']
+        values: Dict[str, Any] = {':count': stats.count}
+        for field in FIELDS:
+            adds += [f'{field}_sum :{field}_sum', f'{field}_sumsq :{field}_sumsq']
+            values[f':{field}_sum'] = stats.sums[field]
+            values[f':{field}_sumsq'] = stats.sumsqs[field]
+        expression = 'ADD ' + ', '.join(adds)
+        if RETENTION[resolution] is not None:
+            expression += ' SET expires_at = :expires_at'
+            values[':expires_at'] = bucket + RESOLUTIONS[resolution] + RETENTION[resolution]
+        current = table.update_item(
+            Key=key,
+            UpdateExpression=expression,
+            ExpressionAttributeValues=to_dynamodb(values),
+            ReturnValues='ALL_NEW'
+        )['Attributes']
+
+        # The sums are in: failures from here on must not cause the row to be re-added
+        try:
+            RollupService._fold_extremes(table, key, stats, current)
+        except Exception as e:
+            print(f"Error updating rollup extremes for {series}@{bucket}: {e}")
+
+    @staticmethod
+    def _fold_extremes(table, key: Dict[str, Any], stats: BucketStats, current: Dict[str, Any]):
+        # DynamoDB has no atomic min/max: set the extremes that beat the stored ones, conditionally
+        extremes = [(f'{field}_min', stats.mins[field], '>') for field in FIELDS]
+        extremes += [(f'{field}_max', stats.maxs[field], '<') for field in FIELDS]
+        moved = [
+            (attribute, value, stored_is) for attribute, value, stored_is in extremes
+            if attribute not in current
+            or (float(current[attribute]) > value if stored_is == '>' else float(current[attribute]) < value)
+        ]
+        if moved and not RollupService._set_extremes(table, key, moved):
+            # Another writer moved one of them first: retry each on its own
+            for extreme in moved:
+                RollupService._set_extremes(table, key, [extreme])
+
+    @staticmethod
+    def _set_extremes(table, key: Dict[str, Any], extremes: List[Tuple[str, float, str]]) -> bool:
+        try:
+            table.update_item(
+                Key=key,
+                UpdateExpression='SET ' + ', '.join(f'{attribute} = :v{i}' for i, (attribute, _, _) in enumerate(extremes)),
+                ConditionExpression=' AND '.join(
+                    f'(attribute_not_exists({attribute}) OR {attribute} {stored_is} :v{i})'
+                    for i, (attribute, _, stored_is) in enumerate(extremes)
+                ),
+                ExpressionAttributeValues={f':v{i}': Decimal(str(value)) for i, (_, value, _) in enumerate(extremes)}
+            )
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            return False
+
+    @staticmethod
+    def query(scope: str, scope_id: str, resolution: str, start: int, end: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Summarised rows of a series with start <= bucket <= end, oldest first"""
+        end = end if end is not None else int(time.time())
+        return [
+            summarize(row)
+            for row in DynamoDBService.paginate(
+                'metric_rollups',
+                KeyConditionExpression='#series = :series AND #bucket BETWEEN :start AND :end',
+                ExpressionAttributeNames={'#series': 'series', '#bucket': 'bucket'},
+                ExpressionAttributeValues={
+                    ':series': series_key(scope, scope_id, resolution),
+                    ':start': start,
+                    ':end': end
+                }
+            )
+        ]
+
+
+class RollupBuffer:
+    """Aggregates ingested samples in memory and folds them into metric_rollups
+    from a daemon thread every flush_interval seconds.
+
+    Requests only merge into pending rows, so a busy tenant row gets one
+    update per flush rather than one per request. Tenant rows are
+    attributed to each workload's owner, looked up (and remembered) at
+    flush time. A row whose ADD update fails is retried on later flushes,
+    up to max_attempts; stop() flushes what is pending.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = 5.0,
+        concurrency: int = 8,
+        max_attempts: int = 5,
+        max_tenants: int = 100000
+    ):
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.max_tenants = max_tenants
+        self._samples: Dict[Tuple[str, str, int], BucketStats] = defaultdict(BucketStats)
+        # Samples already in workload rows whose tenant rows await an owner lookup
+        self._unattributed: Dict[Tuple[str, str, int], BucketStats] = defaultdict(BucketStats)
+        self._retries: Dict[Tuple[str, int], BucketStats] = {}
+        self._attempts: Dict[Tuple[str, int], int] = {}
+        self._tenants: Dict[str, str] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="rollups")
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stats = {'samples': 0, 'flushes': 0, 'rows': 0, 'retries': 0, 'failed': 0, 'unattributed': 0}
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="rollup-buffer", daemon=True)
+                self._thread.start()
+
+    def add(self, metrics: List[Dict[str, Any]]):
+        """Queue samples for the next flush (never touches DynamoDB)"""
+        rows = RollupService.aggregate(metrics)
+        with self._lock:
+            for key, stats in rows.items():
+                self._samples[key].merge(stats)
+            self._stats['samples'] += len(metrics)
+        self._ensure_started()
+
+    def _run(self):
+        while not self._stopping.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+
+    def _attribute(self, workload_ids: List[str]) -> Dict[str, str]:
+        missing = [workload_id for workload_id in workload_ids if workload_id not in self._tenants]
+        if missing:
+            if len(self._tenants) + len(missing) > self.max_tenants:
+                self._tenants.clear()
+            self._tenants.update(RollupService.workload_tenants(missing))
+        return {workload_id: self._tenants[workload_id] for workload_id in workload_ids if workload_id in self._tenants}
+
+    def flush(self):
+        """Apply every pending row"""
+        with self._flush_lock:
+            with self._lock:
+                samples, self._samples = self._samples, defaultdict(BucketStats)
+                unattributed, self._unattributed = self._unattributed, defaultdict(BucketStats)
+                rows, self._retries = self._retries, {}
+            if not samples and not unattributed and not rows:
+                return
+
+            def row(series: str, bucket: int) -> BucketStats:
+                stats = rows.get((series, bucket))
+                if stats is None:
+                    stats = rows[(series, bucket)] = BucketStats()
+                return stats
+
+            for (workload_id, resolution, bucket), stats in samples.items():
+                row(series_key('workload', workload_id, resolution), bucket).merge(stats)
+                unattributed[(workload_id, resolution, bucket)].merge(stats)
+            try:
+                tenants = self._attribute(list({workload_id for workload_id, _, _ in unattributed}))
+            except Exception as e:
+                # Workload rows go out now; tenant rows wait for the next flush
+                print(f"Error looking up workload tenants for rollups: {e}")
+                with self._lock:
+                    for key, stats in unattributed.items():
+                        self._unattributed[key].merge(stats)
+                unattributed = {}
+            for (workload_id, resolution, bucket), stats in unattributed.items():
+                if workload_id in tenants:
+                    row(series_key('tenant', tenants[workload_id], resolution), bucket).merge(stats)
+                elif resolution == 'minute':
+                    self._stats['unattributed'] += stats.count  # Unknown workload: no tenant row
+
+            keys = list(rows)
+            results = self._executor.map(lambda key: self._apply(key, rows[key]), keys)
+            failed = [key for key, ok in zip(keys, results) if not ok]
+            with self._lock:
+                for key in keys:
+                    if key not in failed:
+                        self._attempts.pop(key, None)
+                for key in failed:
+                    attempts = self._attempts.get(key, 0) + 1
+                    if attempts >= self.max_attempts:
+                        print(f"Giving up on rollup row {key[0]}@{key[1]} after {attempts} attempts")
+                        self._attempts.pop(key, None)
+                        self._stats['failed'] += 1
+                        continue
+                    self._attempts[key] = attempts
+                    self._stats['retries'] += 1
+                    pending = self._retries.get(key)
+                    if pending is None:
+                        self._retries[key] = rows[key]
+                    else:
+                        pending.merge(rows[key])
+                self._stats['flushes'] += 1
+                self._stats['rows'] += len(keys) - len(failed)
+
+    @staticmethod
+    def _apply(key: Tuple[str, int], stats: BucketStats) -> bool:
+        try:
+            RollupService.apply(key[0], key[1], stats)
+            return True
+        except Exception as e:
+            print(f"Error updating metric rollup {key[0]}@{key[1]}: {e}")
+            return False
+
+    def stop(self, timeout: float = 10.0):
+        """Flush pending rows and stop the thread"""
+        self._stopping.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                'pending_samples': sum(stats.count for stats in self._samples.values()),
+                'pending_retries': len(self._retries)
+            }
+
+
+rollup_buffer = RollupBuffer(
+    flush_interval=settings.rollup_flush_seconds,
+    concurrency=settings.metric_ingest_concurrency
+)
@@ -0,0 +1,106 @@
+"""Per-tenant semantic cache of RAG answers"""
+import threading
+import time
+from typing import Dict, Any, List, Optional
+import numpy as np
+
+
+class TenantAnswerCache:
+    """Ring buffer of (query embedding, answer) pairs for one tenant"""
+
+    def __init__(self, dimension: int, capacity: int):
+        self.dimension = dimension
+        self.capacity = capacity
+        self.embeddings = np.zeros((capacity, dimension), dtype=np.float32)
+        self.created = np.full(capacity, -np.inf)
+        self.versions: List[Any] = [None] * capacity
+        self.responses: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self.next_slot = 0
+
+    def add(self, embedding: np.ndarray, response: Dict[str, Any], version: Any):
+        slot = self.next_slot
+        self.embeddings[slot] = embedding
+        self.created[slot] = time.time()
+        self.versions[slot] = version
+        self.responses[slot] = response
+        self.next_slot = (slot + 1) % self.capacity
+
+    def best_match(self, embedding: np.ndarray, ttl_seconds: float, version: Any):
+        """Most similar live entry as (similarity, response), or None"""
+        live = self.created >= time.time() - ttl_seconds
+        if not live.any():
+            return None
+        scores = np.where(live, self.embeddings @ embedding, -np.inf)
+        for slot in np.argsort(-scores)[:4]:
+            if not np.isfinite(scores[slot]):
+                break
+            if self.versions[slot] == version:
+                return float(scores[slot]), self.responses[slot]
+        return None
+
+
+class SemanticCache:
+    """Return stored answers for queries whose embedding is within a cosine threshold.
+
+    Entries are tagged with the tenant's corpus version, so answers computed
+    before a document upload or delete are never served afterwards, and
+    ``invalidate`` drops a tenant's entries outright.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries_per_tenant: int = 500, ttl_seconds: float = 3600):
+        self.threshold = threshold
+        self.max_entries_per_tenant = max_entries_per_tenant
+        self.ttl_seconds = ttl_seconds
+        self._tenants: Dict[str, TenantAnswerCache] = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stores': 0, 'invalidations': 0}
+
+    @staticmethod
+    def _normalize(embedding) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None
+
+    def lookup(self, tenant_id: str, embedding, version: Any = None) -> Optional[Dict[str, Any]]:
+        """Cached response for a near-duplicate query, or None"""
+        vector = self._normalize(embedding)
+        with self._lock:
+            cache = self._tenants.get(tenant_id)
+            match = None
+            if vector is not None and cache is not None and cache.dimension == vector.shape[0]:
+                match = cache.best_match(vector, self.ttl_seconds, version)
+            if match is None or match[0] < self.threshold:
+                self._stats['misses'] += 1
+                return None
+            self._stats['hits'] += 1
+            similarity, response = match
+            return {**response, 'cache_similarity': round(similarity, 4)}
+
+    def store(self, tenant_id: str, embedding, response: Dict[str, Any], version: Any = None):
+        """Remember the response for a query embedding"""
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+        with self._lock:
+            cache = self._tenants.get(tenant_id)
+            if cache is None or cache.dimension != vector.shape[0]:
+                cache = self._tenants[tenant_id] = TenantAnswerCache(vector.shape[0], self.max_entries_per_tenant)
+            cache.add(vector, response, version)
+            self._stats['stores'] += 1
+
+    def invalidate(self, tenant_id: str):
+        """Forget every cached answer for a tenant"""
+        with self._lock:
+            if self._tenants.pop(tenant_id, None) is not None:
+                self._stats['invalidations'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else 0.0,
+                'tenants': len(self._tenants),
+                'threshold': self.threshold,
+                'ttl_seconds': self.ttl_seconds
+            }
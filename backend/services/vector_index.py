@@ -0,0 +1,663 @@
+"""In-process vector index backed by NumPy"""
+import json
+import math
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Set, Tuple
+import numpy as np
+
+# Cross-process locking of shared index files (POSIX)
+FCNTL_AVAILABLE = False
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    pass
+
+INDEX_MODES = ('flat', 'ivf')
+
+
+class DimensionMismatchError(ValueError):
+    """Vectors whose dimension differs from the tenant's index"""
+
+
+class TenantVectorIndex:
+    """Contiguous float32 matrix of unit-normalised embeddings for one tenant.
+
+    In ``ivf`` mode a spherical k-means coarse quantizer partitions the rows
+    into ``nlist`` cells and queries only score the ``nprobe`` closest cells.
+    Below ``min_train_size`` vectors the index always scores exhaustively.
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        capacity: int = 64,
+        mode: str = 'flat',
+        nlist: int = 0,
+        nprobe: int = 16,
+        min_train_size: int = 4096
+    ):
+        self.dimension = dimension
+        self._vectors = np.zeros((capacity, dimension), dtype=np.float32)
+        self._ids: List[str] = []
+        self._metadata: List[Dict[str, Any]] = []
+        self._positions: Dict[str, int] = {}
+        
+        # IVF state
+        self.mode = mode
+        self.nlist = nlist  # 0 = sqrt(n), chosen at training time
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(capacity, dtype=np.int32)
+        self._trained_count = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """View of the populated rows"""
+        return self._vectors[:len(self._ids)]
+
+    def _normalize(self, vector) -> np.ndarray:
+        vec = np.asarray(vector, dtype=np.float32).reshape(-1)
+        if vec.shape[0] != self.dimension:
+            raise ValueError(f"Expected embedding of dimension {self.dimension}, got {vec.shape[0]}")
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+
+    def _grow(self):
+        """Double capacity so appends stay amortised O(1)"""
+        capacity = max(64, self._vectors.shape[0] * 2)
+        grown = np.zeros((capacity, self.dimension), dtype=np.float32)
+        grown[:len(self._ids)] = self.vectors
+        self._vectors = grown
+        assignments = np.zeros(capacity, dtype=np.int32)
+        assignments[:len(self._ids)] = self._assignments[:len(self._ids)]
+        self._assignments = assignments
+
+    def upsert(self, vector_id: str, vector, metadata: Optional[Dict[str, Any]] = None) -> int:
+        """Insert or replace a vector, returning its row"""
+        vec = self._normalize(vector)
+        row = self._positions.get(vector_id)
+        if row is None:
+            if len(self._ids) == self._vectors.shape[0]:
+                self._grow()
+            row = len(self._ids)
+            self._ids.append(vector_id)
+            self._metadata.append(metadata or {})
+            self._positions[vector_id] = row
+        else:
+            self._metadata[row] = metadata or {}
+        self._vectors[row] = vec
+        if self._centroids is not None:
+            self._assignments[row] = int(np.argmax(self._centroids @ vec))
+        return row
+
+    def delete(self, vector_id: str) -> Optional[int]:
+        """Remove a vector by swapping the last row into its slot.
+
+        Returns the row that was vacated, or None if the id was unknown.
+        """
+        row = self._positions.pop(vector_id, None)
+        if row is None:
+            return None
+        last = len(self._ids) - 1
+        if row != last:
+            self._vectors[row] = self._vectors[last]
+            self._assignments[row] = self._assignments[last]
+            self._ids[row] = self._ids[last]
+            self._metadata[row] = self._metadata[last]
+            self._positions[self._ids[row]] = row
+        self._ids.pop()
+        self._metadata.pop()
+        return row
+
+    def needs_training(self) -> bool:
+        """IVF cells are (re)built once the corpus doubles since the last build"""
+        if self.mode != 'ivf' or len(self._ids) < self.min_train_size:
+            return False
+        return self._centroids is None or len(self._ids) > 2 * self._trained_count
+
+    def _nearest_centroids(self, vectors: np.ndarray, centroids: np.ndarray, block: int = 8192) -> np.ndarray:
+        """Assign rows to their closest centroid in bounded-memory blocks"""
+        assignments = np.empty(vectors.shape[0], dtype=np.int32)
+        for start in range(0, vectors.shape[0], block):
+            assignments[start:start + block] = np.argmax(vectors[start:start + block] @ centroids.T, axis=1)
+        return assignments
+
+    def train(self, iterations: int = 10, seed: int = 0):
+        """Fit the coarse quantizer with spherical k-means on a sample"""
+        count = len(self._ids)
+        if count == 0:
+            return
+        nlist = min(count, self.nlist or max(1, int(math.sqrt(count))))
+        rng = np.random.default_rng(seed)
+        sample_size = min(count, max(nlist * 32, 10000))
+        sample = self.vectors[np.sort(rng.choice(count, size=sample_size, replace=False))]
+        centroids = sample[rng.choice(sample_size, size=nlist, replace=False)].copy()
+        
+        for _ in range(iterations):
+            assignments = self._nearest_centroids(sample, centroids)
+            order = np.argsort(assignments, kind='stable')
+            cells, starts = np.unique(assignments[order], return_index=True)
+            sums = np.add.reduceat(sample[order], starts, axis=0)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids[cells] = sums / np.maximum(norms, 1e-12)  # empty cells keep their old centroid
+        
+        self._centroids = centroids
+        self._assignments[:count] = self._nearest_centroids(self.vectors, centroids)
+        self._trained_count = count
+
+    def search(
+        self,
+        query_vector,
+        top_k: int = 3,
+        nprobe: Optional[int] = None,
+        exact: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Top-k cosine similarity.
+
+        Flat mode scores every row with one matrix-vector product; IVF mode
+        scores only the rows in the ``nprobe`` cells closest to the query.
+        """
+        count = len(self._ids)
+        if count == 0 or top_k <= 0:
+            return []
+        query = self._normalize(query_vector)
+        if exact or self.mode != 'ivf' or self._centroids is None:
+            scores = self.vectors @ query
+            return self._top_k(scores, np.arange(count), top_k)
+        
+        nlist = self._centroids.shape[0]
+        nprobe = min(nlist, max(1, nprobe or self.nprobe))
+        centroid_scores = self._centroids @ query
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe] if nprobe < nlist else np.arange(nlist)
+        probe_mask = np.zeros(nlist, dtype=bool)
+        probe_mask[probe] = True
+        rows = np.flatnonzero(probe_mask[self._assignments[:count]])
+        scores = self._vectors[rows] @ query
+        return self._top_k(scores, rows, top_k)
+
+    def stats(self) -> Dict[str, Any]:
+        """Index shape and ANN parameters"""
+        return {
+            'mode': self.mode,
+            'count': len(self._ids),
+            'dimension': self.dimension,
+            'trained': self.is_trained,
+            'nlist': int(self._centroids.shape[0]) if self._centroids is not None else self.nlist,
+            'nprobe': self.nprobe,
+            'min_train_size': self.min_train_size
+        }
+
+    def _top_k(self, scores: np.ndarray, rows: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+        k = min(top_k, scores.shape[0])
+        if k == 0:
+            return []
+        if k < scores.shape[0]:
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(scores.shape[0])
+        ordered = candidates[np.argsort(-scores[candidates])]
+        return [
+            {
+                'id': self._ids[rows[i]],
+                'score': float(scores[i]),
+                'metadata': self._metadata[rows[i]]
+            }
+            for i in ordered
+        ]
+
+    def to_state(self) -> Dict[str, Any]:
+        """JSON-serialisable state (vectors are saved separately)"""
+        return {
+            'dimension': self.dimension,
+            'ids': self._ids,
+            'metadata': self._metadata,
+            'mode': self.mode,
+            'nlist': self.nlist,
+            'nprobe': self.nprobe,
+            'min_train_size': self.min_train_size,
+            'trained_count': self._trained_count
+        }
+
+    def ivf_arrays(self) -> Optional[Dict[str, np.ndarray]]:
+        """Trained quantizer arrays for persistence"""
+        if self._centroids is None:
+            return None
+        return {
+            'centroids': self._centroids,
+            'assignments': self._assignments[:len(self._ids)]
+        }
+
+    @classmethod
+    def from_state(
+        cls,
+        state: Dict[str, Any],
+        vectors: np.ndarray,
+        ivf: Optional[Dict[str, np.ndarray]] = None
+    ) -> 'TenantVectorIndex':
+        count = len(state['ids'])
+        index = cls(
+            state['dimension'],
+            capacity=max(64, count),
+            mode=state.get('mode', 'flat'),
+            nlist=state.get('nlist', 0),
+            nprobe=state.get('nprobe', 16),
+            min_train_size=state.get('min_train_size', 4096)
+        )
+        index._vectors[:count] = vectors[:count]
+        index._ids = list(state['ids'])
+        index._metadata = list(state['metadata'])
+        index._positions = {vector_id: row for row, vector_id in enumerate(index._ids)}
+        if ivf is not None and len(ivf['assignments']) == count:
+            index._centroids = np.array(ivf['centroids'], dtype=np.float32)
+            index._assignments[:count] = ivf['assignments']
+            index._trained_count = state.get('trained_count', count)
+        return index
+
+
+class LocalVectorIndex:
+    """Per-tenant in-process vector indexes with on-disk persistence.
+
+    Several worker processes may share storage_dir. Each save writes new
+    versioned vector files and then atomically replaces the tenant's state
+    JSON, which names them, so readers never see a torn index. Readers
+    compare the state file's identity with what they loaded and re-read it
+    when another worker saved. Mutations run in transaction(), which holds
+    an exclusive file lock, reloads first and saves once at the end, so
+    workers do not overwrite each other's changes.
+    """
+
+    def __init__(
+        self,
+        storage_dir: Optional[str] = None,
+        default_mode: str = 'flat',
+        ann_tenants: Optional[List[str]] = None,
+        nlist: int = 0,
+        nprobe: int = 16,
+        min_train_size: int = 4096
+    ):
+        self.storage_dir = storage_dir
+        self.default_mode = default_mode
+        self.ann_tenants = set(ann_tenants or [])
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self._indexes: Dict[str, TenantVectorIndex] = {}
+        self._stamps: Dict[str, Tuple[int, int, int]] = {}  # State file identity when loaded or saved
+        self._locks: Dict[str, threading.RLock] = {}
+        self._locks_guard = threading.Lock()
+        self._depth: Dict[str, int] = {}  # transaction() nesting per tenant
+        self._dirty: Set[str] = set()
+        self._settings: Dict[str, Dict[str, Any]] = {}  # Without storage_dir: per-tenant ANN settings
+        if self.storage_dir:
+            os.makedirs(self.storage_dir, exist_ok=True)
+
+    def _lock(self, tenant_id: str) -> threading.RLock:
+        with self._locks_guard:
+            lock = self._locks.get(tenant_id)
+            if lock is None:
+                lock = self._locks[tenant_id] = threading.RLock()
+            return lock
+
+    def _base(self, tenant_id: str) -> str:
+        return re.sub(r'[^A-Za-z0-9_.-]', '_', tenant_id)
+
+    def _paths(self, tenant_id: str):
+        """Legacy (unversioned) vector files and the state JSON"""
+        base = os.path.join(self.storage_dir, self._base(tenant_id))
+        return f"{base}.npy", f"{base}.json", f"{base}.ivf.npz"
+
+    def _stamp(self, tenant_id: str) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(self._paths(tenant_id)[1])
+        except FileNotFoundError:
+            return None
+        # os.replace gives every save a new inode
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _settings_path(self, tenant_id: str) -> str:
+        return os.path.join(self.storage_dir, f"{self._base(tenant_id)}.settings.json")
+
+    def _tenant_settings(self, tenant_id: str) -> Dict[str, Any]:
+        """Mode / nlist / nprobe chosen for a tenant that has no stored index (yet)"""
+        if not self.storage_dir:
+            return self._settings.get(tenant_id, {})
+        try:
+            with open(self._settings_path(tenant_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Error loading vector index settings for tenant {tenant_id}: {e}")
+            return {}
+
+    def _store_settings(self, tenant_id: str, tenant_settings: Dict[str, Any]):
+        if not self.storage_dir:
+            self._settings[tenant_id] = tenant_settings
+            return
+        path = self._settings_path(tenant_id)
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(tenant_settings, f)
+        os.replace(f"{path}.tmp", path)
+
+    def _mode(self, tenant_id: str, tenant_settings: Dict[str, Any]) -> str:
+        return tenant_settings.get('mode', 'ivf' if tenant_id in self.ann_tenants else self.default_mode)
+
+    def _new_index(self, tenant_id: str, dimension: int) -> TenantVectorIndex:
+        tenant_settings = self._tenant_settings(tenant_id)
+        return TenantVectorIndex(
+            dimension,
+            mode=self._mode(tenant_id, tenant_settings),
+            nlist=tenant_settings.get('nlist', self.nlist),
+            nprobe=tenant_settings.get('nprobe', self.nprobe),
+            min_train_size=self.min_train_size
+        )
+
+    def _get(self, tenant_id: str) -> Optional[TenantVectorIndex]:
+        """The tenant's index, re-read when another process saved a newer one"""
+        index = self._indexes.get(tenant_id)
+        if not self.storage_dir or tenant_id in self._dirty:
+            return index
+        stamp = self._stamp(tenant_id)
+        if stamp is None:
+            if tenant_id in self._stamps:
+                # Reset by another process
+                self._stamps.pop(tenant_id)
+                self._indexes.pop(tenant_id, None)
+                return None
+            return index
+        if stamp != self._stamps.get(tenant_id):
+            loaded = self._load(tenant_id)
+            if loaded is not None:
+                index = self._indexes[tenant_id] = loaded
+                self._stamps[tenant_id] = stamp
+        return index
+
+    def _load(self, tenant_id: str) -> Optional[TenantVectorIndex]:
+        vectors_path, state_path, ivf_path = self._paths(tenant_id)
+        # A concurrent save may delete the files a just-read state names: re-read once
+        for attempt in range(2):
+            try:
+                with open(state_path) as f:
+                    state = json.load(f)
+                if 'vectors_file' in state:
+                    vectors_path = os.path.join(self.storage_dir, state['vectors_file'])
+                    ivf_path = os.path.join(self.storage_dir, state['ivf_file']) if state.get('ivf_file') else None
+                vectors = np.load(vectors_path, mmap_mode='r')
+                ivf = dict(np.load(ivf_path)) if ivf_path and os.path.exists(ivf_path) else None
+                return TenantVectorIndex.from_state(state, vectors, ivf)
+            except FileNotFoundError:
+                if attempt == 0:
+                    continue
+                return None
+            except Exception as e:
+                print(f"Error loading vector index for tenant {tenant_id}: {e}")
+                return None
+
+    @contextmanager
+    def transaction(self, tenant_id: str):
+        """Exclusive read-modify-write of a tenant's index, saved once on exit"""
+        with self._lock(tenant_id):
+            depth = self._depth.get(tenant_id, 0)
+            lock_file = None
+            if depth == 0 and self.storage_dir and FCNTL_AVAILABLE:
+                lock_file = open(os.path.join(self.storage_dir, f"{self._base(tenant_id)}.lock"), 'a')
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self._depth[tenant_id] = depth + 1
+            try:
+                if depth == 0:
+                    self._get(tenant_id)  # Pick up saves from other processes before changing anything
+                yield
+                if depth == 0 and tenant_id in self._dirty:
+                    self._save(tenant_id)
+            except BaseException:
+                if depth == 0 and self.storage_dir and tenant_id in self._dirty:
+                    # Drop half-applied changes; the next read reloads the saved index
+                    self._indexes.pop(tenant_id, None)
+                    self._stamps.pop(tenant_id, None)
+                raise
+            finally:
+                self._depth[tenant_id] = depth
+                if depth == 0:
+                    self._dirty.discard(tenant_id)
+                if lock_file is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    lock_file.close()
+
+    def _save(self, tenant_id: str):
+        if not self.storage_dir:
+            return
+        index = self._indexes.get(tenant_id)
+        if index is None:
+            return
+        base = self._base(tenant_id)
+        version = uuid.uuid4().hex
+        vectors_file = f"{base}.{version}.npy"
+        np.save(os.path.join(self.storage_dir, vectors_file), index.vectors)
+        ivf = index.ivf_arrays()
+        ivf_file = None
+        if ivf is not None:
+            ivf_file = f"{base}.{version}.ivf.npz"
+            np.savez(os.path.join(self.storage_dir, ivf_file), **ivf)
+        _, state_path, _ = self._paths(tenant_id)
+        with open(f"{state_path}.tmp", 'w') as f:
+            json.dump({**index.to_state(), 'vectors_file': vectors_file, 'ivf_file': ivf_file}, f)
+        os.replace(f"{state_path}.tmp", state_path)
+        self._stamps[tenant_id] = self._stamp(tenant_id)
+        self._remove_files(tenant_id, keep={vectors_file, ivf_file})
+
+    def _remove_files(self, tenant_id: str, keep: Set[Optional[str]]):
+        """Delete the tenant's vector files other than keep (older versions and legacy names)"""
+        versioned = re.compile(rf"^{re.escape(self._base(tenant_id))}\.[0-9a-f]{{32}}\.(npy|ivf\.npz)$")
+        legacy_vectors, _, legacy_ivf = self._paths(tenant_id)
+        for name in os.listdir(self.storage_dir):
+            path = os.path.join(self.storage_dir, name)
+            if name not in keep and (versioned.match(name) or path in (legacy_vectors, legacy_ivf)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def save(self, tenant_id: str):
+        """Persist a tenant's index now (mutations already save at the end of their transaction)"""
+        with self.transaction(tenant_id):
+            self._dirty.add(tenant_id)
+
+    def upsert(self, tenant_id: str, vectors: List[Dict[str, Any]]):
+        """Upsert vectors given as {'id', 'values', 'metadata'} dicts.
+
+        The whole batch is checked before anything changes: vectors whose
+        dimension differs from the tenant's index (or from each other)
+        raise DimensionMismatchError. Switching embedding models means an
+        explicit reset() and re-index, never a side effect of an upload.
+        """
+        if not vectors:
+            return
+        with self.transaction(tenant_id):
+            index = self._get(tenant_id)
+            dimension = index.dimension if index is not None else len(vectors[0]['values'])
+            mismatched = [vector['id'] for vector in vectors if len(vector['values']) != dimension]
+            if mismatched:
+                raise DimensionMismatchError(
+                    f"{len(mismatched)} of {len(vectors)} vectors for tenant {tenant_id} "
+                    f"do not have the index dimension {dimension}"
+                )
+            if index is None:
+                index = self._new_index(tenant_id, dimension)
+                self._indexes[tenant_id] = index
+            self._dirty.add(tenant_id)
+            for vector in vectors:
+                index.upsert(vector['id'], vector['values'], vector.get('metadata'))
+            if index.needs_training():
+                index.train()
+
+    def reset(self, tenant_id: str):
+        """Drop a tenant's index (memory and disk) before re-indexing with another embedding model"""
+        with self.transaction(tenant_id):
+            index = self._get(tenant_id)
+            if index is not None:
+                # The re-built index keeps the tenant's ANN settings
+                self._store_settings(tenant_id, {'mode': index.mode, 'nlist': index.nlist, 'nprobe': index.nprobe})
+            self._indexes.pop(tenant_id, None)
+            self._stamps.pop(tenant_id, None)
+            self._dirty.discard(tenant_id)
+            if self.storage_dir:
+                _, state_path, _ = self._paths(tenant_id)
+                if os.path.exists(state_path):
+                    os.remove(state_path)
+                self._remove_files(tenant_id, keep=set())
+
+    def delete(self, tenant_id: str, ids: List[str]):
+        """Delete vectors by id"""
+        with self.transaction(tenant_id):
+            index = self._get(tenant_id)
+            if index is None:
+                return
+            for vector_id in ids:
+                if index.delete(vector_id) is not None:
+                    self._dirty.add(tenant_id)
+
+    def delete_prefix(self, tenant_id: str, prefix: str):
+        """Delete every vector whose id starts with prefix"""
+        with self.transaction(tenant_id):
+            index = self._get(tenant_id)
+            if index is None:
+                return
+            for vector_id in [vector_id for vector_id in index._ids if vector_id.startswith(prefix)]:
+                index.delete(vector_id)
+                self._dirty.add(tenant_id)
+
+    def search(
+        self,
+        tenant_id: str,
+        query_vector,
+        top_k: int = 3,
+        nprobe: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Top-k cosine search within a tenant"""
+        with self._lock(tenant_id):
+            index = self._get(tenant_id)
+            if index is None:
+                return []
+            if len(query_vector) != index.dimension:
+                print(f"Query embedding dimension {len(query_vector)} does not match index dimension {index.dimension}")
+                return []
+            return index.search(query_vector, top_k, nprobe=nprobe)
+
+    def set_mode(
+        self,
+        tenant_id: str,
+        mode: str,
+        nlist: Optional[int] = None,
+        nprobe: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Switch a tenant between flat and IVF search and tune its parameters.
+
+        The choice is saved with the tenant's index state, or on its own
+        until the tenant has an index, so every worker applies it.
+        """
+        if mode not in INDEX_MODES:
+            raise ValueError(f"Unknown index mode '{mode}', expected one of {INDEX_MODES}")
+        with self.transaction(tenant_id):
+            index = self._get(tenant_id)
+            if index is None:
+                tenant_settings = {**self._tenant_settings(tenant_id), 'mode': mode}
+                if nlist is not None:
+                    tenant_settings['nlist'] = nlist
+                if nprobe is not None:
+                    tenant_settings['nprobe'] = nprobe
+                self._store_settings(tenant_id, tenant_settings)
+                return {'mode': mode, 'count': 0}
+            retrain = nlist is not None and nlist != index.nlist
+            index.mode = mode
+            if nlist is not None:
+                index.nlist = nlist
+            if nprobe is not None:
+                index.nprobe = nprobe
+            if mode == 'ivf' and len(index) >= index.min_train_size and (retrain or index.needs_training()):
+                index.train()
+            self._dirty.add(tenant_id)
+            return index.stats()
+
+    def stats(self, tenant_id: str) -> Dict[str, Any]:
+        """Index stats for a tenant"""
+        with self._lock(tenant_id):
+            index = self._get(tenant_id)
+            if index is None:
+                return {'mode': self._mode(tenant_id, self._tenant_settings(tenant_id)), 'count': 0}
+            return index.stats()
+
+    def evaluate(
+        self,
+        tenant_id: str,
+        sample_size: int = 100,
+        top_k: int = 10,
+        nprobe_values: Optional[List[int]] = None,
+        noise: float = 0.05,
+        seed: int = 0
+    ) -> Dict[str, Any]:
+        """Recall/latency report for the tenant's ANN settings.
+
+        Queries are perturbed copies of stored vectors; exhaustive search
+        provides ground truth. One row is reported per ``nprobe`` value.
+        """
+        with self._lock(tenant_id):
+            index = self._get(tenant_id)
+            if index is None or len(index) == 0:
+                return {'tenant_id': tenant_id, 'count': 0, 'results': []}
+            rng = np.random.default_rng(seed)
+            rows = rng.choice(len(index), size=min(sample_size, len(index)), replace=False)
+            queries = index.vectors[rows] + rng.standard_normal((len(rows), index.dimension)).astype(np.float32) * noise
+            
+            def timed(**kwargs):
+                latencies, results = [], []
+                for query in queries:
+                    start = time.perf_counter()
+                    results.append({match['id'] for match in index.search(query, top_k, **kwargs)})
+                    latencies.append((time.perf_counter() - start) * 1000)
+                return results, latencies
+            
+            def summarize(latencies):
+                return {
+                    'p50': round(float(np.percentile(latencies, 50)), 4),
+                    'p99': round(float(np.percentile(latencies, 99)), 4)
+                }
+            
+            truth, flat_latencies = timed(exact=True)
+            report = {
+                'tenant_id': tenant_id,
+                **index.stats(),
+                'queries': len(rows),
+                'top_k': top_k,
+                'flat_latency_ms': summarize(flat_latencies),
+                'results': []
+            }
+            if index.is_trained:
+                for nprobe in nprobe_values or [index.nprobe]:
+                    found, latencies = timed(nprobe=nprobe)
+                    recall = np.mean([len(f & t) / max(1, len(t)) for f, t in zip(found, truth)])
+                    report['results'].append({
+                        'nprobe': nprobe,
+                        'recall_at_k': round(float(recall), 4),
+                        'latency_ms': summarize(latencies)
+                    })
+            return report
+
+    def count(self, tenant_id: str) -> int:
+        """Number of vectors stored for a tenant"""
+        with self._lock(tenant_id):
+            index = self._get(tenant_id)
+            return len(index) if index is not None else 0
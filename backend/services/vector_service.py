@@ -1,7 +1,12 @@
-"""Vector search service using Pinecone"""
+"""Vector search service using Pinecone or a local NumPy index"""
 from typing import List, Dict, Any, Optional
 import numpy as np
 from backend.config.settings import get_settings
+from backend.services.vector_index import LocalVectorIndex
+from backend.services.keyword_index import KeywordIndex, TenantKeywordIndex, remove_prefix
+from backend.services.chunking import chunk_document, validate_window
+from backend.services.llm_service import LLMService, EmbeddingUnavailableError
+from backend.services.circuit_breaker import get_breaker, is_open, CircuitOpenError
 
 settings = get_settings()
 
@@ -14,11 +19,63 @@ except ImportError:
     # Pinecone not installed, will use fallback
     pass
 
+# Shared local indexes (created lazily so read-only deployments can still import)
+local_vector_index = None
+keyword_index = None
+
+
+
+def _local_index_options() -> Dict[str, Any]:
+    return {
+        'default_mode': settings.vector_index_mode,
+        'ann_tenants': settings.vector_index_ann_tenants,
+        'nlist': settings.vector_index_ivf_nlist,
+        'nprobe': settings.vector_index_ivf_nprobe,
+        'min_train_size': settings.vector_index_ivf_min_train
+    }
+
+
+def get_local_vector_index() -> Optional[LocalVectorIndex]:
+    """Get the process-wide local vector index"""
+    global local_vector_index
+    if local_vector_index is None:
+        try:
+            local_vector_index = LocalVectorIndex(settings.vector_index_dir, **_local_index_options())
+        except Exception as e:
+            print(f"Error initializing local vector index storage, keeping it in memory: {e}")
+            local_vector_index = LocalVectorIndex(**_local_index_options())
+    return local_vector_index
+
+
+def get_keyword_index() -> KeywordIndex:
+    """Get the process-wide BM25 keyword index"""
+    global keyword_index
+    if keyword_index is None:
+        options = {'k1': settings.bm25_k1, 'b': settings.bm25_b}
+        if settings.keyword_index_s3_prefix:
+            from backend.services.s3_service import s3_client
+            keyword_index = KeywordIndex(
+                s3_client=s3_client,
+                s3_bucket=settings.s3_documents_bucket,
+                s3_prefix=settings.keyword_index_s3_prefix,
+                **options
+            )
+        else:
+            try:
+                keyword_index = KeywordIndex(settings.keyword_index_dir, **options)
+            except Exception as e:
+                print(f"Error initializing keyword index storage, keeping it in memory: {e}")
+                keyword_index = KeywordIndex(**options)
+    return keyword_index
+
 
 class VectorService:
     """Service for vector search operations"""
     
-    def __init__(self):
+    def __init__(self, llm_service: Optional[LLMService] = None):
+        # Misconfigured CHUNK_SIZE / CHUNK_OVERLAP fail here rather than on the first upload
+        validate_window(settings.chunk_size, settings.chunk_overlap)
+        self.llm_service = llm_service or LLMService()
         self.use_pinecone = settings.use_pinecone and PINECONE_AVAILABLE and settings.pinecone_api_key
         self.index_name = settings.pinecone_index_name
         
@@ -49,139 +106,402 @@ class VectorService:
                 self.use_pinecone = False
         else:
             self.use_pinecone = False
+        
+        self.local_index = None
+        if not self.use_pinecone and settings.use_local_vector_index:
+            self.local_index = get_local_vector_index()
+        self.keyword_index = get_keyword_index()
     
     def generate_embedding(self, text: str) -> List[float]:
         """Generate embedding for text"""
-        if self.use_pinecone:
-            # Use Bedrock Titan for embeddings (if available)
+        return self.generate_embeddings([text])[0]
+    
+    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Embeddings in the model the vector store holds, with batched provider calls.
+        
+        Raises EmbeddingUnavailableError rather than returning vectors from
+        another model (a fallback provider or the hashing embedding).
+        """
+        model_id, embeddings = self.llm_service.embed_batch(texts)
+        expected = self.llm_service.preferred_embedding_model()
+        if model_id != expected:
+            raise EmbeddingUnavailableError(f"Got {model_id} embeddings but the vector store holds {expected}")
+        return embeddings
+    
+    def _chunk(self, title: str, content: str) -> List[Dict[str, Any]]:
+        """Split a document into retrieval passages"""
+        chunks = chunk_document(
+            content,
+            strategy=settings.chunk_strategy,
+            chunk_size=settings.chunk_size,
+            overlap=settings.chunk_overlap,
+            filename=title
+        )
+        if not chunks:
+            # Empty documents are still findable by title
+            chunks = [{'index': 0, 'text': content, 'start': 0, 'end': len(content), 'heading': None}]
+        return chunks
+    
+    def _chunk_metadata(self, doc_id: str, title: str, doc_type: str, chunk: Dict[str, Any]) -> Dict[str, Any]:
+        metadata = {
+            'doc_id': doc_id,
+            'title': title,
+            'content': chunk['text'],
+            'doc_type': doc_type,
+            'chunk_index': chunk['index'],
+            'chunk_start': chunk['start'],
+            'chunk_end': chunk['end']
+        }
+        if chunk.get('heading'):
+            metadata['heading'] = chunk['heading']
+        return metadata
+    
+    def _embedding_input(self, title: str, chunk: Dict[str, Any]) -> str:
+        if chunk.get('heading'):
+            return f"{title} - {chunk['heading']}\n{chunk['text']}"
+        return f"{title}\n{chunk['text']}"
+    
+    def _format_match(self, metadata: Dict[str, Any], score: float) -> Dict[str, Any]:
+        """Shape a stored passage as a search result"""
+        doc_id = metadata.get('doc_id')
+        chunk_index = metadata.get('chunk_index')
+        return {
+            'title': metadata.get('title', ''),
+            'content': metadata.get('content', ''),
+            'doc_type': metadata.get('doc_type', 'guide'),
+            'similarity_score': score,
+            'doc_id': doc_id,
+            'chunk_id': f"{doc_id}#{int(chunk_index)}" if chunk_index is not None else doc_id,
+            'chunk_start': metadata.get('chunk_start'),
+            'chunk_end': metadata.get('chunk_end'),
+            'heading': metadata.get('heading')
+        }
+    
+    def index_document(self, doc_id: str, title: str, content: str, doc_type: str, tenant_id: str):
+        """Chunk a document and index each passage in the keyword and vector stores"""
+        chunks = self._chunk(title, content)
+        
+        try:
+            self._ensure_keyword_index(tenant_id)
+            
+            def replace_passages(index: TenantKeywordIndex) -> bool:
+                remove_prefix(index, f"{doc_id}#")
+                for chunk in chunks:
+                    index.add(
+                        f"{doc_id}#{chunk['index']}",
+                        self._embedding_input(title, chunk),
+                        self._chunk_metadata(doc_id, title, doc_type, chunk)
+                    )
+                return True
+            
+            self.keyword_index.update(tenant_id, replace_passages)
+        except Exception as e:
+            print(f"Error updating keyword index: {e}")
+        
+        if not self.use_pinecone and self.local_index is None:
+            return  # Skip if no vector store is available
+        
+        if self._index_vectors(doc_id, title, doc_type, chunks, tenant_id):
+            from backend.services.document_summary_service import DocumentSummaryService
             try:
-                from backend.services.llm_service import LLMService
-                llm_service = LLMService()
-                return llm_service.generate_embedding(text)
+                pending = DocumentSummaryService.pending_embeddings(tenant_id)
             except Exception as e:
-                print(f"Error generating embedding with Bedrock: {e}")
-                return self._simple_embedding(text)
+                print(f"Error checking documents pending re-embedding: {e}")
+                pending = 0
+            if pending > 0:
+                # Embeddings are back: catch up on documents indexed by keyword only (by any worker)
+                self.reembed_pending(tenant_id)
         else:
-            return self._simple_embedding(text)
-    
-    def _simple_embedding(self, text: str) -> List[float]:
-        """Simple fallback embedding (not for production)"""
-        import hashlib
-        hash_obj = hashlib.md5(text.encode())
-        hash_hex = hash_obj.hexdigest()
-        # Convert to 1536-dim vector
-        return [float(int(hash_hex[i:i+2], 16)) / 255.0 for i in range(0, min(32, len(hash_hex)), 2)] * 48
+            self._queue_reembedding(doc_id, tenant_id)
     
-    def index_document(self, doc_id: str, title: str, content: str, doc_type: str, tenant_id: str):
-        """Index document in vector store"""
-        if not self.use_pinecone:
-            return  # Skip if Pinecone not available
+    def _index_vectors(self, doc_id: str, title: str, doc_type: str, chunks: List[Dict[str, Any]], tenant_id: str) -> bool:
+        """Replace a document's passage vectors; False when they could not be written"""
+        if not self.embeddings_available():
+            print(f"Embeddings unavailable, indexing document {doc_id} by keyword only")
+            return False
+        try:
+            embeddings = self.generate_embeddings([self._embedding_input(title, chunk) for chunk in chunks])
+        except EmbeddingUnavailableError as e:
+            print(f"Embeddings unavailable, indexing document {doc_id} by keyword only: {e}")
+            return False
         
         try:
-            # Generate embedding
-            embedding = self.generate_embedding(f"{title} {content}")
+            vectors = []
+            for chunk, embedding in zip(chunks, embeddings):
+                metadata = self._chunk_metadata(doc_id, title, doc_type, chunk)
+                metadata['tenant_id'] = tenant_id
+                vectors.append({
+                    'id': f"{tenant_id}_{doc_id}#{chunk['index']}",
+                    'values': embedding,
+                    'metadata': metadata
+                })
             
-            # Store in Pinecone
-            self.index.upsert(vectors=[{
-                'id': f"{tenant_id}_{doc_id}",
-                'values': embedding,
-                'metadata': {
-                    'doc_id': doc_id,
-                    'title': title,
-                    'content': content[:500],  # Store first 500 chars
-                    'doc_type': doc_type,
-                    'tenant_id': tenant_id
-                }
-            }])
+            if self.use_pinecone:
+                # Remove passages from a previous version of the document
+                self._delete_vectors(doc_id, tenant_id)
+                for start in range(0, len(vectors), 100):
+                    self._pinecone(self.index.upsert, vectors=vectors[start:start + 100])
+            else:
+                # One transaction: other workers never see the document half replaced
+                with self.local_index.transaction(tenant_id):
+                    self._delete_vectors(doc_id, tenant_id)
+                    self.local_index.upsert(tenant_id, vectors)
         except Exception as e:
             print(f"Error indexing document: {e}")
+            return False
+        return True
+    
+    def _queue_reembedding(self, doc_id: str, tenant_id: str):
+        """Flag a keyword-only document so reembed_pending() adds its vectors later"""
+        from backend.database import get_table
+        from backend.services.document_summary_service import DocumentSummaryService
+        try:
+            previous = get_table('documents').update_item(
+                Key={'id': doc_id},
+                UpdateExpression='SET needs_embedding = :pending',
+                ConditionExpression='attribute_exists(id)',
+                ExpressionAttributeValues={':pending': True},
+                ReturnValues='UPDATED_OLD'
+            ).get('Attributes', {})
+            if 'needs_embedding' not in previous:
+                DocumentSummaryService.count_pending_embeddings(tenant_id, 1)
+        except Exception as e:
+            print(f"Error queueing document {doc_id} for re-embedding: {e}")
+    
+    def reembed_pending(self, tenant_id: str) -> int:
+        """Vector-index the tenant's documents flagged while embeddings were unavailable.
+        
+        Returns how many were indexed; stops early if embeddings fail again.
+        """
+        if not self.use_pinecone and self.local_index is None:
+            return 0
+        from backend.database import get_table
+        from backend.services.dynamodb_service import DynamoDBService
+        from backend.services.document_summary_service import DocumentSummaryService
+        documents_table = get_table('documents')
+        query = DynamoDBService.tenant_query(tenant_id)
+        query['FilterExpression'] = 'needs_embedding = :pending'
+        query['ExpressionAttributeValues'][':pending'] = True
+        
+        indexed = 0
+        for document in list(DynamoDBService.paginate('documents', **query)):
+            title = document.get('title', '')
+            chunks = self._chunk(title, document.get('content', ''))
+            if not self._index_vectors(document['id'], title, document.get('doc_type', 'guide'), chunks, tenant_id):
+                return indexed
+            previous = documents_table.update_item(
+                Key={'id': document['id']},
+                UpdateExpression='REMOVE needs_embedding',
+                ReturnValues='UPDATED_OLD'
+            ).get('Attributes', {})
+            if 'needs_embedding' in previous:
+                # Another worker may have drained it first: count each flag once
+                DocumentSummaryService.count_pending_embeddings(tenant_id, -1)
+            indexed += 1
+        return indexed
     
     def search(self, query: str, tenant_id: str, top_k: int = 3) -> List[Dict[str, Any]]:
         """Search for similar documents"""
+        if not self.embeddings_available():
+            return self._keyword_search(query, tenant_id, top_k)
         if not self.use_pinecone:
+            if self.local_index is not None and self.local_index.count(tenant_id) > 0:
+                documents = self._local_search(query, tenant_id, top_k)
+                if documents:
+                    return documents
             # Fallback to keyword search
             return self._keyword_search(query, tenant_id, top_k)
         
         try:
-            # Generate query embedding
-            query_embedding = self.generate_embedding(query)
-            
-            # Search in Pinecone
-            results = self.index.query(
-                vector=query_embedding,
-                top_k=top_k,
-                include_metadata=True,
-                filter={'tenant_id': tenant_id}
-            )
-            
-            # Format results
-            documents = []
-            for match in results.matches:
-                metadata = match.metadata
-                documents.append({
-                    'title': metadata.get('title', ''),
-                    'content': metadata.get('content', ''),
-                    'doc_type': metadata.get('doc_type', 'guide'),
-                    'similarity_score': match.score,
-                    'doc_id': metadata.get('doc_id')
-                })
-            
-            return documents
+            return self._pinecone_search(query, tenant_id, top_k)
         except Exception as e:
             print(f"Error searching Pinecone: {e}")
             return self._keyword_search(query, tenant_id, top_k)
     
-    def _keyword_search(self, query: str, tenant_id: str, top_k: int) -> List[Dict[str, Any]]:
-        """Fallback keyword-based search"""
-        from backend.database import get_table
+    def _pinecone_search(self, query: str, tenant_id: str, top_k: int) -> List[Dict[str, Any]]:
+        """Search Pinecone (raises on failure)"""
+        if is_open('pinecone'):
+            raise CircuitOpenError("Circuit 'pinecone' is open")
+        
+        # Generate query embedding
+        query_embedding = self.generate_embedding(query)
+        
+        # Search in Pinecone
+        results = self._pinecone(
+            self.index.query,
+            vector=query_embedding,
+            top_k=top_k,
+            include_metadata=True,
+            filter={'tenant_id': tenant_id}
+        )
         
+        # Format results
+        return [self._format_match(match.metadata, match.score) for match in results.matches]
+    
+    def _pinecone(self, method, **kwargs):
+        """Call a Pinecone index method through its circuit breaker"""
+        breaker = get_breaker('pinecone')
+        if breaker is None:
+            return method(**kwargs)
+        return breaker.call(method, **kwargs)
+    
+    def embeddings_available(self) -> bool:
+        """False while every configured embedding provider's circuit is open.
+        
+        The hash fallback embedding is not comparable with indexed model
+        vectors, so semantic search is skipped rather than run on it.
+        """
         try:
-            from backend.database import get_table
-            documents_table = get_table('documents')
+            return self.llm_service.embeddings_available()
+        except Exception:
+            return True
+    
+    @property
+    def has_semantic_backend(self) -> bool:
+        """Whether embeddings are searchable right now (Pinecone or local index)"""
+        if self.use_pinecone and is_open('pinecone'):
+            return False
+        return (self.use_pinecone or self.local_index is not None) and self.embeddings_available()
+    
+    def corpus_version(self, tenant_id: str):
+        """Changes whenever the tenant's indexed documents change"""
+        return self.keyword_index.version(tenant_id)
+    
+    def semantic_search(self, query: str, tenant_id: str, top_k: int = 3) -> List[Dict[str, Any]]:
+        """Vector-only search, without the keyword fallback"""
+        if not self.embeddings_available():
+            return []
+        if self.use_pinecone:
             try:
-                response = documents_table.query(
-                    IndexName='tenant-id-index',
-                    KeyConditionExpression='tenant_id = :tenant_id',
-                    ExpressionAttributeValues={':tenant_id': tenant_id}
-                )
-            except Exception:
-                # Fallback to scan if GSI doesn't exist yet
-                response = documents_table.scan(
-                    FilterExpression='tenant_id = :tenant_id',
-                    ExpressionAttributeValues={':tenant_id': tenant_id}
+                return self._pinecone_search(query, tenant_id, top_k)
+            except Exception as e:
+                print(f"Error searching Pinecone: {e}")
+                return []
+        if self.local_index is not None and self.local_index.count(tenant_id) > 0:
+            return self._local_search(query, tenant_id, top_k)
+        return []
+    
+    def keyword_search(self, query: str, tenant_id: str, top_k: int = 3) -> List[Dict[str, Any]]:
+        """Lexical-only BM25 search"""
+        return self._keyword_search(query, tenant_id, top_k)
+    
+    def _local_search(self, query: str, tenant_id: str, top_k: int) -> List[Dict[str, Any]]:
+        """Search the in-process vector index"""
+        try:
+            query_embedding = self.generate_embedding(query)
+            matches = self.local_index.search(tenant_id, query_embedding, top_k)
+            return [self._format_match(match['metadata'], match['score']) for match in matches]
+        except Exception as e:
+            print(f"Error searching local vector index: {e}")
+            return []
+    
+    def _ensure_keyword_index(self, tenant_id: str):
+        """Build the tenant's BM25 index from DynamoDB the first time it is needed"""
+        if self.keyword_index.get(tenant_id) is not None:
+            return
+        
+        from backend.services.dynamodb_service import DynamoDBService
+        passages = []
+        # Falls back to a filtered scan if the GSI doesn't exist yet
+        for item in DynamoDBService.paginate_tenant('documents', tenant_id):
+            title = item.get('title', '')
+            doc_type = item.get('doc_type', 'guide')
+            for chunk in self._chunk(title, item.get('content', '')):
+                passages.append({
+                    'key': f"{item['id']}#{chunk['index']}",
+                    'text': self._embedding_input(title, chunk),
+                    'metadata': self._chunk_metadata(item['id'], title, doc_type, chunk)
+                })
+        self.keyword_index.build(tenant_id, passages)
+    
+    def _keyword_search(self, query: str, tenant_id: str, top_k: int) -> List[Dict[str, Any]]:
+        """Fallback keyword search using the tenant's BM25 index"""
+        try:
+            self._ensure_keyword_index(tenant_id)
+            matches = self.keyword_index.search(tenant_id, query, top_k)
+            documents = []
+            for match in matches:
+                document = self._format_match(
+                    match['metadata'],
+                    min(0.9, match['matched_terms'] / match['query_terms'])
                 )
-            
-            # Simple keyword matching
-            query_words = query.lower().split()
-            scored_docs = []
-            
-            for item in response.get('Items', []):
-                content = (item.get('title', '') + ' ' + item.get('content', '')).lower()
-                score = sum(1 for word in query_words if word in content)
-                
-                if score > 0:
-                    scored_docs.append({
-                        'title': item.get('title', ''),
-                        'content': item.get('content', '')[:200],
-                        'doc_type': item.get('doc_type', 'guide'),
-                        'similarity_score': min(0.9, score / len(query_words)),
-                        'doc_id': item.get('id')
-                    })
-            
-            # Sort by score and return top_k
-            scored_docs.sort(key=lambda x: x['similarity_score'], reverse=True)
-            return scored_docs[:top_k]
+                document['bm25_score'] = match['score']
+                documents.append(document)
+            return documents
         except Exception as e:
             print(f"Error in keyword search: {e}")
             return []
     
-    def delete_document(self, doc_id: str, tenant_id: str):
-        """Delete document from vector store"""
+    def index_stats(self, tenant_id: str) -> Dict[str, Any]:
+        """Describe the vector backend serving a tenant"""
+        if self.use_pinecone:
+            return {'backend': 'pinecone', 'index_name': self.index_name}
+        if self.local_index is None:
+            return {'backend': 'keyword'}
+        return {'backend': 'local', **self.local_index.stats(tenant_id)}
+    
+    def set_index_mode(
+        self,
+        tenant_id: str,
+        mode: str,
+        nlist: Optional[int] = None,
+        nprobe: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Select flat or IVF search for a tenant's local index"""
+        if self.local_index is None:
+            raise ValueError("Index mode can only be changed for the local vector index")
+        return {'backend': 'local', **self.local_index.set_mode(tenant_id, mode, nlist, nprobe)}
+    
+    def index_report(
+        self,
+        tenant_id: str,
+        sample_size: int = 100,
+        top_k: int = 10,
+        nprobe_values: Optional[List[int]] = None
+    ) -> Dict[str, Any]:
+        """Recall/latency report comparing IVF search against exhaustive search"""
+        if self.local_index is None:
+            raise ValueError("Index reports are only available for the local vector index")
+        return self.local_index.evaluate(tenant_id, sample_size, top_k, nprobe_values)
+    
+    def _delete_vectors(self, doc_id: str, tenant_id: str):
+        """Delete every passage vector of a document (and the legacy whole-document id)"""
+        legacy_id = f"{tenant_id}_{doc_id}"
         if not self.use_pinecone:
+            if self.local_index is not None:
+                self.local_index.delete(tenant_id, [legacy_id])
+                self.local_index.delete_prefix(tenant_id, f"{legacy_id}#")
+            return
+        
+        ids = [legacy_id]
+        try:
+            for page in self.index.list(prefix=f"{legacy_id}#"):
+                ids.extend(page)
+        except Exception:
+            # Index type without id listing, fall back to a metadata filter
+            self._pinecone(self.index.delete, filter={'tenant_id': tenant_id, 'doc_id': doc_id})
+        for start in range(0, len(ids), 1000):
+            self._pinecone(self.index.delete, ids=ids[start:start + 1000])
+    
+    def delete_document(self, doc_id: str, tenant_id: str):
+        """Delete document from keyword and vector stores"""
+        try:
+            # The legacy whole-document key and every passage, in one save
+            self.keyword_index.update(
+                tenant_id,
+                lambda index: any([index.remove(doc_id), remove_prefix(index, f"{doc_id}#")])
+            )
+        except Exception as e:
+            print(f"Error removing document from keyword index: {e}")
+        
+        if not self.use_pinecone and self.local_index is None:
             return
         
         try:
-            self.index.delete(ids=[f"{tenant_id}_{doc_id}"])
+            if self.use_pinecone:
+                self._delete_vectors(doc_id, tenant_id)
+            else:
+                with self.local_index.transaction(tenant_id):
+                    self._delete_vectors(doc_id, tenant_id)
         except Exception as e:
-            print(f"Error deleting from Pinecone: {e}")
-
+            print(f"Error deleting from vector store: {e}")
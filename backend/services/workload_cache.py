@@ -0,0 +1,213 @@
+"""Read-through cache of each tenant's workloads"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from backend.config.settings import get_settings
+from backend.services.async_dynamodb_service import AsyncDynamoDBService
+from backend.services.dynamodb_service import to_json, from_json
+from backend.utils.singleflight import AsyncSingleFlight
+
+settings = get_settings()
+
+# Try to import redis (shared tier)
+REDIS_AVAILABLE = False
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    pass
+
+
+class RedisTier:
+    """Shared tier on a redis.asyncio client (fakeredis.aioredis works too)
+
+    Each key has a generation counter, and values are stored under the
+    generation they were read at. invalidate() bumps the counter, so a
+    value loaded before an invalidation (by any process) lands under a
+    generation nobody reads any more and simply expires.
+    """
+
+    def __init__(self, client, prefix: str = "workloads:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def generation(self, key: str) -> int:
+        value = await self.client.get(f"{self.prefix}{key}:generation")
+        return int(value) if value is not None else 0
+
+    async def get(self, key: str, generation: int) -> Optional[str]:
+        value = await self.client.get(f"{self.prefix}{key}:{generation}")
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+    async def set(self, key: str, generation: int, value: str, ttl_seconds: int):
+        await self.client.set(f"{self.prefix}{key}:{generation}", value, ex=ttl_seconds)
+
+    async def invalidate(self, key: str):
+        generation = await self.client.incr(f"{self.prefix}{key}:generation")
+        await self.client.delete(f"{self.prefix}{key}:{generation - 1}")
+
+
+class TenantWorkloadCache:
+    """Per-tenant workload lists: in-process LRU, then an optional shared tier, then DynamoDB.
+
+    Writes in backend/routes/workloads.py call invalidate(). Other
+    processes only drop their local copy after local_ttl_seconds, so the
+    local TTL is kept short (it is the staleness bound across workers,
+    with or without a shared tier). Concurrent misses for a tenant share
+    one DynamoDB read. Returned lists are shared: callers must not mutate
+    them.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = 60,
+        local_ttl_seconds: Optional[int] = None,
+        max_tenants: int = 1000,
+        shared=None
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.local_ttl_seconds = local_ttl_seconds if local_ttl_seconds is not None else ttl_seconds
+        self.max_tenants = max_tenants
+        self.shared = shared
+        self._local: "OrderedDict[str, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._loads = AsyncSingleFlight('workload-cache')
+        self._stats = {
+            'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'fills': 0, 'invalidations': 0, 'shared_errors': 0
+        }
+
+    def _remember(self, tenant_id: str, workloads: List[Dict[str, Any]]):
+        self._local[tenant_id] = (time.monotonic() + self.local_ttl_seconds, workloads)
+        self._local.move_to_end(tenant_id)
+        while len(self._local) > self.max_tenants:
+            self._local.popitem(last=False)
+
+    def _local_hit(self, tenant_id: str) -> Optional[List[Dict[str, Any]]]:
+        entry = self._local.get(tenant_id)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        self._local.move_to_end(tenant_id)
+        self._stats['local_hits'] += 1
+        return entry[1]
+
+    async def _shared_lookup(self, tenant_id: str) -> Tuple[Optional[List[Dict[str, Any]]], tuple]:
+        """Workloads from the shared tier (if cached), plus the token to fill() a fresh read with"""
+        token = (self._generations.get(tenant_id, 0), None)
+        if self.shared is None:
+            return None, token
+        try:
+            shared_generation = await self.shared.generation(tenant_id)
+            token = (token[0], shared_generation)
+            cached = await self.shared.get(tenant_id, shared_generation)
+        except Exception as e:
+            self._stats['shared_errors'] += 1
+            print(f"Workload cache shared tier unavailable: {e}")
+            return None, token
+        if cached is None:
+            return None, token
+        workloads = from_json(cached)
+        if self._generations.get(tenant_id, 0) == token[0]:
+            self._remember(tenant_id, workloads)
+        self._stats['shared_hits'] += 1
+        return workloads, token
+
+    async def get(self, tenant_id: str) -> List[Dict[str, Any]]:
+        """The tenant's workloads, from the fastest tier that has them"""
+        workloads = self._local_hit(tenant_id)
+        if workloads is not None:
+            return workloads
+        # Keyed by generation so readers after a write never join a read that began before it
+        generation = self._generations.get(tenant_id, 0)
+        return await self._loads.do((tenant_id, generation), self._load, tenant_id)
+
+    async def peek(self, tenant_id: str) -> Tuple[Optional[List[Dict[str, Any]]], tuple]:
+        """Cached workloads without reading DynamoDB (None on a miss), plus a token for fill()"""
+        workloads = self._local_hit(tenant_id)
+        if workloads is not None:
+            return workloads, None
+        return await self._shared_lookup(tenant_id)
+
+    async def _load(self, tenant_id: str) -> List[Dict[str, Any]]:
+        workloads, token = await self._shared_lookup(tenant_id)
+        if workloads is not None:
+            return workloads
+        self._stats['misses'] += 1
+        workloads = await AsyncDynamoDBService.collect_tenant('workloads', tenant_id)
+        await self.fill(tenant_id, workloads, token)
+        return workloads
+
+    async def fill(self, tenant_id: str, workloads: List[Dict[str, Any]], token: Optional[tuple]):
+        """Cache a complete workload list read after peek() returned token.
+
+        Nothing is cached when a write has invalidated the tenant since.
+        """
+        if token is None:
+            return
+        generation, shared_generation = token
+        # A write landed while we were reading: serve what we read, but don't cache it
+        if self._generations.get(tenant_id, 0) != generation:
+            return
+        self._remember(tenant_id, workloads)
+        self._stats['fills'] += 1
+        if self.shared is not None and shared_generation is not None:
+            try:
+                await self.shared.set(tenant_id, shared_generation, to_json(workloads), self.ttl_seconds)
+            except Exception as e:
+                self._stats['shared_errors'] += 1
+                print(f"Workload cache shared tier unavailable: {e}")
+
+    async def invalidate(self, tenant_id: str):
+        """Drop a tenant's cached workloads after a write"""
+        self._generations[tenant_id] = self._generations.get(tenant_id, 0) + 1
+        self._local.pop(tenant_id, None)
+        self._stats['invalidations'] += 1
+        if self.shared is not None:
+            try:
+                await self.shared.invalidate(tenant_id)
+            except Exception as e:
+                self._stats['shared_errors'] += 1
+                print(f"Workload cache shared tier unavailable: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            'tenants': len(self._local),
+            'shared_tier': type(self.shared).__name__ if self.shared is not None else None
+        }
+
+
+class UncachedWorkloads:
+    """Drop-in for TenantWorkloadCache when caching is disabled"""
+
+    async def get(self, tenant_id: str) -> List[Dict[str, Any]]:
+        return await AsyncDynamoDBService.collect_tenant('workloads', tenant_id)
+
+    async def peek(self, tenant_id: str) -> Tuple[Optional[List[Dict[str, Any]]], tuple]:
+        return None, None
+
+    async def fill(self, tenant_id: str, workloads: List[Dict[str, Any]], token: Optional[tuple]):
+        pass
+
+    async def invalidate(self, tenant_id: str):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {'enabled': False}
+
+
+def _create_workload_cache():
+    if not settings.workload_cache_enabled:
+        return UncachedWorkloads()
+    shared = None
+    if settings.redis_url and REDIS_AVAILABLE:
+        shared = RedisTier(aioredis.from_url(settings.redis_url))
+    return TenantWorkloadCache(
+        ttl_seconds=settings.workload_cache_ttl_seconds,
+        # Without a shared tier, writes in other workers are only seen when the local copy expires
+        local_ttl_seconds=min(settings.workload_cache_local_ttl_seconds, settings.workload_cache_ttl_seconds),
+        max_tenants=settings.workload_cache_max_tenants,
+        shared=shared
+    )
+
+
+workload_cache = _create_workload_cache()
@@ -0,0 +1,114 @@
+"""Bounded execution of blocking calls from async routes"""
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+from backend.config.settings import get_settings
+
+settings = get_settings()
+
+# Shared pool for blocking SDK calls (OpenAI, Bedrock, boto3) made from the event loop
+blocking_executor = ThreadPoolExecutor(
+    max_workers=max(1, settings.blocking_executor_workers),
+    thread_name_prefix="blocking-io"
+)
+
+# DynamoDB gets its own threads, one per connection it may use, so it neither
+# queues behind provider calls nor oversubscribes the botocore pool
+stage_executors: Dict[str, ThreadPoolExecutor] = {
+    'dynamodb': ThreadPoolExecutor(
+        max_workers=max(1, settings.dynamodb_concurrency),
+        thread_name_prefix="dynamodb-io"
+    ),
+}
+
+# Per-stage in-flight limits so one slow dependency cannot take every worker thread
+STAGE_LIMITS = {
+    'retrieval': settings.rag_retrieval_concurrency,
+    'llm': settings.rag_llm_concurrency,
+    'indexing': settings.rag_indexing_concurrency,
+    'dynamodb': settings.dynamodb_concurrency,
+    's3': settings.dynamodb_concurrency,
+}
+
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+_in_flight: Dict[str, int] = {}
+_waiting: Dict[str, int] = {}
+
+
+def _semaphore(stage: str) -> asyncio.Semaphore:
+    semaphore = _semaphores.get(stage)
+    if semaphore is None:
+        semaphore = _semaphores[stage] = asyncio.Semaphore(max(1, STAGE_LIMITS.get(stage, 8)))
+    return semaphore
+
+
+async def run_blocking(stage: str, func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking callable on the stage's executor (default: shared), limited per stage"""
+    semaphore = _semaphore(stage)
+    _waiting[stage] = _waiting.get(stage, 0) + 1
+    async with semaphore:
+        _waiting[stage] -= 1
+        _in_flight[stage] = _in_flight.get(stage, 0) + 1
+        try:
+            loop = asyncio.get_running_loop()
+            context = contextvars.copy_context()  # Keep request-scoped context (e.g. admission priority)
+            executor = stage_executors.get(stage, blocking_executor)
+            return await loop.run_in_executor(executor, functools.partial(context.run, func, *args, **kwargs))
+        finally:
+            _in_flight[stage] -= 1
+
+
+def _close_iterator(iterator, pending: Optional[Future]):
+    # A cancelled consumer may leave next() running: the generator can only be closed after it
+    if pending is not None:
+        wait([pending])
+    iterator.close()
+
+
+async def iterate_blocking(stage: str, func: Callable, *args, **kwargs) -> AsyncIterator[Any]:
+    """Consume a blocking iterator (e.g. a provider token stream) without blocking the loop.
+    
+    The stage slot is held for the lifetime of the stream. If the consumer
+    stops early (client disconnect, break, cancellation) the iterator is
+    closed on the executor, so the provider stream behind it is released.
+    """
+    semaphore = _semaphore(stage)
+    _waiting[stage] = _waiting.get(stage, 0) + 1
+    async with semaphore:
+        _waiting[stage] -= 1
+        _in_flight[stage] = _in_flight.get(stage, 0) + 1
+        iterator = None
+        pending = None
+        try:
+            loop = asyncio.get_running_loop()
+            context = contextvars.copy_context()
+            executor = stage_executors.get(stage, blocking_executor)
+            iterator = iter(await loop.run_in_executor(executor, functools.partial(context.run, func, *args, **kwargs)))
+            done = object()
+            while True:
+                pending = executor.submit(context.run, next, iterator, done)
+                item = await asyncio.wrap_future(pending)
+                pending = None
+                if item is done:
+                    iterator = None  # Exhausted: nothing to close
+                    break
+                yield item
+        finally:
+            _in_flight[stage] -= 1
+            if iterator is not None and hasattr(iterator, 'close'):
+                # Not awaited: this may run while the task is being cancelled
+                executor.submit(context.run, _close_iterator, iterator, pending)
+
+
+def stage_stats() -> Dict[str, Dict[str, int]]:
+    """In-flight and queued calls per stage"""
+    return {
+        stage: {
+            'limit': max(1, limit),
+            'in_flight': _in_flight.get(stage, 0),
+            'waiting': _waiting.get(stage, 0)
+        }
+        for stage, limit in STAGE_LIMITS.items()
+    }
@@ -0,0 +1,73 @@
+"""Coalesce identical concurrent calls into one in-flight execution"""
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Thread-safe single-flight: callers with the same key share one call's result.
+
+    The first caller runs the function; callers arriving while it is in
+    flight block on its future and receive the same result (or exception).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {'executed': 0, 'coalesced': 0}
+
+    def do(self, key: Hashable, func: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self._stats['executed'] += 1
+            else:
+                self._stats['coalesced'] += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, 'in_flight': len(self._calls)}
+
+
+class AsyncSingleFlight:
+    """Single-flight for coroutines on one event loop.
+
+    The shared call runs as its own task, so a caller that is cancelled
+    (e.g. a disconnected client) does not cancel it for the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._stats = {'executed': 0, 'coalesced': 0}
+
+    async def do(self, key: Hashable, func: Callable, *args, **kwargs) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(func(*args, **kwargs))
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+            self._stats['executed'] += 1
+        else:
+            self._stats['coalesced'] += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, 'in_flight': len(self._calls)}
@@ -200,6 +200,79 @@ resource "aws_dynamodb_table" "documents" {
   }
 }
 
+# Latest metric samples per workload, read in bulk by the dashboard
+resource "aws_dynamodb_table" "metric_summaries" {
+  name           = "${var.table_prefix}-metric-summaries"
+  billing_mode   = "PAY_PER_REQUEST"
+  hash_key       = "workload_id"
+
+  attribute {
+    name = "workload_id"
+    type = "S"
+  }
+
+  tags = {
+    Name        = "${var.table_prefix}-metric-summaries"
+    Environment = var.environment
+  }
+}
+
+# Minute / hour / day metric aggregates per workload and tenant
+resource "aws_dynamodb_table" "metric_rollups" {
+  name           = "${var.table_prefix}-metric-rollups"
+  billing_mode   = "PAY_PER_REQUEST"
+  hash_key       = "series"
+  range_key      = "bucket"
+
+  attribute {
+    name = "series"
+    type = "S"
+  }
+
+  attribute {
+    name = "bucket"
+    type = "N"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = {
+    Name        = "${var.table_prefix}-metric-rollups"
+    Environment = var.environment
+  }
+}
+
+# Metadata + preview per document, so listings don't read document bodies
+resource "aws_dynamodb_table" "document_summaries" {
+  name           = "${var.table_prefix}-document-summaries"
+  billing_mode   = "PAY_PER_REQUEST"
+  hash_key       = "id"
+
+  attribute {
+    name = "id"
+    type = "S"
+  }
+
+  attribute {
+    name = "tenant_id"
+    type = "S"
+  }
+
+  global_secondary_index {
+    name            = "tenant-id-index"
+    hash_key        = "tenant_id"
+    projection_type = "ALL"
+  }
+
+  tags = {
+    Name        = "${var.table_prefix}-document-summaries"
+    Environment = var.environment
+  }
+}
+
 resource "aws_dynamodb_table" "rag_queries" {
   name           = "${var.table_prefix}-rag-queries"
   billing_mode   = "PAY_PER_REQUEST"
@@ -364,7 +437,9 @@ resource "aws_iam_role_policy" "lambda" {
           "dynamodb:UpdateItem",
           "dynamodb:DeleteItem",
           "dynamodb:Query",
-          "dynamodb:Scan"
+          "dynamodb:Scan",
+          "dynamodb:BatchGetItem",
+          "dynamodb:BatchWriteItem"
         ]
         Resource = [
           aws_dynamodb_table.tenants.arn,
@@ -373,11 +448,15 @@ resource "aws_iam_role_policy" "lambda" {
           aws_dynamodb_table.metrics.arn,
           aws_dynamodb_table.optimizations.arn,
           aws_dynamodb_table.documents.arn,
+          aws_dynamodb_table.document_summaries.arn,
+          aws_dynamodb_table.metric_summaries.arn,
+          aws_dynamodb_table.metric_rollups.arn,
           aws_dynamodb_table.rag_queries.arn,
           "${aws_dynamodb_table.workloads.arn}/index/*",
           "${aws_dynamodb_table.metrics.arn}/index/*",
           "${aws_dynamodb_table.optimizations.arn}/index/*",
           "${aws_dynamodb_table.documents.arn}/index/*",
+          "${aws_dynamodb_table.document_summaries.arn}/index/*",
           "${aws_dynamodb_table.rag_queries.arn}/index/*"
         ]
       },
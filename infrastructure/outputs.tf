@@ -25,8 +25,11 @@ output "dynamodb_tables" {
     users        = aws_dynamodb_table.users.name
     workloads    = aws_dynamodb_table.workloads.name
     metrics      = aws_dynamodb_table.metrics.name
+    metric_summaries = aws_dynamodb_table.metric_summaries.name
+    metric_rollups = aws_dynamodb_table.metric_rollups.name
     optimizations = aws_dynamodb_table.optimizations.name
     documents    = aws_dynamodb_table.documents.name
+    document_summaries = aws_dynamodb_table.document_summaries.name
     rag_queries  = aws_dynamodb_table.rag_queries.name
   }
 }
@@ -0,0 +1,57 @@
+"""Breaker state transitions"""
+import pytest
+from backend.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from backend.services.rate_limiter import RateLimitTimeout
+
+
+def failing():
+    raise RuntimeError('down')
+
+
+def open_breaker(**kwargs):
+    breaker = CircuitBreaker('test', minimum_calls=4, **kwargs)
+    for _ in range(4):
+        with pytest.raises(RuntimeError):
+            breaker.call(failing)
+    return breaker
+
+
+def test_opens_once_failure_rate_crosses_threshold():
+    breaker = open_breaker()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: 'ok')
+    assert breaker.stats()['rejected'] == 1
+
+
+def test_half_open_probe_success_closes():
+    breaker = open_breaker(open_seconds=0)
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_failure_reopens():
+    breaker = open_breaker(open_seconds=0)
+    with pytest.raises(RuntimeError):
+        breaker.call(failing)
+    assert breaker.state == OPEN
+
+
+def test_admission_timeout_releases_the_probe_without_a_verdict():
+    breaker = open_breaker(open_seconds=0)
+
+    def throttled():
+        raise RateLimitTimeout('queue full')
+
+    with pytest.raises(RateLimitTimeout):
+        breaker.call(throttled)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+
+def test_early_stop_of_stream_records_nothing():
+    breaker = CircuitBreaker('test', minimum_calls=1)
+    stream = breaker.stream(lambda: iter([1, 2, 3]))
+    assert next(stream) == 1
+    stream.close()
+    assert breaker.stats()['recent_calls'] == 0
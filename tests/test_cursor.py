@@ -0,0 +1,18 @@
+"""Pagination cursor codec"""
+from decimal import Decimal
+import pytest
+from backend.services.dynamodb_service import decode_cursor, encode_cursor
+
+
+def test_round_trip_keeps_key_and_fallback():
+    key = {'id': 'doc#1', 'tenant_id': 't1', 'created_at': Decimal(1700000000)}
+    cursor = encode_cursor(key, fallback=True)
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == (key, True)
+    assert decode_cursor(encode_cursor(key)) == (key, False)
+
+
+@pytest.mark.parametrize('cursor', ['', 'not base64!', 'bnVsbA', 'eyJrIjogWzFdfQ', 'eyJzIjogMX0'])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
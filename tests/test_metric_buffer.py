@@ -0,0 +1,72 @@
+"""WorkloadRingBuffer eviction, merge and coverage bookkeeping"""
+import asyncio
+import time
+from backend.services import metric_buffer as module
+from backend.services.metric_buffer import MetricBufferStore, WorkloadRingBuffer
+
+
+def sample(timestamp, cpu=1.0, workload_id='w1'):
+    return {'id': f'm{timestamp}', 'workload_id': workload_id, 'timestamp': timestamp, 'cpu_usage': cpu}
+
+
+def test_append_evicts_oldest_and_raises_coverage():
+    buffer = WorkloadRingBuffer(3)
+    buffer.append([sample(100), sample(110), sample(120)])
+    assert buffer.covered_from == 100
+    buffer.append([sample(130)])
+    assert buffer.size == 3
+    assert buffer.covered_from == 101
+    assert list(buffer.window(0)['timestamp']) == [130, 120, 110]
+
+
+def test_merge_deduplicates_by_id():
+    buffer = WorkloadRingBuffer(5)
+    buffer.append([sample(100), sample(110)])
+    buffer.merge([sample(110), sample(120)], covered_from=105)
+    assert list(buffer.window(0)['id']) == ['m120', 'm110', 'm100']
+    # Contiguous with what the buffer already covered
+    assert buffer.covered_from == 100
+
+
+def test_merge_over_capacity_keeps_newest_and_moves_coverage_past_dropped():
+    buffer = WorkloadRingBuffer(3)
+    buffer.append([sample(100), sample(140)])
+    buffer.merge([sample(110), sample(120), sample(130)], covered_from=90)
+    assert list(buffer.window(0)['timestamp']) == [140, 130, 120]
+    assert buffer.covered_from == 111
+    assert buffer.window(111)['timestamp'].size == 3
+
+
+def test_non_contiguous_merge_does_not_extend_coverage_backwards():
+    buffer = WorkloadRingBuffer(10)
+    buffer.append([sample(100)])
+    buffer.merge([sample(500), sample(510)], covered_from=500, contiguous=False)
+    assert buffer.covered_from == 500
+
+
+def test_window_orders_most_recent_first_after_wraparound():
+    buffer = WorkloadRingBuffer(3)
+    buffer.append([sample(t, cpu=t / 10) for t in (100, 110, 120, 130, 140)])
+    window = buffer.window(120)
+    assert list(window['timestamp']) == [140, 130, 120]
+    assert list(window['cpu_usage']) == [14.0, 13.0, 12.0]
+
+
+def test_store_does_not_reload_a_window_that_did_not_fit(monkeypatch):
+    now = int(time.time())
+    pages = []
+
+    async def page(table_name, limit, **kwargs):
+        pages.append(kwargs['ExpressionAttributeValues'][':since'])
+        return [sample(now - offset) for offset in range(limit)], 'more'
+
+    monkeypatch.setattr(module.AsyncDynamoDBService, 'page', page)
+    store = MetricBufferStore(capacity=4, window_seconds=3600, refresh_seconds=60)
+
+    async def scenario():
+        return [await store.window('w1', now - 600) for _ in range(3)]
+
+    assert asyncio.run(scenario()) == [None, None, None]
+    assert len(pages) == 1
+    # The most recent samples still fit
+    assert asyncio.run(store.window('w1', now - 2))['timestamp'].size == 3
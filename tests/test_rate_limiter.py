@@ -0,0 +1,21 @@
+"""Token bucket admission"""
+import pytest
+from backend.services.rate_limiter import ProviderLimiter, RateLimitTimeout, admission_context
+
+
+def test_admits_within_budget_and_times_out_beyond_it():
+    limiter = ProviderLimiter('test', requests_per_minute=2, tokens_per_minute=1000)
+    limiter.acquire(10)
+    limiter.acquire(10)
+    with pytest.raises(RateLimitTimeout):
+        limiter.acquire(10, timeout=0.05)
+    stats = limiter.stats()
+    assert stats['admitted'] == 2
+    assert stats['timeouts'] == 1
+
+
+def test_usage_is_charged_to_the_context_tenant():
+    limiter = ProviderLimiter('test', requests_per_minute=100, tokens_per_minute=10000)
+    with admission_context('bulk', 't1'):
+        limiter.acquire(500)
+    assert limiter._usage['t1'] == pytest.approx(500, rel=0.01)
@@ -0,0 +1,64 @@
+"""Coalescing of concurrent identical calls"""
+import asyncio
+import threading
+import pytest
+from backend.utils.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_threads_share_one_call():
+    flight = SingleFlight('test')
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow(value):
+        calls.append(value)
+        started.set()
+        release.wait(5)
+        return value * 2
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do('k', slow, 21)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do('k', slow, 21))) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    while flight.stats()['coalesced'] < 4:
+        threading.Event().wait(0.01)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+    assert results == [42] * 5
+    assert calls == [21]
+    assert flight.stats() == {'executed': 1, 'coalesced': 4, 'in_flight': 0}
+
+
+def test_exception_reaches_every_caller_and_clears_the_key():
+    flight = SingleFlight('test')
+
+    def fail():
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        flight.do('k', fail)
+    assert flight.do('k', lambda: 'ok') == 'ok'
+
+
+def test_async_cancelled_caller_does_not_cancel_the_shared_call():
+    flight = AsyncSingleFlight('test')
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 'value'
+
+    async def scenario():
+        first = asyncio.ensure_future(flight.do('k', load))
+        second = asyncio.ensure_future(flight.do('k', load))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == 'value'
+    assert calls == [1]
@@ -0,0 +1,90 @@
+"""Cross-worker invalidation through the shared (Redis) tier"""
+import asyncio
+from decimal import Decimal
+import pytest
+from backend.services import workload_cache as module
+from backend.services.workload_cache import RedisTier, TenantWorkloadCache
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+class FakeWorkloadsTable:
+    def __init__(self):
+        self.workloads = [{'id': 'w1', 'tenant_id': 't1', 'replicas': Decimal(1)}]
+        self.reads = 0
+
+    async def collect_tenant(self, table_name, tenant_id):
+        self.reads += 1
+        return [dict(workload) for workload in self.workloads]
+
+
+@pytest.fixture
+def table(monkeypatch):
+    table = FakeWorkloadsTable()
+    monkeypatch.setattr(module.AsyncDynamoDBService, 'collect_tenant', table.collect_tenant)
+    return table
+
+
+def workers(count=2):
+    """Caches as separate processes would have them: no local sharing, one Redis server"""
+    server = fakeredis.FakeServer()
+    return [
+        TenantWorkloadCache(ttl_seconds=60, local_ttl_seconds=0, shared=RedisTier(fakeredis.FakeAsyncRedis(server=server)))
+        for _ in range(count)
+    ]
+
+
+def test_second_worker_reads_shared_tier(table):
+    first, second = workers()
+
+    async def scenario():
+        assert (await first.get('t1'))[0]['replicas'] == 1
+        assert (await second.get('t1'))[0]['replicas'] == 1
+
+    asyncio.run(scenario())
+    assert table.reads == 1
+    assert second.stats()['shared_hits'] == 1
+
+
+def test_invalidation_in_one_worker_is_seen_by_another(table):
+    first, second = workers()
+
+    async def scenario():
+        await first.get('t1')
+        await second.get('t1')
+        table.workloads[0]['replicas'] = Decimal(3)
+        await first.invalidate('t1')
+        return await second.get('t1')
+
+    assert asyncio.run(scenario())[0]['replicas'] == 3
+    assert table.reads == 2
+
+
+def test_fill_started_before_invalidation_is_never_served(table):
+    first, second = workers()
+
+    async def scenario():
+        cached, token = await first.peek('t1')
+        assert cached is None
+        stale = await module.AsyncDynamoDBService.collect_tenant('workloads', 't1')
+        # Another worker writes and invalidates while this read is in flight
+        table.workloads[0]['replicas'] = Decimal(5)
+        await second.invalidate('t1')
+        await first.fill('t1', stale, token)
+        return await second.get('t1'), await first.get('t1')
+
+    seen_by_second, seen_by_first = asyncio.run(scenario())
+    assert seen_by_second[0]['replicas'] == 5
+    assert seen_by_first[0]['replicas'] == 5
+
+
+def test_local_invalidation_skips_in_flight_fill(table):
+    cache = TenantWorkloadCache(ttl_seconds=60)
+
+    async def scenario():
+        _, token = await cache.peek('t1')
+        await cache.invalidate('t1')
+        await cache.fill('t1', [{'id': 'stale'}], token)
+        return await cache.get('t1')
+
+    assert asyncio.run(scenario())[0]['id'] == 'w1'